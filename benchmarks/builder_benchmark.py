@@ -0,0 +1,51 @@
+"""
+Measures the cost of building encoded outbound messages, one at a time and
+as a ``MessageBatch`` of 1,000 subscriptions.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.message import message_builder
+from deepstreampy.constants import topic, actions
+
+import timeit
+
+NUMBER = 100000
+
+MESSAGES = [
+    ("event emit", topic.EVENT, actions.EVENT,
+     ["chat/message", message_builder.typed("hello world")]),
+    ("record update", topic.RECORD, actions.UPDATE,
+     ["user/1", 5, {"name": "Bob", "age": 41, "tags": ["a", "b"]}]),
+    ("pong", topic.CONNECTION, actions.PONG, None),
+]
+
+
+BATCH_SIZE = 1000
+SUBSCRIPTIONS = [["record/{0}".format(i)] for i in range(BATCH_SIZE)]
+
+
+def _build_batch():
+    batch = message_builder.MessageBatch()
+    for data in SUBSCRIPTIONS:
+        batch.add(topic.RECORD, actions.CREATEORREAD, data)
+    return batch.build()
+
+
+def run():
+    for name, message_topic, action, data in MESSAGES:
+        elapsed = min(timeit.repeat(
+            lambda: message_builder.get_message_bytes(message_topic, action,
+                                                      data),
+            number=NUMBER, repeat=3))
+        print("{0:<15} {1:>8.2f} us/message".format(
+            name, elapsed / NUMBER * 1e6))
+
+    elapsed = min(timeit.repeat(_build_batch, number=NUMBER // BATCH_SIZE,
+                                repeat=3))
+    print("{0:<15} {1:>8.2f} us/message".format(
+        "batch", elapsed / NUMBER * 1e6))
+
+
+if __name__ == "__main__":
+    run()
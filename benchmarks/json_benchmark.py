@@ -0,0 +1,58 @@
+"""
+Measures the cost of encoding and decoding record payloads with each JSON
+codec that is installed: building a record update message with
+``message_builder.get_message_bytes``, and decoding the data of a received
+record.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.message import codec, message_builder
+from deepstreampy.constants import topic, actions
+
+import timeit
+
+NUMBER = 20000
+
+
+def _item(i):
+    return {"id": "item/{0}".format(i), "title": "Item {0}".format(i),
+            "price": 9.99 + i, "tags": ["new", "sale"], "inStock": i % 2 == 0}
+
+
+PAYLOADS = [
+    ("small", {"firstname": "Homer", "lastname": "Simpson", "age": 39}),
+    ("medium", {"user": {"name": "Homer Simpson", "city": "Springfield",
+                         "email": "homer@example.com"},
+                "items": [_item(i) for i in range(10)],
+                "updated": 1545234234.5}),
+    ("large", {"items": [_item(i) for i in range(200)],
+               "notes": "Doh! " * 50}),
+]
+
+
+def measure(json_codec, payload):
+    data = ["record/1", 5, payload]
+    encoded = json_codec.dumps(payload, sort_keys=True)
+
+    encode = min(timeit.repeat(
+        lambda: message_builder.get_message_bytes(
+            topic.RECORD, actions.UPDATE, data, json_codec),
+        number=NUMBER, repeat=3)) / NUMBER
+    decode = min(timeit.repeat(lambda: json_codec.loads(encoded),
+                               number=NUMBER, repeat=3)) / NUMBER
+    return len(encoded), encode, decode
+
+
+def run():
+    for name, payload in PAYLOADS:
+        for codec_name in codec.available_codecs():
+            size, encode, decode = measure(codec.get_codec(codec_name),
+                                           payload)
+            print("{0:<6} {1:>6} bytes  {2:<6}  encode {3:>7.2f}us  "
+                  "decode {4:>7.2f}us".format(name, size, codec_name,
+                                              encode * 1e6, decode * 1e6))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,120 @@
+"""
+Measures the CPU cost of the client without any I/O, by connecting clients to
+the stand-in server of ``deepstreampy.testing`` with ``LoopbackTransport``:
+the round-trip latency of ``rpc.make``, the time to dispatch received events
+to a subscriber, and the fan-out of events and record updates to many
+connections.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.client import Client
+from deepstreampy.message.transport import LoopbackTransport
+from deepstreampy.testing import Server
+
+from tornado import gen, ioloop
+
+import time
+
+CALLS = 20000
+EVENTS = 200000
+EVENTS_PER_FRAME = 100
+CONNECTIONS = 200
+FANOUT_MESSAGES = 500
+
+
+@gen.coroutine
+def _connect(server, username='bench'):
+    client = Client('ws://loopback',
+                    transport=LoopbackTransport(server.accept))
+    yield client.connect()
+    yield client.login({'username': username})
+    raise gen.Return(client)
+
+
+@gen.coroutine
+def measure_rpc(server):
+    client = yield _connect(server)
+    start = time.perf_counter()
+    for i in range(CALLS):
+        yield client.rpc.make('echo', i)
+    elapsed = time.perf_counter() - start
+    client.close()
+    print("rpc.make: {0:>6.1f}us per round trip".format(
+        elapsed / CALLS * 1e6))
+
+
+@gen.coroutine
+def measure_events(server):
+    client = yield _connect(server)
+    received = []
+    client.event.subscribe('news', received.append)
+
+    frame = 'E\x1fEVT\x1fnews\x1fO{"title":"hello"}\x1e' * EVENTS_PER_FRAME
+    start = time.perf_counter()
+    for _ in range(EVENTS // EVENTS_PER_FRAME):
+        client._connection._on_data(frame)
+    elapsed = time.perf_counter() - start
+    assert len(received) == EVENTS
+    client.close()
+    print("events:   {0:>6.2f}us per event".format(elapsed / EVENTS * 1e6))
+
+
+@gen.coroutine
+def measure_fanout(server):
+    clients = []
+    for i in range(CONNECTIONS):
+        client = yield _connect(server, 'user{0}'.format(i))
+        clients.append(client)
+
+    received = [0]
+
+    def on_event(data):
+        received[0] += 1
+
+    records = []
+    for client in clients[1:]:
+        client.event.subscribe('fanout', on_event)
+        record = yield client.record.get_record('shared')
+        records.append(record)
+    while not all(record.is_ready for record in records):
+        yield gen.moment
+
+    publisher = clients[0]
+    expected = FANOUT_MESSAGES * (CONNECTIONS - 1)
+    start = time.perf_counter()
+    for i in range(FANOUT_MESSAGES):
+        publisher.event.emit('fanout', i)
+    while received[0] < expected:
+        yield gen.moment
+    elapsed = time.perf_counter() - start
+    print("fan-out:  {0:>6.2f}us per delivered event to {1} connections"
+          .format(elapsed / expected * 1e6, CONNECTIONS - 1))
+
+    shared = yield publisher.record.get_record('shared')
+    while not shared.is_ready:
+        yield gen.moment
+    start = time.perf_counter()
+    for i in range(FANOUT_MESSAGES):
+        shared.set(i, 'counter')
+    while not all(record.version == shared.version for record in records):
+        yield gen.moment
+    elapsed = time.perf_counter() - start
+    print("records:  {0:>6.2f}us per delivered update to {1} connections"
+          .format(elapsed / expected * 1e6, CONNECTIONS - 1))
+
+    for client in clients:
+        client.close()
+
+
+def run():
+    server = Server()
+    server.provide('echo', lambda data: data)
+    io_loop = ioloop.IOLoop.current()
+    io_loop.run_sync(lambda: measure_rpc(server))
+    io_loop.run_sync(lambda: measure_events(server))
+    io_loop.run_sync(lambda: measure_fanout(server), timeout=600)
+
+
+if __name__ == "__main__":
+    run()
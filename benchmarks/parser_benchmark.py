@@ -0,0 +1,63 @@
+"""
+Measures how many inbound messages per second the connection can parse and
+dispatch, for frames carrying a single message and for frames carrying 1,000
+messages, in the default strict mode and with the ``trustedServer`` option.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.message import connection
+from deepstreampy.message import message_builder
+from deepstreampy.constants import topic, actions
+
+import timeit
+
+
+class _Client(object):
+    """Stands in for the client, counting the dispatched messages."""
+
+    def __init__(self):
+        self.received = 0
+
+    def _on_message(self, message):
+        self.received += 1
+
+    def _on_error(self, topic, event, msg=None):
+        raise ValueError(msg)
+
+    def emit(self, *args):
+        pass
+
+
+def _frame(size):
+    return "".join(
+        message_builder.get_message(topic.EVENT, actions.EVENT,
+                                    ["event/{0}".format(i),
+                                     message_builder.typed({"i": i})])
+        for i in range(size))
+
+
+def measure(frame_size, total_messages=200000, trusted=False):
+    client = _Client()
+    conn = connection.Connection(client, "ws://localhost:6020/deepstream",
+                                 trustedServer=trusted)
+    conn.set_topic_handlers({topic.EVENT: client._on_message})
+    frame = _frame(frame_size)
+    frames = total_messages // frame_size
+
+    elapsed = min(timeit.repeat(lambda: conn._on_data(frame),
+                                number=frames, repeat=3))
+    return (frames * frame_size) / elapsed
+
+
+def run():
+    for trusted in (False, True):
+        for frame_size in (1, 1000):
+            rate = measure(frame_size, trusted=trusted)
+            print("{0:<8}{1:>5} message(s) per frame: {2:>12,.0f} messages/s"
+                  .format("trusted" if trusted else "strict", frame_size,
+                          rate))
+
+
+if __name__ == "__main__":
+    run()
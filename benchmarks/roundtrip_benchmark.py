@@ -0,0 +1,109 @@
+"""
+Measures the round-trip latency of ``rpc.make`` with the tornado client and
+with the asyncio client, against a minimal server answering every RPC in a
+background thread. Requires Python 3.5 or newer.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.client import Client
+from deepstreampy.aio import AsyncClient
+
+from tornado import gen, ioloop, web, websocket, netutil, httpserver
+
+import asyncio
+import threading
+import time
+
+CALLS = 5000
+
+
+class _RPCHandler(websocket.WebSocketHandler):
+
+    def open(self):
+        self.write_message('C\x1fA\x1e')
+
+    def on_message(self, message):
+        for raw in message.split('\x1e'):
+            parts = raw.split('\x1f')
+            if parts[:2] == ['A', 'REQ']:
+                self.write_message('A\x1fA\x1e')
+            elif parts[:2] == ['P', 'REQ']:
+                self.write_message(
+                    'P\x1fA\x1fREQ\x1f{0}\x1f{1}\x1e'
+                    'P\x1fRES\x1f{0}\x1f{1}\x1f{2}\x1e'.format(*parts[2:5]))
+
+
+def _serve(sockets, started):
+    io_loop = ioloop.IOLoop()
+    io_loop.make_current()
+    server = httpserver.HTTPServer(
+        web.Application([('/deepstream', _RPCHandler)]))
+    server.add_sockets(sockets)
+    io_loop.add_callback(started.set)
+    io_loop.start()
+
+
+def _summary(name, latencies):
+    latencies.sort()
+    print("{0:>8}: mean {1:>6.0f}us  p50 {2:>6.0f}us  p99 {3:>6.0f}us".format(
+        name,
+        sum(latencies) / len(latencies) * 1e6,
+        latencies[len(latencies) // 2] * 1e6,
+        latencies[int(len(latencies) * 0.99)] * 1e6))
+
+
+def measure_tornado(url):
+    latencies = []
+
+    @gen.coroutine
+    def run():
+        client = Client(url)
+        yield client.connect()
+        yield client.login({})
+        for i in range(CALLS):
+            start = time.perf_counter()
+            yield client.rpc.make('echo', i)
+            latencies.append(time.perf_counter() - start)
+        client.close()
+
+    ioloop.IOLoop.current().run_sync(run)
+    return latencies
+
+
+def measure_asyncio(url):
+    latencies = []
+    loop = asyncio.new_event_loop()
+
+    async def run():
+        client = AsyncClient(url, loop=loop)
+        await client.connect()
+        await client.login({})
+        for i in range(CALLS):
+            start = time.perf_counter()
+            await client.rpc.make('echo', i)
+            latencies.append(time.perf_counter() - start)
+        client.close()
+        await asyncio.sleep(0.1)
+
+    loop.run_until_complete(run())
+    loop.close()
+    return latencies
+
+
+def run():
+    sockets = netutil.bind_sockets(0, 'localhost')
+    started = threading.Event()
+    server = threading.Thread(target=_serve, args=(sockets, started))
+    server.daemon = True
+    server.start()
+    started.wait()
+
+    url = 'ws://localhost:{0}/deepstream'.format(
+        sockets[0].getsockname()[1])
+    _summary('tornado', measure_tornado(url))
+    _summary('asyncio', measure_asyncio(url))
+
+
+if __name__ == "__main__":
+    run()
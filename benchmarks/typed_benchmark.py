@@ -0,0 +1,57 @@
+"""
+Measures the cost of encoding event payloads with ``message_builder.typed``
+and decoding them with ``message_parser.convert_typed``, for a mix of the
+payload types events carry.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.message import message_builder, message_parser
+
+import timeit
+
+NUMBER = 20000
+
+PAYLOADS = [
+    ("string", "hello world"),
+    ("int", 42),
+    ("float", 3.14159),
+    ("bool", True),
+    ("null", None),
+    ("object", {"x": 1, "y": 2}),
+]
+
+
+class _Client(object):
+
+    def _on_error(self, topic, event, msg=None):
+        raise ValueError(msg)
+
+
+def measure(values, function):
+    return min(timeit.repeat(lambda: [function(value) for value in values],
+                             number=NUMBER, repeat=5)) / NUMBER / len(values)
+
+
+def run():
+    client = _Client()
+
+    def convert(value):
+        return message_parser.convert_typed(value, client)
+
+    mixed = []
+    for name, value in PAYLOADS:
+        encoded = message_builder.typed(value)
+        mixed.append(value)
+        print("{0:<7} typed {1:>6.3f}us  convert_typed {2:>6.3f}us".format(
+            name, measure([value], message_builder.typed) * 1e6,
+            measure([encoded], convert) * 1e6))
+
+    encoded = [message_builder.typed(value) for value in mixed]
+    print("{0:<7} typed {1:>6.3f}us  convert_typed {2:>6.3f}us".format(
+        "mixed", measure(mixed, message_builder.typed) * 1e6,
+        measure(encoded, convert) * 1e6))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,455 @@
+"""asyncio transport and async/await API for the client.
+
+Requires Python 3.5 or newer. ``AsyncClient`` runs the same record, event,
+RPC and presence handling as ``deepstreampy.client.Client``, but the
+connection and every timer live on an asyncio event loop, and the websocket
+is a plain asyncio stream, so no tornado IOLoop is involved::
+
+    client = AsyncClient('ws://localhost:6020/deepstream')
+    await client.connect()
+    await client.login({'username': 'Homer'})
+    record = await client.record.get_record('user/homer')
+    result = await client.rpc.make('add-two', {'numA': 1, 'numB': 2})
+"""
+
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+from functools import partial
+from urllib.parse import urlsplit
+
+from tornado import concurrent
+
+from deepstreampy.client import Client
+from deepstreampy.constants import actions as action_constants
+from deepstreampy.message.connection import Connection
+from deepstreampy.record import AnonymousRecord
+
+_WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+_OPCODE_CONTINUATION = 0x0
+_OPCODE_TEXT = 0x1
+_OPCODE_BINARY = 0x2
+_OPCODE_CLOSE = 0x8
+_OPCODE_PING = 0x9
+_OPCODE_PONG = 0xA
+
+
+class WebSocketError(Exception):
+    pass
+
+
+class AsyncioLoop(object):
+    """The subset of the tornado IOLoop API used by the client, run on an
+    asyncio event loop."""
+
+    def __init__(self, loop=None):
+        self.asyncio_loop = loop or asyncio.get_event_loop()
+
+    def time(self):
+        return self.asyncio_loop.time()
+
+    def call_later(self, delay, callback, *args, **kwargs):
+        if kwargs:
+            callback = partial(callback, **kwargs)
+        return self.asyncio_loop.call_later(delay, callback, *args)
+
+    def call_at(self, when, callback, *args, **kwargs):
+        if kwargs:
+            callback = partial(callback, **kwargs)
+        return self.asyncio_loop.call_at(when, callback, *args)
+
+    def remove_timeout(self, timeout):
+        if timeout is not None:
+            timeout.cancel()
+
+    def add_callback(self, callback, *args, **kwargs):
+        if kwargs:
+            callback = partial(callback, **kwargs)
+        self.asyncio_loop.call_soon(callback, *args)
+
+    def start(self):
+        self.asyncio_loop.run_forever()
+
+    def stop(self):
+        self.asyncio_loop.stop()
+
+
+def _apply_mask(mask, data):
+    length = len(data)
+    if not length:
+        return data
+    key = int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+    return (int.from_bytes(data, 'big') ^ key).to_bytes(length, 'big')
+
+
+def _build_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack('!BB', 0x80 | opcode, 0x80 | length)
+    elif length < 65536:
+        header = struct.pack('!BBH', 0x80 | opcode, 0x80 | 126, length)
+    else:
+        header = struct.pack('!BBQ', 0x80 | opcode, 0x80 | 127, length)
+    mask = os.urandom(4)
+    return header + mask + _apply_mask(mask, payload)
+
+
+class WebSocketHandler(object):
+    """Client side of a websocket connection on asyncio streams.
+
+    Has the same ``write_message``/``close``/``stream.closed()`` interface as
+    tornado's ``WebSocketClientConnection``, so ``Connection`` can use either.
+    Messages are only read once ``start`` is called.
+    """
+
+    def __init__(self, reader, writer, on_message_callback, loop=None,
+                 write_buffer_limit=65536):
+        self._reader = reader
+        self._writer = writer
+        self._on_message_callback = on_message_callback
+        self._write_buffer_limit = write_buffer_limit
+        self._loop = loop or asyncio.get_event_loop()
+        self._closed = False
+        self._close_sent = False
+        self._abort_timeout = None
+        self._drain_future = None
+        self._read_task = None
+
+    def start(self):
+        if self._read_task is None:
+            self._read_task = self._loop.create_task(self._read_frames())
+
+    @property
+    def stream(self):
+        return self
+
+    def closed(self):
+        return self._closed or self._close_sent
+
+    def write_message(self, message, binary=False):
+        """Write a message as a single frame.
+
+        Returns:
+            tornado.concurrent.Future: Resolves once the transport's buffer is
+                below ``write_buffer_limit`` bytes
+        """
+        if self._closed or self._close_sent:
+            raise WebSocketError("Websocket closed")
+        if not isinstance(message, bytes):
+            message = message.encode('utf-8')
+
+        self._writer.write(_build_frame(
+            _OPCODE_BINARY if binary else _OPCODE_TEXT, message))
+
+        if self._drain_future is not None:
+            return self._drain_future
+
+        future = concurrent.Future()
+        if (self._writer.transport.get_write_buffer_size() <=
+                self._write_buffer_limit):
+            future.set_result(None)
+        else:
+            # StreamWriter.drain() allows only one waiter at a time
+            self._drain_future = future
+            self._loop.create_task(self._writer.drain()).add_done_callback(
+                self._on_drained)
+        return future
+
+    def _on_drained(self, task):
+        future, self._drain_future = self._drain_future, None
+        if task.cancelled() or task.exception() is None:
+            future.set_result(None)
+        else:
+            future.set_exception(task.exception())
+
+    def close(self, code=1000, reason=''):
+        """Send a close frame, and abort the connection if the server does not
+        close it within 5 seconds."""
+        if self._closed or self._close_sent:
+            return
+        self._close_sent = True
+        self._writer.write(_build_frame(
+            _OPCODE_CLOSE, struct.pack('!H', code) + reason.encode('utf-8')))
+        self._abort_timeout = self._loop.call_later(5, self._writer.close)
+
+    async def _read_frames(self):
+        reader = self._reader
+        fragments = []
+        fragment_opcode = None
+        try:
+            while True:
+                first, second = await reader.readexactly(2)
+                fin = first & 0x80
+                opcode = first & 0x0F
+                length = second & 0x7F
+                if length == 126:
+                    length, = struct.unpack('!H', await reader.readexactly(2))
+                elif length == 127:
+                    length, = struct.unpack('!Q', await reader.readexactly(8))
+                if second & 0x80:
+                    mask = await reader.readexactly(4)
+                    payload = _apply_mask(mask, await reader.readexactly(length))
+                else:
+                    payload = await reader.readexactly(length)
+
+                if opcode == _OPCODE_CLOSE:
+                    if not self._close_sent:
+                        self._close_sent = True
+                        self._writer.write(_build_frame(_OPCODE_CLOSE,
+                                                        payload[:2]))
+                    break
+                elif opcode == _OPCODE_PING:
+                    self._writer.write(_build_frame(_OPCODE_PONG, payload))
+                    continue
+                elif opcode == _OPCODE_PONG:
+                    continue
+                elif opcode == _OPCODE_CONTINUATION:
+                    fragments.append(payload)
+                    if not fin:
+                        continue
+                    payload = b''.join(fragments)
+                    opcode = fragment_opcode
+                    fragments = []
+                elif not fin:
+                    fragments = [payload]
+                    fragment_opcode = opcode
+                    continue
+
+                if opcode == _OPCODE_TEXT:
+                    payload = payload.decode('utf-8')
+                self._on_message_callback(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._closed = True
+            if self._abort_timeout is not None:
+                self._abort_timeout.cancel()
+            self._writer.close()
+            self._on_message_callback(None)
+
+
+async def websocket_connect(url, on_message_callback):
+    """Open a websocket connection on the running event loop.
+
+    Args:
+        url (str): A ``ws://`` or ``wss://`` url
+        on_message_callback (callable): Called with every message received,
+            and with None once the connection is closed
+
+    Returns:
+        WebSocketHandler: The open connection, call its ``start`` method to
+            receive messages
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ('ws', 'wss'):
+        raise ValueError("Unsupported websocket url {0}".format(url))
+    secure = parts.scheme == 'wss'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+
+    # Called from a coroutine, this is the running loop
+    loop = asyncio.get_event_loop()
+    reader, writer = await asyncio.open_connection(
+        parts.hostname, port, ssl=secure or None)
+
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    writer.write((
+        "GET {0} HTTP/1.1\r\n"
+        "Host: {1}:{2}\r\n"
+        "Upgrade: websocket\r\n"
+        "Connection: Upgrade\r\n"
+        "Sec-WebSocket-Key: {3}\r\n"
+        "Sec-WebSocket-Version: 13\r\n"
+        "\r\n").format(path, parts.hostname, port, key).encode('latin-1'))
+
+    try:
+        status_line = await reader.readline()
+        status = status_line.split(b' ', 2)
+        if len(status) < 2 or status[1] != b'101':
+            raise WebSocketError("Websocket handshake failed: {0}".format(
+                status_line.decode('latin-1').strip()))
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        accept = base64.b64encode(hashlib.sha1(
+            (key + _WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        if headers.get('sec-websocket-accept') != accept:
+            raise WebSocketError("Invalid Sec-WebSocket-Accept header")
+    except Exception:
+        writer.close()
+        raise
+
+    return WebSocketHandler(reader, writer, on_message_callback, loop)
+
+
+class AsyncioConnection(Connection):
+    """``Connection`` running on an asyncio event loop.
+
+    The ``loop`` option selects the event loop, by default the current one is
+    used. permessage-deflate compression is not supported.
+    """
+
+    def __init__(self, client, url, **options):
+        if options.get('compression', False):
+            raise ValueError(
+                "Compression is not supported by the asyncio transport")
+        super(AsyncioConnection, self).__init__(client, url, **options)
+
+    def _get_io_loop(self, options):
+        return AsyncioLoop(options.get('loop'))
+
+    def _open_websocket(self, url, callback, on_message_callback):
+        if self._transport is not None:
+            return super(AsyncioConnection, self)._open_websocket(
+                url, callback, on_message_callback)
+
+        task = self._io_loop.asyncio_loop.create_task(
+            websocket_connect(url, on_message_callback))
+
+        def on_connect(task):
+            callback(task)
+            # Only read once the connection knows about the handler, the
+            # server may have sent its first messages already
+            if not task.cancelled() and task.exception() is None:
+                task.result().start()
+
+        task.add_done_callback(on_connect)
+        return task
+
+
+def _wrap_future(future, loop):
+    """Return an asyncio future copying the result of a tornado future."""
+    aio_future = loop.create_future()
+
+    def copy(future):
+        if aio_future.cancelled():
+            return
+        exception = future.exception()
+        if exception is not None:
+            aio_future.set_exception(exception)
+        else:
+            aio_future.set_result(future.result())
+
+    future.add_done_callback(copy)
+    return aio_future
+
+
+async def _result(future, loop):
+    if future.done():
+        return future.result()
+    return await _wrap_future(future, loop)
+
+
+class AsyncClient(Client):
+    """deepstream.io client on asyncio with async/await methods.
+
+    ``connect``, ``login`` and ``drain`` are coroutines, as are ``get_record``,
+    ``get_list`` and ``get_anonymous_record`` of ``record``, ``make`` of
+    ``rpc`` and ``get_all`` and ``get`` of ``presence``. Everything else behaves like
+    ``deepstreampy.client.Client``.
+    """
+
+    _connection_class = AsyncioConnection
+
+    def __init__(self, url, loop=None, **options):
+        """Creates the client but doesn't connect to the server.
+
+        Args:
+            url (str or list): The url to connect to, or a list of urls to
+                fail over between
+            loop: The asyncio event loop, defaults to the current one
+            options: The options for the client
+        """
+        super(AsyncClient, self).__init__(url, loop=loop, **options)
+        self._loop = self._connection.io_loop.asyncio_loop
+        self._async_record = _AsyncRecordHandler(self._record, self._loop)
+        self._async_rpc = _AsyncRPCHandler(self._rpc, self._loop)
+        self._async_presence = _AsyncPresenceHandler(self._presence,
+                                                     self._loop)
+
+    async def connect(self, callback=None):
+        future = self._connection.connect(callback)
+        if concurrent.is_future(future):
+            # selectFastestServer resolves a tornado future
+            await _result(future, self._loop)
+        else:
+            await future
+
+    async def login(self, auth_params):
+        return await _result(self._connection.authenticate(auth_params),
+                             self._loop)
+
+    async def drain(self):
+        await _result(self._connection.drain(), self._loop)
+
+    @property
+    def record(self):
+        return self._async_record
+
+    @property
+    def rpc(self):
+        return self._async_rpc
+
+    @property
+    def presence(self):
+        return self._async_presence
+
+    @property
+    def loop(self):
+        return self._loop
+
+
+class _AsyncHandler(object):
+
+    def __init__(self, handler, loop):
+        self._handler = handler
+        self._loop = loop
+
+    def __getattr__(self, name):
+        return getattr(self._handler, name)
+
+
+class _AsyncRecordHandler(_AsyncHandler):
+
+    async def get_anonymous_record(self):
+        return AnonymousRecord(self._handler)
+
+    async def get_record(self, name):
+        record = self._handler._get_record(name)
+        await _result(record._send_read(), self._loop)
+        return record
+
+    async def get_list(self, name):
+        _list = self._handler._get_list(name)
+        await _result(_list._send_read(), self._loop)
+        return _list
+
+
+class _AsyncRPCHandler(_AsyncHandler):
+
+    async def make(self, name, data):
+        return await _result(self._handler._make(name, data), self._loop)
+
+
+class _AsyncPresenceHandler(_AsyncHandler):
+
+    async def get_all(self):
+        return await _result(
+            self._handler._query([action_constants.QUERY]), self._loop)
+
+    async def get(self, users):
+        return await _result(self._handler._query(users), self._loop)
@@ -2,11 +2,14 @@ from __future__ import absolute_import, division, print_function, with_statement
 from __future__ import unicode_literals
 
 from deepstreampy.message import connection
+from deepstreampy.message.codec import get_codec
 from deepstreampy import constants
 from deepstreampy.record import RecordHandler
 from deepstreampy.event import EventHandler
 from deepstreampy.rpc import RPCHandler
 from deepstreampy.presence import PresenceHandler
+from deepstreampy.timer_wheel import TimerWheel
+from deepstreampy.utils import ResubscriptionManager
 
 from pyee import EventEmitter
 from tornado import gen
@@ -17,7 +20,8 @@ def connect(url, **options):
     """Establish a connection to a deepstream.io server.
 
     Args:
-        url (string): URL to connect to
+        url (str or list): URL to connect to, or a list of URLs to fail over
+            between
         **options: The options for the client
 
     Returns:
@@ -31,20 +35,52 @@ def connect(url, **options):
     raise gen.Return(client)
 
 
+def emit_error(emitter, topic, event, msg=None):
+    """Emit an error on ``emitter``, or raise it if nobody is listening.
+
+    Listeners receive ``error`` with ``(msg, event, topic)`` and ``event`` with
+    ``(topic, msg)``.
+
+    Raises:
+        ValueError: If ``emitter`` has no ``error`` listeners.
+    """
+    if emitter.listeners('error'):
+        emitter.emit('error', msg, event, topic)
+        emitter.emit(event, topic, msg)
+    else:
+        raw_error_message = event + ': ' + msg
+
+        if topic:
+            raw_error_message += ' (' + topic + ')'
+
+        raise ValueError(raw_error_message)
+
+
 class Client(EventEmitter):
     """
     deepstream.io Python client based on tornado.
     """
 
+    _connection_class = connection.Connection
+
     def __init__(self, url, **options):
         """Creates the client but doesn't connect to the server.
 
         Args:
-            url (str): The url to connect to
+            url (str or list): The url to connect to. If a list of urls is
+                given, reconnection attempts go through them in turn, and with
+                the ``selectFastestServer`` option the first connection is made
+                to whichever server completes its handshake first.
             options
         """
         super(Client, self).__init__()
-        self._connection = connection.Connection(self, url, **options)
+        # Resolved once for the connection and all handlers
+        options['jsonCodec'] = get_codec(options.get('jsonCodec'))
+        self._connection = self._connection_class(self, url, **options)
+        self._timer_wheel = TimerWheel(self._connection.io_loop,
+                                       options.get('timerResolution', 0.01))
+        self._resubscriptions = ResubscriptionManager(
+            self, self._connection, **options)
         self._presence = PresenceHandler(self._connection, self, **options)
         self._event = EventHandler(self._connection, self, **options)
         self._rpc = RPCHandler(self._connection, self, **options)
@@ -64,6 +100,7 @@ class Client(EventEmitter):
             constants.topic.RECORD] = self._record.handle
 
         self._message_callbacks[constants.topic.ERROR] = self._on_error
+        self._connection.set_topic_handlers(self._message_callbacks)
 
     def connect(self, callback=None):
         """Establishes a connection to the url given to the constructor.
@@ -82,6 +119,21 @@ class Client(EventEmitter):
     def close(self):
         self._connection.close()
 
+    def drain(self):
+        """Wait for buffered outgoing messages to be written.
+
+        Producers sending large amounts of data can use this to pace
+        themselves. Once more than ``writeHighWatermark`` bytes (1 MiB by
+        default) are queued or waiting to be written, the client stops being
+        ``writable`` and emits ``writeBufferHigh``. When the buffer falls below
+        ``writeLowWatermark`` bytes (a quarter of the high watermark by
+        default) it emits ``writeBufferDrained``.
+
+        Returns:
+            tornado.concurrent.Future: Resolves when the client is writable
+        """
+        return self._connection.drain()
+
     def login(self, auth_params):
         """Sends authentication parameters to the server.
 
@@ -99,8 +151,9 @@ class Client(EventEmitter):
         return self._connection.authenticate(auth_params)
 
     def _on_message(self, message):
-        if message['topic'] in self._message_callbacks:
-            self._message_callbacks[message['topic']](message)
+        callback = self._message_callbacks.get(message.topic)
+        if callback is not None:
+            callback(message)
             return
         else:
             self._on_error(message['topic'],
@@ -126,16 +179,7 @@ class Client(EventEmitter):
                                                 constants.topic.ERROR,
                                                 error_msg))
 
-        if self.listeners('error'):
-            self.emit('error', msg, event, topic)
-            self.emit(event, topic, msg)
-        else:
-            raw_error_message = event + ': ' + msg
-
-            if topic:
-                raw_error_message += ' (' + topic + ')'
-
-            raise ValueError(raw_error_message)
+        emit_error(self, topic, event, msg)
 
     @property
     def connection_state(self):
@@ -157,6 +201,53 @@ class Client(EventEmitter):
     def presence(self):
         return self._presence
 
+    @property
+    def codec(self):
+        """The JSON codec of the ``jsonCodec`` option, see
+        ``deepstreampy.message.codec``."""
+        return self._connection.codec
+
     @property
     def io_loop(self):
         return self._connection.io_loop
+
+    @property
+    def timer_wheel(self):
+        """deepstreampy.timer_wheel.TimerWheel: Schedules the timeouts of
+        records, RPCs, listeners and acknowledgements."""
+        return self._timer_wheel
+
+    @property
+    def resubscriptions(self):
+        """deepstreampy.utils.ResubscriptionManager: Replays subscriptions
+        after the connection was lost."""
+        return self._resubscriptions
+
+    @property
+    def writable(self):
+        """bool: Whether the outgoing buffer is below the high watermark, see
+        ``drain``."""
+        return self._connection.writable
+
+    @property
+    def compression_stats(self):
+        """dict: Byte counters of permessage-deflate compression, or None if
+        the ``compression`` option is not enabled.
+
+        Compression is negotiated when the client is created with
+        ``compression=True``. ``compressionLevel`` and ``compressionMemLevel``
+        are passed to zlib, and frames smaller than ``compressionThreshold``
+        bytes are sent uncompressed.
+        """
+        return self._connection.compression_stats
+
+    @property
+    def rtt(self):
+        """deepstreampy.histogram.LatencyHistogram: Round-trip times to the
+        server.
+
+        Only measured if the client is created with the ``pingInterval``
+        option, in which case a ping is sent every ``pingInterval`` seconds
+        while the connection is open. Requires a server that answers pings.
+        """
+        return self._connection.rtt
@@ -1,5 +1,10 @@
 CONNECTION_ERROR = 'connectionError'
 CONNECTION_STATE_CHANGED = 'connectionStateChanged'
+WRITE_BUFFER_HIGH = 'writeBufferHigh'
+WRITE_BUFFER_DRAINED = 'writeBufferDrained'
+RESUBSCRIBE_PROGRESS = 'resubscribeProgress'
+RESUBSCRIBE_COMPLETE = 'resubscribeComplete'
+RECORD_WRITES_CONFLATED = 'recordWritesConflated'
 MAX_RECONNECTION_ATTEMPTS_REACHED = 'MAX_RECONNECTION_ATTEMPTS_REACHED'
 CONNECTION_AUTHENTICATION_TIMEOUT = 'CONNECTION_AUTHENTICATION_TIMEOUT'
 ACK_TIMEOUT = 'ACK_TIMEOUT'
@@ -15,6 +20,7 @@ MESSAGE_PERMISSION_ERROR = 'MESSAGE_PERMISSION_ERROR'
 LISTENER_EXISTS = 'LISTENER_EXISTS'
 NOT_LISTENING = 'NOT_LISTENING'
 TOO_MANY_AUTH_ATTEMPTS = 'TOO_MANY_AUTH_ATTEMPTS'
+INVALID_AUTHENTICATION_DETAILS = 'INVALID_AUTHENTICATION_DETAILS'
 IS_CLOSED = 'IS_CLOSED'
 RECORD_NOT_FOUND = 'RECORD_NOT_FOUND'
 NOT_SUBSCRIBED = 'NOT_SUBSCRIBED'
@@ -0,0 +1,7 @@
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+REJECT = 'reject'
+DROP_OLDEST = 'dropOldest'
+DROP_OLDEST_PER_TOPIC = 'dropOldestPerTopic'
+CONFLATE = 'conflate'
@@ -8,6 +8,7 @@ from deepstreampy.constants import topic as topic_constants
 from deepstreampy.constants import event as event_constants
 from deepstreampy.message import message_parser
 from deepstreampy.message import message_builder
+from deepstreampy.message.codec import get_codec
 from deepstreampy.utils import Listener
 from deepstreampy.utils import AckTimeoutRegistry
 from deepstreampy.utils import ResubscribeNotifier
@@ -27,6 +28,8 @@ class EventHandler(object):
         self._client = client
         self._emitter = EventEmitter()
         self._listener = {}
+        self._lazy_payloads = options.get('lazyPayloads', False)
+        self._codec = get_codec(options.get('jsonCodec'))
 
         subscription_timeout = options.get("subscriptionTimeout", 15)
         self._ack_timeout_registry = AckTimeoutRegistry(client,
@@ -45,6 +48,9 @@ class EventHandler(object):
             name (str): The name of the event.
             callback (callable): The function to call when an event is received.
 
+        Returns:
+            tornado.concurrent.Future: Resolves once the subscription is sent,
+                which happens only after logging in.
         """
         future = None
         if not self._emitter.listeners(name):
@@ -95,7 +101,7 @@ class EventHandler(object):
         """
         future = self._connection.send_message(
             topic_constants.EVENT, actions.EVENT,
-            [name, message_builder.typed(data)])
+            [name, message_builder.typed(data, self._codec)])
 
         self._emitter.emit(name, data)
 
@@ -175,9 +181,14 @@ class EventHandler(object):
             name = message['data'][0]
 
         if action == actions.EVENT:
+            # Payloads of events nobody listens to are never decoded
+            if not self._emitter._events.get(name):
+                return
             if data and len(data) == 2:
                 self._emitter.emit(
-                    name, message_parser.convert_typed(data[1], self._client))
+                    name, message_parser.convert_typed(
+                        data[1], self._client, self._lazy_payloads,
+                        self._codec))
             else:
                 self._emitter.emit(name)
 
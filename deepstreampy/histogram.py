@@ -0,0 +1,103 @@
+"""Histogram of round-trip times measured by the client."""
+
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from bisect import bisect_left
+
+# Upper bounds of the buckets in seconds, the last bucket has no upper bound
+DEFAULT_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                  1, 2.5, 5, 10)
+
+
+class LatencyHistogram(object):
+    """Counts measured latencies in fixed buckets.
+
+    Recording a value is O(log buckets) and the memory used does not grow with
+    the number of values, so it can be kept for the lifetime of the client.
+    """
+
+    def __init__(self, bounds=DEFAULT_BOUNDS):
+        self._bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._count = 0
+        self._sum = 0
+        self._min = None
+        self._max = None
+        self._last = None
+
+    def record(self, value):
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self._count += 1
+        self._sum += value
+        self._last = value
+        if self._min is None or value < self._min:
+            self._min = value
+        if self._max is None or value > self._max:
+            self._max = value
+
+    def percentile(self, percent):
+        """Estimate a percentile from the buckets.
+
+        Args:
+            percent (float): Between 0 and 100
+
+        Returns:
+            float: The upper bound of the bucket the percentile falls into,
+                capped at the largest recorded value, or None if nothing was
+                recorded
+        """
+        if not self._count:
+            return None
+
+        rank = percent / 100 * self._count
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if count and seen >= rank:
+                if index < len(self._bounds):
+                    return min(self._bounds[index], self._max)
+                return self._max
+        return self._max
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def min(self):
+        return self._min
+
+    @property
+    def max(self):
+        return self._max
+
+    @property
+    def last(self):
+        """float: The most recently recorded value."""
+        return self._last
+
+    @property
+    def mean(self):
+        if self._count:
+            return self._sum / self._count
+
+    @property
+    def buckets(self):
+        """list: ``(upper_bound, count)`` for every bucket, the upper bound of
+        the last one is ``float('inf')``."""
+        return list(zip(self._bounds + (float('inf'),), self._counts))
+
+    def as_dict(self):
+        return {'count': self._count,
+                'min': self._min,
+                'max': self._max,
+                'mean': self.mean,
+                'last': self._last,
+                'p50': self.percentile(50),
+                'p90': self.percentile(90),
+                'p99': self.percentile(99),
+                'buckets': self.buckets}
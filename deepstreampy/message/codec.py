@@ -0,0 +1,122 @@
+"""JSON codecs used to encode and decode messages.
+
+Every codec writes compact JSON without escaping non-ASCII characters, so the
+messages sent are the same whichever codec is used. Select one with the
+``jsonCodec`` option of the client:
+
+    - ``'json'``: the standard library, the default
+    - ``'ujson'`` or ``'orjson'``: faster, if installed
+    - ``'auto'``: the fastest one installed
+    - an object with ``dumps(value, sort_keys=False)`` and ``loads(data)``
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.utils import str_types
+
+import json
+
+
+class JSONCodec(object):
+    """The standard library's ``json``."""
+
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(separators=(',', ':'),
+                                         ensure_ascii=False)
+        self._sorted_encoder = json.JSONEncoder(separators=(',', ':'),
+                                                ensure_ascii=False,
+                                                sort_keys=True)
+        self.loads = json.loads
+
+    def dumps(self, value, sort_keys=False):
+        if sort_keys:
+            return self._sorted_encoder.encode(value)
+        return self._encoder.encode(value)
+
+
+class UJSONCodec(object):
+
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+        self.loads = ujson.loads
+
+    def dumps(self, value, sort_keys=False):
+        return self._ujson.dumps(value, ensure_ascii=False, sort_keys=sort_keys,
+                                 escape_forward_slashes=False)
+
+
+class OrjsonCodec(object):
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS
+        self._sorted_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        self.loads = orjson.loads
+
+    def dumps(self, value, sort_keys=False):
+        return self._orjson.dumps(
+            value,
+            option=self._sorted_options if sort_keys else self._options
+        ).decode('utf-8')
+
+
+# Fastest first
+_codec_classes = [OrjsonCodec, UJSONCodec, JSONCodec]
+_codecs = {}
+
+default = _codecs[JSONCodec.name] = JSONCodec()
+
+
+def get_codec(codec=None):
+    """Returns the codec for the ``jsonCodec`` option.
+
+    Raises:
+        ValueError: If the codec is unknown or not installed
+    """
+    if codec is None:
+        return default
+    if not isinstance(codec, str_types):
+        return codec
+
+    if codec == 'auto':
+        for codec_class in _codec_classes:
+            try:
+                return get_codec(codec_class.name)
+            except ValueError:
+                pass
+
+    if codec not in _codecs:
+        for codec_class in _codec_classes:
+            if codec_class.name == codec:
+                try:
+                    _codecs[codec] = codec_class()
+                except ImportError:
+                    raise ValueError(
+                        "JSON codec {0} is not installed".format(codec))
+                break
+        else:
+            raise ValueError("Unknown JSON codec {0}".format(codec))
+
+    return _codecs[codec]
+
+
+def available_codecs():
+    """Returns:
+        list: The names of the installed codecs, fastest first
+    """
+    names = []
+    for codec_class in _codec_classes:
+        try:
+            get_codec(codec_class.name)
+        except ValueError:
+            continue
+        names.append(codec_class.name)
+    return names
@@ -0,0 +1,116 @@
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+import warnings
+import zlib
+
+
+class Compression(object):
+    """permessage-deflate settings and byte counters of a connection.
+
+    Frames smaller than ``threshold`` bytes are sent uncompressed, which the
+    extension allows on a per-frame basis.
+    """
+
+    def __init__(self, level=6, mem_level=8, threshold=256):
+        self.level = level
+        self.mem_level = mem_level
+        self.threshold = threshold
+
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.uncompressed_bytes = 0
+
+        self._installed = False
+
+    @property
+    def options(self):
+        """dict: The ``compression_options`` for tornado's websocket."""
+        return {'compression_level': self.level, 'mem_level': self.mem_level}
+
+    @property
+    def stats(self):
+        """dict: Byte counters.
+
+            - raw_bytes: size of compressed frames before compression
+            - compressed_bytes: size of compressed frames after compression
+            - uncompressed_bytes: size of frames sent below the threshold
+        """
+        return {'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+                'uncompressed_bytes': self.uncompressed_bytes}
+
+    def install(self, websocket_handler):
+        """Take over compression of an open websocket connection.
+
+        Does nothing if the server did not agree to permessage-deflate. If
+        tornado's websocket does not look as expected, frames are sent
+        uncompressed and a ``RuntimeWarning`` is issued.
+        """
+        # tornado ignores the compression options on the client side, so its
+        # compressor is replaced with one that honours them. This relies on
+        # the private WebSocketProtocol13._compressor and the _compressor and
+        # _max_wbits of _PerMessageDeflateCompressor, as found in tornado
+        # 4.5.3 and 5.1.1.
+        self._installed = False
+        protocol = websocket_handler.protocol
+        if not hasattr(protocol, '_compressor'):
+            _warn_unsupported()
+            return
+
+        compressor = protocol._compressor
+        if compressor is None:
+            return
+
+        if not (hasattr(compressor, '_compressor') and
+                hasattr(compressor, '_max_wbits')):
+            _warn_unsupported()
+            protocol._compressor = None
+            return
+
+        protocol._compressor = _Compressor(
+            self, compressor._compressor is not None, compressor._max_wbits)
+        self._installed = True
+
+    def write(self, websocket_handler, data):
+        """Write a frame, compressing it only if it is large enough."""
+        if not self._installed or len(data) >= self.threshold:
+            return websocket_handler.write_message(data)
+
+        protocol = websocket_handler.protocol
+        compressor = protocol._compressor
+
+        self.uncompressed_bytes += len(data)
+        protocol._compressor = None
+        try:
+            return websocket_handler.write_message(data)
+        finally:
+            protocol._compressor = compressor
+
+
+def _warn_unsupported():
+    warnings.warn("Unsupported tornado version, permessage-deflate frames "
+                  "are sent uncompressed", RuntimeWarning)
+
+
+class _Compressor(object):
+
+    def __init__(self, compression, persistent, max_wbits):
+        self._compression = compression
+        self._max_wbits = max_wbits
+        self._compressobj = self._create_compressobj() if persistent else None
+
+    def _create_compressobj(self):
+        return zlib.compressobj(self._compression.level, zlib.DEFLATED,
+                                -self._max_wbits, self._compression.mem_level)
+
+    def compress(self, data):
+        compressobj = self._compressobj or self._create_compressobj()
+        compressed = (compressobj.compress(data) +
+                      compressobj.flush(zlib.Z_SYNC_FLUSH))
+        # The extension requires the trailing empty block to be stripped
+        compressed = compressed[:-4]
+
+        self._compression.raw_bytes += len(data)
+        self._compression.compressed_bytes += len(compressed)
+        return compressed
@@ -1,25 +1,35 @@
 from __future__ import absolute_import, division, print_function, with_statement
 from __future__ import unicode_literals
 
-from deepstreampy.utils import str_types
+from deepstreampy.utils import str_types, monotonic
 from deepstreampy import constants
+from deepstreampy.histogram import LatencyHistogram
 from deepstreampy.message import message_builder, message_parser
+from deepstreampy.message import send_queue
+from deepstreampy.message.codec import get_codec
+from deepstreampy.message.compression import Compression
+from deepstreampy.message.transport import get_transport
 
-from tornado import ioloop, concurrent, websocket, gen
+from tornado import ioloop, concurrent, gen
 
-from collections import deque
+from functools import partial
 import errno
-import time
+import random
+
+_PING_FRAME = message_builder.PING_MESSAGE.decode()
 
 
 class Connection(object):
 
     def __init__(self, client, url, **options):
-        self._io_loop = ioloop.IOLoop.current()
+        self._io_loop = self._get_io_loop(options)
 
         self._client = client
-        self._original_url = url
+        self._urls = list(url) if isinstance(url, (list, tuple)) else [url]
+        self._url_index = 0
+        self._original_url = self._urls[0]
         self._url = self._original_url
+        self._server_latencies = {}
         self._websocket_handler = None
 
         self._auth_params = None
@@ -27,18 +37,42 @@ class Connection(object):
         self._connect_callback = None
         self._connect_error = None
 
-        self._message_buffer = ""
+        self._trusted_server = options.get('trustedServer', False)
+        self._parser = message_parser.StreamParser(client,
+                                                   self._trusted_server)
+        self._topic_handlers = {
+            constants.topic.CONNECTION: self._handle_connection_response,
+            constants.topic.AUTH: self._handle_auth_response,
+        }
         self._deliberate_close = False
         self._redirecting = False
         self._too_many_auth_attempts = False
-        self._queued_messages = deque()
+        self._queued_messages = send_queue.PrioritySendQueue(
+            options.get('laneLimits'),
+            options.get('maxQueuedMessages'),
+            options.get('maxQueuedBytes'),
+            options.get('queueOverflowPolicy',
+                        constants.overflow_policies.REJECT),
+            self._on_writes_conflated)
+        self._flushing_queue = False
+        self._corked = 0
+        self._batch = None
+        self._batch_future = None
+        self._write_buffer_size = 0
+        self._write_paused = False
+        self._drain_future = None
         self._reconnect_timeout = None
         self._reconnection_attempt = 0
 
+        self._current_packet = []
+        self._current_packet_future = None
         self._current_packet_message_count = 0
         self._send_next_packet_timeout = None
-        self._last_heartbeat = None
+        self._last_received = None
         self._heartbeat_callback = None
+        self._ping_callback = None
+        self._ping_sent = None
+        self._rtt = LatencyHistogram()
 
         self._challenge_denied = False
         self._connection_auth_timeout = False
@@ -51,29 +85,134 @@ class Connection(object):
             'reconnectAttemptInterval', 4)
         self._max_reconnect_interval = options.get(
             'maxReconnectInterval', 18)
+        self._reconnect_backoff = options.get('reconnectBackoff', 'linear')
+        if self._reconnect_backoff not in ('linear', 'decorrelatedJitter'):
+            raise ValueError("Unknown reconnect backoff {0}".format(
+                self._reconnect_backoff))
+        self._reconnect_interval = self._reconnect_interval_increment
+        self._select_fastest_server = options.get('selectFastestServer', False)
         self._heartbeat_interval = options.get('heartbeatInterval', 100)
+        self._heartbeat_tolerance = self._heartbeat_interval * 2
+        self._ping_interval = options.get('pingInterval')
+        self._max_messages_per_packet = options.get('maxMessagesPerPacket', 1)
+        self._time_between_sending_queued_packages = options.get(
+            'timeBetweenSendingQueuedPackages', 0)
+        self._queue_flush_frame_size = options.get('queueFlushFrameSize',
+                                                   65536)
+        self._max_write_buffer_size = options.get('maxWriteBufferSize',
+                                                  1048576)
+        self._write_high_watermark = options.get('writeHighWatermark',
+                                                 self._max_write_buffer_size)
+        self._write_low_watermark = options.get(
+            'writeLowWatermark', self._write_high_watermark // 4)
+
+        if options.get('compression', False):
+            self._compression = Compression(
+                options.get('compressionLevel', 6),
+                options.get('compressionMemLevel', 8),
+                options.get('compressionThreshold', 256))
+        else:
+            self._compression = None
+
+        self._codec = get_codec(options.get('jsonCodec'))
+
+        self._transport = options.get('transport')
+        if self._transport is not None and self._compression:
+            raise ValueError("Compression is not supported with a transport")
 
     def connect(self, callback=None):
         self._connect_callback = callback
 
-        connect_future = websocket.websocket_connect(
-                self._url,
-                self._io_loop,
-                callback=self._on_open,
-                on_message_callback=self._on_data)
+        if self._select_fastest_server and len(self._urls) > 1:
+            # Only the first connection picks a server, reconnects go through
+            # the URLs in order of their latency.
+            self._select_fastest_server = False
+            return self._connect_fastest()
+
+        return self._open_websocket(self._url, self._on_open, self._on_data)
+
+    def _get_io_loop(self, options):
+        return ioloop.IOLoop.current()
+
+    def _open_websocket(self, url, callback, on_message_callback):
+        """Open a connection with the ``transport`` option, or else with the
+        transport for the scheme of the url, see
+        ``deepstreampy.message.transport``.
+
+        Args:
+            url (str): The url to connect to
+            callback (callable): Called with the connect future once the
+                handshake completes or fails
+            on_message_callback (callable): Called with every message received,
+                and with None once the connection is closed
+
+        Returns:
+            Future: Resolves with the handler of the connection
+        """
+        transport = self._transport or get_transport(
+            url, self._compression_options)
+        return transport.connect(url, self._io_loop, callback,
+                                 on_message_callback)
+
+    def _connect_fastest(self):
+        """Connect to every URL at once and keep the first connection that
+        completes its handshake."""
+        future = concurrent.Future()
+        candidates = {}
+        started = self._io_loop.time()
+
+        def on_message(url, data):
+            if candidates.get(url) is self._websocket_handler:
+                self._on_data(data)
+
+        def on_connect(url, f):
+            if f.exception() is None:
+                self._server_latencies[url] = self._io_loop.time() - started
+                candidates[url] = f.result()
+            else:
+                candidates[url] = None
+
+            if future.done():
+                if candidates[url] is not None:
+                    candidates[url].close()
+                return
 
-        return connect_future
+            if candidates[url] is not None or len(candidates) == len(self._urls):
+                # Failover tries the servers in order of their latency
+                self._urls.sort(key=lambda u: self._server_latencies.get(
+                    u, float('inf')))
+                self._url_index = self._urls.index(url)
+                self._url = url
+                self._on_open(f)
+                concurrent.chain_future(f, future)
+
+        for url in self._urls:
+            self._open_websocket(url, partial(on_connect, url),
+                                 partial(on_message, url))
+
+        return future
+
+    @property
+    def _compression_options(self):
+        return self._compression.options if self._compression else None
 
     def _check_heartbeat(self):
-        heartbeat_tolerance = self._heartbeat_interval * 2
-        elapsed = time.time() - self._last_heartbeat
-        if elapsed >= heartbeat_tolerance:
-            self._io_loop.remove_timeout(self._heartbeat_callback)
+        """Runs when the liveness deadline passes.
+
+        Any data received from the server proves the connection alive, so
+        ``_on_data`` only records the time and this moves the deadline to
+        ``heartbeatInterval * 2`` seconds after the last data received.
+        """
+        elapsed = monotonic() - self._last_received
+        if elapsed >= self._heartbeat_tolerance:
+            self._heartbeat_callback = None
             self._websocket_handler.close()
-            self._on_error("heartbeat not received in the last 1000 milliseconds")
+            self._on_error(
+                "heartbeat not received in the last {0:g} milliseconds"
+                .format(self._heartbeat_tolerance * 1000))
         else:
             self._heartbeat_callback = self._io_loop.call_later(
-                self._heartbeat_interval, self._check_heartbeat)
+                self._heartbeat_tolerance - elapsed, self._check_heartbeat)
 
     def _on_open(self, f):
         exception = f.exception()
@@ -85,24 +224,55 @@ class Connection(object):
 
             return
 
-        self._last_heartbeat = time.time()
+        self._last_received = monotonic()
+        self._stop_heartbeat()
         self._heartbeat_callback = self._io_loop.call_later(
-            self._heartbeat_interval, self._check_heartbeat)
+            self._heartbeat_tolerance, self._check_heartbeat)
 
         self._websocket_handler = f.result()
+        self._parser.reset()
+        if self._compression:
+            self._compression.install(self._websocket_handler)
         self._set_state(constants.connection_state.AWAITING_CONNECTION)
 
         if self._connect_callback:
             self._connect_callback()
 
-    def _on_error(self, error):
-        if self._heartbeat_callback:
+    def _stop_heartbeat(self):
+        if self._heartbeat_callback is not None:
             self._io_loop.remove_timeout(self._heartbeat_callback)
+            self._heartbeat_callback = None
+
+    def _start_pinging(self):
+        if self._ping_interval and self._ping_callback is None:
+            self._ping_callback = self._io_loop.call_later(
+                self._ping_interval, self._send_ping)
+
+    def _stop_pinging(self):
+        if self._ping_callback is not None:
+            self._io_loop.remove_timeout(self._ping_callback)
+            self._ping_callback = None
+        self._ping_sent = None
+
+    def _send_ping(self):
+        """Send a ping, unless the previous one is still unanswered, and
+        record the time until the server's pong in ``rtt``."""
+        self._ping_callback = self._io_loop.call_later(
+            self._ping_interval, self._send_ping)
+
+        if self._ping_sent is None:
+            self._ping_sent = monotonic()
+            self.send(message_builder.PING_MESSAGE)
+
+    def _on_error(self, error):
+        self._stop_heartbeat()
+        self._stop_pinging()
         self._set_state(constants.connection_state.ERROR)
 
         if isinstance(error, str_types):
             msg = error
-        elif error.errno in (errno.ECONNRESET, errno.ECONNREFUSED):
+        elif getattr(error, 'errno', None) in (errno.ECONNRESET,
+                                               errno.ECONNREFUSED):
             msg = ("Can't connect! Deepstream server unreachable on " +
                    self._url)
         else:
@@ -118,8 +288,9 @@ class Connection(object):
         self._io_loop.stop()
 
     def close(self):
-        if self._heartbeat_callback:
-            self._io_loop.remove_timeout(self._heartbeat_callback)
+        self._stop_heartbeat()
+        self._stop_pinging()
+        self._send_packet()
         self._deliberate_close = True
         if self._websocket_handler:
             self._websocket_handler.close()
@@ -154,11 +325,12 @@ class Connection(object):
 
     def _send_auth_params(self):
         self._set_state(constants.connection_state.AUTHENTICATING)
-        raw_auth_message = message_builder.get_message(
+        raw_auth_message = message_builder.get_message_bytes(
             constants.topic.AUTH,
             constants.actions.REQUEST,
-            [self._auth_params])
-        self._websocket_handler.write_message(raw_auth_message.encode())
+            [self._auth_params],
+            self._codec)
+        self._write(raw_auth_message)
 
     def _handle_auth_response(self, message):
         message_data = message['data']
@@ -183,7 +355,15 @@ class Connection(object):
                      'message': auth_data})
 
         elif message_action == constants.actions.ACK:
+            # The connection only counts as recovered once authenticated
+            self._reconnection_attempt = 0
+            self._reconnect_interval = self._reconnect_interval_increment
             self._set_state(constants.connection_state.OPEN)
+            self._start_pinging()
+
+            # Everything sent before authentication goes out before anything
+            # sent by callbacks of the auth future
+            self._send_queued_messages()
 
             auth_data = (self._get_auth_data(message_data[0]) if
                          data_size else None)
@@ -193,22 +373,21 @@ class Connection(object):
                 self._auth_future.set_result(
                     {'success': True, 'error': None, 'message': auth_data})
 
-            self._send_queued_messages()
-
     def _handle_connection_response(self, message):
         action = message['action']
         data = message['data']
         if action == constants.actions.PING:
-            self._last_heartbeat = time.time()
-            ping_response = message_builder.get_message(
-                constants.topic.CONNECTION, constants.actions.PONG)
-            self.send(ping_response)
+            self.send(message_builder.PONG_MESSAGE)
+        elif action == constants.actions.PONG:
+            if self._ping_sent is not None:
+                self._rtt.record(monotonic() - self._ping_sent)
+                self._ping_sent = None
         elif action == constants.actions.ACK:
             self._set_state(constants.connection_state.AWAITING_AUTHENTICATION)
             if self._auth_params is not None:
                 self._send_auth_params()
         elif action == constants.actions.CHALLENGE:
-            challenge_response = message_builder.get_message(
+            challenge_response = message_builder.get_message_bytes(
                 constants.topic.CONNECTION,
                 constants.actions.CHALLENGE_RESPONSE,
                 [self._url])
@@ -230,7 +409,12 @@ class Connection(object):
 
     def _get_auth_data(self, data):
         if data:
-            return message_parser.convert_typed(data, self._client)
+            return message_parser.convert_typed(data, self._client,
+                                                codec=self._codec)
+
+    def _on_writes_conflated(self, name, version, new_version):
+        self._client.emit(constants.event.RECORD_WRITES_CONFLATED, name,
+                          version, new_version)
 
     def _set_state(self, state):
         self._state = state
@@ -254,79 +438,346 @@ class Connection(object):
     def io_loop(self):
         return self._io_loop
 
+    @property
+    def buffered_bytes(self):
+        """int: Size of the messages that are queued or waiting in tornado's
+        write buffer."""
+        return self._write_buffer_size + self._queued_messages.bytes
+
+    @property
+    def writable(self):
+        """bool: False after the buffered messages exceed
+        ``writeHighWatermark`` bytes, until they fall below
+        ``writeLowWatermark``."""
+        return not self._write_paused
+
+    @property
+    def compression_stats(self):
+        """dict: Byte counters of permessage-deflate compression, or None if
+        compression is disabled."""
+        if self._compression:
+            return self._compression.stats
+
+    @property
+    def rtt(self):
+        """deepstreampy.histogram.LatencyHistogram: Round-trip times of the
+        pings sent every ``pingInterval`` seconds."""
+        return self._rtt
+
+    @property
+    def codec(self):
+        """The JSON codec of the ``jsonCodec`` option."""
+        return self._codec
+
     def send_message(self, topic, action, data):
-        message = message_builder.get_message(topic, action, data)
+        if self._corked:
+            # Built into the batch that ``uncork`` sends
+            if self._batch is None:
+                self._batch = message_builder.MessageBatch(self._codec)
+                self._batch_future = concurrent.Future()
+            self._batch.add(topic, action, data)
+            return self._batch_future
+
+        message = message_builder.get_message_bytes(topic, action, data,
+                                                    self._codec)
         return self.send(message)
 
+    def send_batch(self, batch):
+        """Send the messages of a ``message_builder.MessageBatch``.
+
+        Once the connection is open and nothing is queued, the batch is
+        written as a single frame. Otherwise its messages are sent one by one,
+        see ``send``.
+
+        Returns:
+            tornado.concurrent.Future: Resolves once all messages of the batch
+                have been written
+        """
+        if not batch:
+            future = concurrent.Future()
+            future.set_result(None)
+            return future
+
+        if (self._state != constants.connection_state.OPEN or
+                self._must_queue()):
+            return gen.multi([self.send(raw_message)
+                              for raw_message in batch.messages()])
+
+        if self._current_packet:
+            # Sent after the messages already waiting for their packet
+            future = self._current_packet_future
+            self._current_packet.append(batch.build())
+            self._send_packet()
+            return future
+
+        return self._write(batch.build())
+
     def send(self, raw_message):
         """Main method for sending messages.
 
-        All messages are passed onto and handled by tornado.
+        All messages are passed onto and handled by tornado. If
+        ``maxMessagesPerPacket`` is greater than 1, messages are coalesced into
+        a single websocket frame, which is written once the packet is full or
+        at the end of the current IOLoop iteration (or after
+        ``timeBetweenSendingQueuedPackages`` seconds, if set).
+
+        Messages are queued until the connection is authenticated, and while
+        more than ``maxWriteBufferSize`` bytes are waiting to be written. Only
+        the connection handshake and authentication are sent right away.
+        Queued messages are sent in frames of up to ``queueFlushFrameSize``
+        bytes in order of priority, see ``send_queue.PrioritySendQueue``.
+
+        Args:
+            raw_message (str or bytes): The complete message, which is encoded
+                if it is not already
+
+        Returns:
+            tornado.concurrent.Future: Resolves once the frame containing the
+                message has been written. For a message queued before login
+                that is only after the login succeeded.
+        """
+        if not isinstance(raw_message, bytes):
+            raw_message = raw_message.encode('utf-8')
+
+        if self._must_queue(raw_message):
+            future = concurrent.Future()
+            self._queued_messages.push(raw_message, future)
+            # Corked messages are flushed all at once by ``uncork``
+            if not self._corked:
+                self._send_queued_messages()
+                self._update_write_state()
+            return future
+
+        if (self._max_messages_per_packet <= 1 or
+                self._state != constants.connection_state.OPEN):
+            return self._write(raw_message)
+
+        self._current_packet.append(raw_message)
+        self._current_packet_message_count += 1
+
+        if self._current_packet_future is None:
+            self._current_packet_future = concurrent.Future()
+        future = self._current_packet_future
+
+        if self._current_packet_message_count >= self._max_messages_per_packet:
+            self._send_packet()
+        elif self._send_next_packet_timeout is None:
+            self._send_next_packet_timeout = self._io_loop.call_later(
+                self._time_between_sending_queued_packages, self._send_packet)
+
+        return future
+
+    def _must_queue(self, raw_message=None):
+        if (self._websocket_handler is None or
+                self._websocket_handler.stream.closed()):
+            return True
+
+        if self._state != constants.connection_state.OPEN:
+            # Until authenticated only the handshake goes through, everything
+            # else is sent in one burst once the connection is open
+            return (raw_message is None or
+                    send_queue.get_lane(raw_message) > send_queue.ACKS)
+
+        # Once open, new messages must not overtake queued ones
+        return (bool(self._corked) or bool(self._queued_messages) or
+                self._write_buffer_size >= self._max_write_buffer_size)
+
+    def cork(self):
+        """Hold back all messages until ``uncork`` is called as many times,
+        so that many messages sent at once are written in as few frames as
+        possible.
+
+        Messages of ``send_message`` are built into a single
+        ``MessageBatch``, others are queued.
         """
-        if not self._websocket_handler.stream.closed():
-            return self._websocket_handler.write_message(raw_message.encode())
+        self._corked += 1
+
+    def uncork(self):
+        self._corked -= 1
+        if not self._corked:
+            self._send_queued_messages()
+            if self._batch is not None:
+                batch, future = self._batch, self._batch_future
+                self._batch = self._batch_future = None
+                concurrent.chain_future(self.send_batch(batch), future)
+            self._update_write_state()
+
+    def _send_packet(self):
+        """Write all messages of the current packet as a single frame."""
+        if self._send_next_packet_timeout is not None:
+            self._io_loop.remove_timeout(self._send_next_packet_timeout)
+            self._send_next_packet_timeout = None
+
+        if not self._current_packet:
+            return
+
+        messages = self._current_packet
+        future = self._current_packet_future
+
+        self._current_packet = []
+        self._current_packet_future = None
+        self._current_packet_message_count = 0
+
+        if self._must_queue():
+            for raw_message in messages:
+                self._queued_messages.push(raw_message, future)
         else:
+            # Every message already ends with the message separator, so the
+            # packet is simply their concatenation.
+            concurrent.chain_future(self._write(b"".join(messages)), future)
+
+    def _write(self, data):
+        if self._compression:
+            future = self._compression.write(self._websocket_handler, data)
+        else:
+            future = self._websocket_handler.write_message(data)
+
+        if concurrent.is_future(future):
+            self._write_buffer_size += len(data)
+            future.add_done_callback(partial(self._on_written, len(data)))
+            self._update_write_state()
+
+        return future
+
+    def _on_written(self, size, future):
+        self._write_buffer_size -= size
+        if self._queued_messages:
+            self._send_queued_messages()
+        self._update_write_state()
+
+    def _update_write_state(self):
+        if not self._write_paused:
+            if self.buffered_bytes >= self._write_high_watermark:
+                self._write_paused = True
+                self._client.emit(constants.event.WRITE_BUFFER_HIGH,
+                                  self.buffered_bytes)
+        elif self.buffered_bytes <= self._write_low_watermark:
+            self._write_paused = False
+            if self._drain_future:
+                self._drain_future.set_result(None)
+                self._drain_future = None
+            self._client.emit(constants.event.WRITE_BUFFER_DRAINED,
+                              self.buffered_bytes)
+
+    def drain(self):
+        """Wait until the buffered messages fall below the low watermark.
+
+        Returns:
+            tornado.concurrent.Future: Resolves immediately if writing is not
+                paused, otherwise once ``writeLowWatermark`` is reached
+        """
+        if not self._write_paused:
             future = concurrent.Future()
-            self._queued_messages.append((raw_message.encode(), future))
+            future.set_result(None)
             return future
 
-    @gen.coroutine
+        if self._drain_future is None:
+            self._drain_future = concurrent.Future()
+        return self._drain_future
+
     def _send_queued_messages(self):
-        if self._state != constants.connection_state.OPEN:
+        """Write the queued messages in frames of up to
+        ``queueFlushFrameSize`` bytes, while the write buffer has room."""
+        if (self._state != constants.connection_state.OPEN or
+                self._flushing_queue or self._corked):
             return
 
-        while self._queued_messages:
-            raw_message, future = self._queued_messages.popleft()
-            result = yield self._websocket_handler.write_message(raw_message)
-            future.set_result(result)
+        self._flushing_queue = True
+        try:
+            while (self._queued_messages and
+                   self._write_buffer_size < self._max_write_buffer_size):
+                frame, futures = self._queued_messages.pop_frame(
+                    self._queue_flush_frame_size)
+                send_queue.resolve_futures(futures, self._write(frame))
+        finally:
+            self._flushing_queue = False
 
     def _on_data(self, data):
         if data is None:
             self._on_close()
             return
-        full_buffer = self._message_buffer + data
-        split_buffer = full_buffer.rsplit(constants.message.MESSAGE_SEPERATOR,
-                                          1)
-        if len(split_buffer) > 1:
-            self._message_buffer = split_buffer[1]
-
-        raw_messages = split_buffer[0]
-
-        parsed_messages = message_parser.parse(raw_messages, self._client)
-
-        for msg in parsed_messages:
-            if msg is None:
-                continue
-            if msg['topic'] == constants.topic.CONNECTION:
-                self._handle_connection_response(msg)
-            elif msg['topic'] == constants.topic.AUTH:
-                self._handle_auth_response(msg)
+
+        self._last_received = monotonic()
+        # Pings arrive in frames of their own, answer them without parsing
+        if data == _PING_FRAME and not self._parser.incomplete:
+            self.send(message_builder.PONG_MESSAGE)
+            return
+
+        # The replies to a frame of many messages, like acks, are sent
+        # together
+        corked = data.count(constants.message.MESSAGE_SEPERATOR) > 1
+        if corked:
+            self.cork()
+        try:
+            if self._trusted_server:
+                self._dispatch_trusted(self._parser.feed(data))
+                return
+            for msg in self._parser.feed(data):
+                if msg.topic == constants.topic.CONNECTION:
+                    self._handle_connection_response(msg)
+                elif msg.topic == constants.topic.AUTH:
+                    self._handle_auth_response(msg)
+                else:
+                    self._client._on_message(msg)
+        finally:
+            if corked:
+                self.uncork()
+
+    def _dispatch_trusted(self, messages):
+        handlers = self._topic_handlers
+        on_message = self._client._on_message
+        for msg in messages:
+            handler = handlers.get(msg.topic)
+            if handler is not None:
+                handler(msg)
             else:
-                self._client._on_message(parsed_messages[0])
+                on_message(msg)
+
+    def set_topic_handlers(self, handlers):
+        """Dispatch messages of the given topics straight to their handlers
+        with the ``trustedServer`` option, rather than through the client.
+
+        Args:
+            handlers (dict): Maps topics to callables taking the message
+        """
+        self._topic_handlers.update(handlers)
 
     def _try_reconnect(self):
         if self._reconnect_timeout is not None:
             return
 
-        if self._reconnection_attempt < self._max_reconnect_attempts:
+        if (self._max_reconnect_attempts is None or
+                self._reconnection_attempt < self._max_reconnect_attempts):
             self._set_state(constants.connection_state.RECONNECTING)
 
-            interval = min(
-                (self._reconnect_interval_increment *
-                 self._reconnection_attempt),
-                self._max_reconnect_interval)
+            self._reconnect_timeout = self._io_loop.call_later(
+                self._get_reconnect_interval(), self._try_open)
 
             self._reconnection_attempt += 1
 
-            self._reconnect_timeout = self._io_loop.call_later(
-                interval, self._try_open)
-
         else:
             self._clear_reconnect()
             self.close()
 
+    def _get_reconnect_interval(self):
+        if self._reconnect_backoff == 'decorrelatedJitter':
+            # Decorrelated jitter keeps clients that lost their connection at
+            # the same time from reconnecting in lockstep.
+            self._reconnect_interval = min(
+                random.uniform(self._reconnect_interval_increment,
+                               self._reconnect_interval * 3),
+                self._max_reconnect_interval)
+            if self._reconnection_attempt == 0:
+                return random.uniform(0, self._reconnect_interval_increment)
+            return self._reconnect_interval
+
+        return min(self._reconnect_interval_increment *
+                   self._reconnection_attempt,
+                   self._max_reconnect_interval)
+
     def _try_open(self):
-        self._url = self._original_url
+        self._url_index = (self._url_index + 1) % len(self._urls)
+        self._url = self._urls[self._url_index]
         self.connect()
         self._reconnect_timeout = None
 
@@ -336,7 +787,8 @@ class Connection(object):
         self._reconnection_attempt = 0
 
     def _on_close(self):
-        self._io_loop.remove_timeout(self._heartbeat_callback)
+        self._stop_heartbeat()
+        self._stop_pinging()
 
         if self._redirecting:
             self._redirecting = False
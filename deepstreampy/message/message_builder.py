@@ -1,20 +1,27 @@
 from __future__ import absolute_import, division, print_function, with_statement
-from deepstreampy.constants import types
+from deepstreampy.constants import types, topic, actions
 from deepstreampy.constants import message as message_constants
-from deepstreampy.utils import Undefined
+from deepstreampy.message.codec import default as default_codec
+from deepstreampy.message.message_parser import TypedValue
+from deepstreampy.utils import Undefined, str_types
 import sys
-import json
 
 
-def get_message(topic, action, data=None):
+def get_message(topic, action, data=None, codec=None):
+    """Build a message.
+
+    Args:
+        codec: The JSON codec of dict parameters, see
+            ``deepstreampy.message.codec``
+    """
     send_data = [topic, action]
 
     if data:
         for param in data:
-            if isinstance(param, dict):
-                value = json.dumps(param,
-                                   separators=(',', ':'),
-                                   sort_keys=True)
+            if type(param) in str_types:
+                send_data.append(param)
+            elif isinstance(param, dict):
+                value = (codec or default_codec).dumps(param, sort_keys=True)
                 send_data.append(value)
             elif isinstance(param, list):
                 value = ("[" +
@@ -29,38 +36,150 @@ def get_message(topic, action, data=None):
     return full_message
 
 
-def typed(value):
-    if value is None:
-        return types.NULL
+_empty_messages = {}
+_prefixes = {}
+_MESSAGE_SEPERATOR_BYTES = message_constants.MESSAGE_SEPERATOR.encode()
+
+
+def get_message_bytes(topic, action, data=None, codec=None):
+    """Build a UTF-8 encoded message.
+
+    The message is built as text and encoded once as a whole, which is cheaper
+    than encoding each part. Messages without data are only encoded the first
+    time they are built, and messages with a single string, like most
+    subscriptions, reuse the encoded topic and action.
+
+    Returns:
+        bytes: The encoded message
+    """
+    if data:
+        if len(data) == 1 and type(data[0]) in str_types:
+            return (_get_prefix(topic, action) + data[0].encode('utf-8') +
+                    _MESSAGE_SEPERATOR_BYTES)
+        return get_message(topic, action, data, codec).encode('utf-8')
+
+    key = (topic, action)
+    message = _empty_messages.get(key)
+    if message is None:
+        message = get_message(topic, action).encode('utf-8')
+        _empty_messages[key] = message
+    return message
 
-    value_type = type(value)
 
-    if sys.version_info < (3,):
-        num_types = (int, long, float, complex)
-        str_types = (str, unicode)
-    else:
-        num_types = (int, float, complex)
-        str_types = (str,)
-    obj_types = (dict, list,)
+def _get_prefix(topic, action):
+    prefix = _prefixes.get((topic, action))
+    if prefix is None:
+        prefix = _prefixes[(topic, action)] = (
+            topic + message_constants.MESSAGE_PART_SEPERATOR +
+            action + message_constants.MESSAGE_PART_SEPERATOR).encode('utf-8')
+    return prefix
 
-    if value_type in str_types:
-        return types.STRING + value
 
-    if value_type in obj_types:
-        return types.OBJECT + json.dumps(value,
-                                         separators=(',', ':'),
-                                         sort_keys=False)
+class MessageBatch(object):
+    """Builds many messages into the payload of a single frame.
 
-    if value_type is bool:
-        if value:
-            return types.TRUE
+    Messages are encoded straight into one growing buffer, reusing the
+    encoded prefixes of ``get_message_bytes``. Send the batch with
+    ``Connection.send_batch``.
+    """
+
+    def __init__(self, codec=None):
+        """
+        Args:
+            codec: The JSON codec of dict parameters, see
+                ``deepstreampy.message.codec``
+        """
+        self._buffer = bytearray()
+        self._count = 0
+        self._codec = codec
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count > 0
+
+    __nonzero__ = __bool__
+
+    @property
+    def bytes(self):
+        """int: Size of the payload."""
+        return len(self._buffer)
+
+    def add(self, topic, action, data=None):
+        """Append a message, see ``get_message``."""
+        buffer = self._buffer
+        if data and len(data) == 1 and type(data[0]) in str_types:
+            buffer += _get_prefix(topic, action)
+            buffer += data[0].encode('utf-8')
+            buffer += _MESSAGE_SEPERATOR_BYTES
         else:
-            return types.FALSE
+            buffer += get_message_bytes(topic, action, data, self._codec)
+        self._count += 1
+
+    def build(self):
+        """Returns:
+            bytes: All messages, in the order they were added
+        """
+        return bytes(self._buffer)
+
+    def messages(self):
+        """Returns:
+            list: The encoded messages
+        """
+        # The separator can't occur within a message
+        return [raw_message + _MESSAGE_SEPERATOR_BYTES for raw_message in
+                bytes(self._buffer).split(_MESSAGE_SEPERATOR_BYTES)[:-1]]
+
+
+PING_MESSAGE = get_message_bytes(topic.CONNECTION, actions.PING)
+PONG_MESSAGE = get_message_bytes(topic.CONNECTION, actions.PONG)
+
+
+def _typed_string(value, codec):
+    return types.STRING + value
+
+
+def _typed_object(value, codec):
+    return types.OBJECT + (codec or default_codec).dumps(value)
+
+
+def _typed_number(value, codec):
+    return types.NUMBER + str(value)
+
+
+def _typed_bool(value, codec):
+    return types.TRUE if value else types.FALSE
+
+
+def _typed_value(value, codec):
+    return value.raw
+
+
+# Encoders by the exact type of the value, subclasses are not serialized
+_typed_encoders = {
+    dict: _typed_object,
+    list: _typed_object,
+    int: _typed_number,
+    float: _typed_number,
+    complex: _typed_number,
+    bool: _typed_bool,
+    TypedValue: _typed_value,
+}
+_typed_encoders.update((str_type, _typed_string) for str_type in str_types)
+if sys.version_info < (3,):
+    _typed_encoders[long] = _typed_number
+
+
+def typed(value, codec=None):
+    if value is None:
+        return types.NULL
 
-    if value_type in num_types:
-        return types.NUMBER + str(value)
+    encoder = _typed_encoders.get(type(value))
+    if encoder is not None:
+        return encoder(value, codec)
 
     if value is Undefined:
         return types.UNDEFINED
 
-    raise ValueError("Can't serialize type {0}".format(value_type))
+    raise ValueError("Can't serialize type {0}".format(type(value)))
@@ -3,11 +3,90 @@ from __future__ import unicode_literals
 
 from deepstreampy.constants import message as message_constants
 from deepstreampy.constants import topic, event, actions, types
+from deepstreampy.message.codec import default as default_codec
 
-import json
 import sys
 
 
+class Message(object):
+    """A parsed message.
+
+    Messages are accessed like the dicts they used to be, ``message['data']``
+    and ``message['processedError'] = True`` map to the attributes of the
+    same name. The raw message is only joined back together from its parts
+    when it is used, which is rare outside of errors.
+    """
+
+    __slots__ = ('topic', 'action', 'data', 'processedError')
+
+    # Item access is attribute access, without a call into Python code
+    __getitem__ = object.__getattribute__
+    __setitem__ = object.__setattr__
+
+    def __init__(self, topic, action, data):
+        self.topic = topic
+        self.action = action
+        self.data = data
+
+    @property
+    def raw(self):
+        return message_constants.MESSAGE_PART_SEPERATOR.join(
+            [self.topic, self.action] + self.data)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self):
+        """dict: The message as the dict it used to be."""
+        message = {'raw': self.raw, 'topic': self.topic,
+                   'action': self.action, 'data': self.data}
+        if hasattr(self, 'processedError'):
+            message['processedError'] = self.processedError
+        return message
+
+    def __eq__(self, other):
+        if isinstance(other, Message):
+            other = other.as_dict()
+        if isinstance(other, dict):
+            return self.as_dict() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Message({0!r})'.format(self.as_dict())
+
+
+# Topics and actions of parsed messages are the constants themselves, so they
+# are compared by identity and the parts split off are freed right away
+_topics = dict((value, value) for name, value in vars(topic).items()
+               if name.isupper())
+_actions = dict((value, value) for name, value in vars(actions).items()
+                if name.isupper())
+
+
+def _control_message(topic_name, action):
+    raw = topic_name + message_constants.MESSAGE_PART_SEPERATOR + action
+    return raw, Message(topic_name, action, [])
+
+
+# Connection and auth messages without data are parsed only once. They are
+# handled by the connection, which doesn't modify them.
+_control_messages = dict(_control_message(*message) for message in (
+    (topic.CONNECTION, actions.PING),
+    (topic.CONNECTION, actions.PONG),
+    (topic.CONNECTION, actions.ACK),
+    (topic.CONNECTION, actions.CHALLENGE),
+    (topic.CONNECTION, actions.REJECTION),
+    (topic.AUTH, actions.ACK),
+))
+_MAX_CONTROL_MESSAGE_LENGTH = max(len(raw) for raw in _control_messages)
+
+
 def parse(raw_messages, client):
     parsed_messages = []
     raw_messages = raw_messages.split(message_constants.MESSAGE_SEPERATOR)
@@ -18,6 +97,90 @@ def parse(raw_messages, client):
     return parsed_messages
 
 
+class StreamParser(object):
+    """Incrementally splits incoming data into parsed messages.
+
+    Only newly arrived data is scanned for message separators. An incomplete
+    trailing message is kept in a tail buffer and completed by the next call
+    to ``feed``. Every complete message is parsed exactly once.
+
+    A trusted parser doesn't validate actions, unknown ones are passed on as
+    they are. Only messages without an action are reported as errors.
+    """
+
+    def __init__(self, client, trusted=False):
+        self._client = client
+        self._tail = []
+        self._parse = _parse_trusted if trusted else _parse_strict
+
+    def feed(self, data):
+        """Add newly received data to the stream.
+
+        Args:
+            data (str): Newly received data
+
+        Returns:
+            list: The parsed messages completed by ``data``, in order. Messages
+                that fail to parse are reported to the client and skipped.
+        """
+        parts = data.split(message_constants.MESSAGE_SEPERATOR)
+        tail = parts.pop()
+
+        if parts and self._tail:
+            self._tail.append(parts[0])
+            parts[0] = "".join(self._tail)
+            del self._tail[:]
+
+        if tail:
+            self._tail.append(tail)
+
+        return self._parse(parts, self._client)
+
+    @property
+    def incomplete(self):
+        """bool: Whether part of a message is waiting for the rest."""
+        return bool(self._tail)
+
+    def reset(self):
+        """Discard any incomplete message."""
+        del self._tail[:]
+
+
+def _parse_strict(parts, client):
+    messages = []
+    for part in parts:
+        # Ensure part is not an empty string
+        if part:
+            if len(part) <= _MAX_CONTROL_MESSAGE_LENGTH:
+                message = _control_messages.get(part)
+                if message is not None:
+                    messages.append(message)
+                    continue
+            message = _parse_message(part, client)
+            if message is not None:
+                messages.append(message)
+    return messages
+
+
+def _parse_trusted(parts, client):
+    messages = []
+    append = messages.append
+    separator = message_constants.MESSAGE_PART_SEPERATOR
+    for part in parts:
+        if part:
+            fields = part.split(separator)
+            try:
+                topic_name = fields[0]
+                action = fields[1]
+            except IndexError:
+                # Reported by the strict parser
+                _parse_message(part, client)
+                continue
+            append(Message(_topics.get(topic_name, topic_name),
+                           _actions.get(action, action), fields[2:]))
+    return messages
+
+
 def _parse_message(message, client):
     parts = message.split(message_constants.MESSAGE_PART_SEPERATOR)
     if len(parts) < 2:
@@ -27,50 +190,131 @@ def _parse_message(message, client):
                          'Insufficient message parts')
         return
 
-    if not actions.reverse_lookup(parts[1]):
+    action = _actions.get(parts[1])
+    if action is None:
         client._on_error(topic.ERROR, event.MESSAGE_PARSE_ERROR,
                          'Unknown action {0}'.format(parts[1]))
         return
 
-    return {'raw': message,
-            'topic': parts[0],
-            'action': parts[1],
-            'data': parts[2:]}
+    topic_name = parts[0]
+    return Message(_topics.get(topic_name, topic_name), action, parts[2:])
 
 
-def convert_typed(value, client):
-    value_type = value[0]
+_UNDECODED = object()
+
+
+class TypedValue(object):
+    """A typed value that is only decoded when ``value`` is first read.
 
-    if value_type == types.TRUE:
-        return True
+    ``message_builder.typed`` returns the typed string it holds as is, so a
+    payload that is passed on, for example emitted as another event, is never
+    decoded and encoded again.
+    """
 
-    if value_type == types.FALSE:
-        return False
+    __slots__ = ('raw', '_client', '_codec', '_value')
 
-    if value_type == types.STRING:
-        return value[1:]
+    def __init__(self, raw, client, codec=None):
+        self.raw = raw
+        self._client = client
+        self._codec = codec
+        self._value = _UNDECODED
 
-    if value_type == types.NULL:
-        return None
+    @property
+    def value(self):
+        if self._value is _UNDECODED:
+            self._value = convert_typed(self.raw, self._client,
+                                        codec=self._codec)
+        return self._value
 
-    if value_type == types.OBJECT:
+    def __repr__(self):
+        return 'TypedValue({0!r})'.format(self.raw)
+
+
+_DIGITS = '0123456789'
+_DECIMAL_CHARACTERS = '0123456789.eE+-'
+if sys.version_info < (3,):
+    _NUMBER_TYPES = (int, long, float, complex)
+else:
+    _NUMBER_TYPES = (int, float, complex)
+
+
+def _parse_number(text):
+    """Parse the text of a number value.
+
+    Integers and decimals are told apart by their characters, so they are
+    converted without a failed conversion raising first. Anything else, like
+    ``Infinity`` or complex numbers, is tried as each number type in turn.
+
+    Raises:
+        ValueError: If ``text`` is not a number
+    """
+    digits = text[1:] if text[:1] in ('-', '+') else text
+    if digits and not digits.strip(_DIGITS):
+        return int(text)
+
+    num_types = _NUMBER_TYPES
+    if text and not text.strip(_DECIMAL_CHARACTERS):
+        num_types = (float, )
+    for num_type in num_types:
         try:
-            return json.loads(value[1:])
-        except ValueError as e:
-            client._on_error(topic.ERROR, event.MESSAGE_PARSE_ERROR, str(e))
-            return
+            return num_type(text)
+        except ValueError:
+            pass
+    raise ValueError(text)
 
-    if value_type == types.NUMBER:
-        if sys.version_info < (3,):
-            num_types = (int, long, float, complex)
-        else:
-            num_types = (int, float, complex)
 
-        for num_type in num_types:
-            try:
-                return num_type(value[1:])
-            except ValueError:
-                pass
+def _convert_string(value, codec):
+    return value[1:]
+
+
+def _convert_object(value, codec):
+    return (codec or default_codec).loads(value[1:])
+
+
+def _convert_number(value, codec):
+    return _parse_number(value[1:])
+
+
+# Converters of the typed values that are not constants, by type prefix
+_converters = {
+    types.STRING: _convert_string,
+    types.OBJECT: _convert_object,
+    types.NUMBER: _convert_number,
+}
+_constants = {
+    types.TRUE: True,
+    types.FALSE: False,
+    types.NULL: None,
+}
+
+
+def convert_typed(value, client, lazy=False, codec=None):
+    """Decode a typed value.
+
+    Args:
+        value (str): The typed value
+        client: Notified of values that fail to decode
+        lazy (bool): Return a ``TypedValue`` that decodes ``value`` once it
+            is read
+        codec: The JSON codec of objects, see ``deepstreampy.message.codec``
+
+    """
+    if lazy:
+        return TypedValue(value, client, codec)
+
+    value_type = value[0]
+
+    converter = _converters.get(value_type)
+    if converter is not None:
+        try:
+            return converter(value, codec)
+        except ValueError as e:
+            if value_type == types.OBJECT:
+                client._on_error(topic.ERROR, event.MESSAGE_PARSE_ERROR,
+                                 str(e))
+                return
+    elif value_type in _constants:
+        return _constants[value_type]
 
     client._on_error(topic.ERROR, event.MESSAGE_PARSE_ERROR,
                      'UNKNOWN_TYPE ({0})'.format(value))
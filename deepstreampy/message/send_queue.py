@@ -0,0 +1,380 @@
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.constants import message as message_constants
+from deepstreampy.constants import topic as topic_constants
+from deepstreampy.constants import actions as action_constants
+from deepstreampy.constants import overflow_policies
+
+from collections import OrderedDict, deque
+
+_PART_SEPERATOR = message_constants.MESSAGE_PART_SEPERATOR.encode()
+_MESSAGE_SEPERATOR = message_constants.MESSAGE_SEPERATOR.encode()
+_RECORD_WRITE_PREFIXES = tuple(
+    message_constants.MESSAGE_PART_SEPERATOR.join(
+        [topic_constants.RECORD, action, '']).encode()
+    for action in (action_constants.UPDATE, action_constants.PATCH))
+_RECORD_UPDATE_PREFIX = _RECORD_WRITE_PREFIXES[0]
+
+CONTROL = 0
+ACKS = 1
+DATA = 2
+
+LANE_NAMES = ('control', 'acks', 'data')
+
+
+def _encode_all(values):
+    return frozenset(value.encode() for value in values)
+
+
+_CONTROL_TOPICS = _encode_all([topic_constants.CONNECTION,
+                               topic_constants.AUTH])
+_ACK_ACTIONS = _encode_all([action_constants.ACK,
+                            action_constants.PONG])
+
+
+class QueueOverflowError(Exception):
+    """Set on the future of a message that was rejected or dropped because the
+    send queue was full."""
+
+    def __init__(self, message):
+        super(QueueOverflowError, self).__init__(message)
+
+
+def _topic(raw_message):
+    return raw_message[:raw_message.find(_PART_SEPERATOR)]
+
+
+def _record_name(raw_message):
+    # Batches of several messages are never conflated
+    if (not raw_message.startswith(_RECORD_WRITE_PREFIXES) or
+            raw_message.find(_MESSAGE_SEPERATOR) != len(raw_message) - 1):
+        return None
+    return raw_message.split(_PART_SEPERATOR, 3)[2]
+
+
+class SendQueue(object):
+    """Bounded queue of encoded messages waiting to be sent.
+
+    When adding a message would exceed either ``max_messages`` or ``max_bytes``
+    the overflow policy decides what happens:
+        - reject: the new message is not queued
+        - dropOldest: the oldest messages are dropped until the new one fits
+        - dropOldestPerTopic: the oldest messages with the same topic as the
+          new one are dropped first, then the oldest messages overall
+        - conflate: if the new message is an UPDATE, which replaces the whole
+          record, the queued UPDATE and PATCH messages for the same record
+          are dropped first and the new one takes the version of the oldest
+          of them, so that no version is skipped. Then the oldest messages
+          overall are dropped.
+
+    The futures of rejected and dropped messages are failed with a
+    ``QueueOverflowError``.
+    """
+
+    def __init__(self, max_messages=None, max_bytes=None,
+                 overflow_policy=overflow_policies.REJECT, on_conflate=None):
+        """
+        Args:
+            max_messages (int): Maximum number of queued messages
+            max_bytes (int): Maximum total size of the queued messages
+            overflow_policy (str): What to do when the queue is full
+            on_conflate (callable): Called with the record name, the original
+                version and the new version of an UPDATE whose version was
+                changed by the conflate policy
+        """
+        if overflow_policy not in (overflow_policies.REJECT,
+                                   overflow_policies.DROP_OLDEST,
+                                   overflow_policies.DROP_OLDEST_PER_TOPIC,
+                                   overflow_policies.CONFLATE):
+            raise ValueError(
+                "Unknown overflow policy {0}".format(overflow_policy))
+
+        self._max_messages = max_messages
+        self._max_bytes = max_bytes
+        self._overflow_policy = overflow_policy
+        self._on_conflate = on_conflate
+
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._bytes = 0
+
+        # Queued message ids by topic or record name, oldest first. Only
+        # maintained for the policies that need them.
+        self._groups = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    __nonzero__ = __bool__
+
+    @property
+    def bytes(self):
+        """int: Total size of all queued messages."""
+        return self._bytes
+
+    def push(self, raw_message, future):
+        """Add an encoded message to the end of the queue.
+
+        Args:
+            raw_message (bytes): The encoded message
+            future (tornado.concurrent.Future): Resolved once the message is
+                written, or failed if it is dropped
+
+        Returns:
+            bool: Whether the message was queued
+        """
+        size = len(raw_message)
+
+        if not self._fits(size):
+            raw_message = self._make_room(raw_message, size)
+            if raw_message is None:
+                _fail(future, "Send queue is full, message rejected")
+                return False
+            size = len(raw_message)
+
+        group = None
+        if self._overflow_policy == overflow_policies.DROP_OLDEST_PER_TOPIC:
+            group = _topic(raw_message)
+        elif self._overflow_policy == overflow_policies.CONFLATE:
+            group = _record_name(raw_message)
+
+        message_id = self._next_id
+        self._next_id += 1
+        self._entries[message_id] = (raw_message, future, group)
+        self._bytes += size
+
+        if group is not None:
+            self._groups.setdefault(group, deque()).append(message_id)
+
+        return True
+
+    def pop_frame(self, max_bytes):
+        """Remove the oldest messages, up to ``max_bytes`` in total.
+
+        At least one message is returned if the queue is not empty, even if it
+        is larger than ``max_bytes``.
+
+        Returns:
+            (bytes, list): The concatenated messages and their futures
+        """
+        messages = []
+        futures = []
+        self.pop_into(messages, futures, max_bytes)
+        return b"".join(messages), futures
+
+    def pop_into(self, messages, futures, max_bytes):
+        """Move the oldest messages and their futures onto the given lists.
+
+        Messages are moved while their total size stays within ``max_bytes``,
+        but at least one is moved if ``messages`` is empty.
+
+        Returns:
+            int: The number of bytes left of ``max_bytes``
+        """
+        while self._entries:
+            raw_message = self._entries[next(iter(self._entries))][0]
+            if messages and len(raw_message) > max_bytes:
+                break
+            raw_message, future = self._pop_oldest()
+            messages.append(raw_message)
+            futures.append(future)
+            max_bytes -= len(raw_message)
+
+        return max_bytes
+
+    def _fits(self, size):
+        return ((self._max_messages is None or
+                 len(self._entries) < self._max_messages) and
+                (self._max_bytes is None or
+                 self._bytes + size <= self._max_bytes))
+
+    def _make_room(self, raw_message, size):
+        """Drop messages according to the overflow policy until the new one
+        fits.
+
+        Returns:
+            bytes: The message to queue, which the conflate policy may have
+                changed, or None if it cannot be queued
+        """
+        if self._overflow_policy == overflow_policies.REJECT:
+            return None
+
+        if self._max_bytes is not None and size > self._max_bytes:
+            return None
+
+        if self._overflow_policy == overflow_policies.DROP_OLDEST_PER_TOPIC:
+            self._drop_group(_topic(raw_message), size)
+        elif (self._overflow_policy == overflow_policies.CONFLATE and
+              raw_message.startswith(_RECORD_UPDATE_PREFIX)):
+            raw_message = self._conflate(raw_message)
+            size = len(raw_message)
+
+        while not self._fits(size):
+            _, future = self._pop_oldest()
+            _fail(future, "Send queue is full, oldest message dropped")
+
+        return raw_message
+
+    def _conflate(self, raw_message):
+        """Drop all queued writes to the record of an UPDATE, which replaces
+        them, and give the UPDATE the version of the oldest one."""
+        name = _record_name(raw_message)
+        message_ids = self._groups.pop(name, None)
+        if not message_ids:
+            return raw_message
+
+        oldest_version = None
+        for message_id in message_ids:
+            queued_message, future, _ = self._entries.pop(message_id)
+            self._bytes -= len(queued_message)
+            if oldest_version is None:
+                oldest_version = queued_message.split(_PART_SEPERATOR, 4)[3]
+            _fail(future, "Send queue is full, message replaced by an update")
+
+        parts = raw_message.split(_PART_SEPERATOR, 4)
+        version = parts[3]
+        parts[3] = oldest_version
+        if self._on_conflate is not None:
+            self._on_conflate(name.decode('utf-8'), int(version),
+                              int(oldest_version))
+        return _PART_SEPERATOR.join(parts)
+
+    def _drop_group(self, group, size):
+        message_ids = self._groups.get(group)
+        while message_ids and not self._fits(size):
+            raw_message, future, _ = self._entries.pop(message_ids.popleft())
+            self._bytes -= len(raw_message)
+            _fail(future, "Send queue is full, message dropped")
+
+        if group in self._groups and not message_ids:
+            del self._groups[group]
+
+    def _pop_oldest(self):
+        _, (raw_message, future, group) = self._entries.popitem(last=False)
+        self._bytes -= len(raw_message)
+
+        if group is not None:
+            # The oldest message overall is also the oldest of its group
+            message_ids = self._groups[group]
+            message_ids.popleft()
+            if not message_ids:
+                del self._groups[group]
+
+        return raw_message, future
+
+
+class PrioritySendQueue(object):
+    """Send queue with a separate lane for each kind of traffic.
+
+    Messages are taken from the lanes in order of priority:
+        - control: connection and authentication messages
+        - acks: acknowledgements and PONG
+        - data: everything else
+
+    Only messages that nothing else depends on are moved ahead. All other
+    messages stay in the order they were sent, since many of them depend on
+    each other, like deleting a record and creating it again, or unlistening
+    and answering a listen request.
+
+    Each lane is a ``SendQueue`` with its own limits.
+    """
+
+    def __init__(self, lane_limits=None, max_messages=None, max_bytes=None,
+                 overflow_policy=overflow_policies.REJECT, on_conflate=None):
+        """
+        Args:
+            lane_limits (dict): Maps lane names to dicts with ``maxMessages``
+                and ``maxBytes`` for that lane
+            max_messages (int): Limit for lanes without their own
+            max_bytes (int): Limit for lanes without their own
+            overflow_policy (str): The policy of every lane
+            on_conflate (callable): See ``SendQueue``
+        """
+        lane_limits = lane_limits or {}
+        for name in lane_limits:
+            if name not in LANE_NAMES:
+                raise ValueError("Unknown send lane {0}".format(name))
+
+        self._lanes = []
+        for name in LANE_NAMES:
+            limits = lane_limits.get(name, {})
+            self._lanes.append(SendQueue(limits.get('maxMessages', max_messages),
+                                         limits.get('maxBytes', max_bytes),
+                                         overflow_policy, on_conflate))
+
+    def __len__(self):
+        return sum(len(lane) for lane in self._lanes)
+
+    def __bool__(self):
+        # Checked before every message is sent, a loop is cheaper than any()
+        for lane in self._lanes:
+            if lane._entries:
+                return True
+        return False
+
+    __nonzero__ = __bool__
+
+    @property
+    def bytes(self):
+        """int: Total size of all queued messages."""
+        return sum(lane.bytes for lane in self._lanes)
+
+    def push(self, raw_message, future):
+        """Add an encoded message to the end of its lane.
+
+        Returns:
+            bool: Whether the message was queued
+        """
+        return self._lanes[get_lane(raw_message)].push(raw_message, future)
+
+    def pop_frame(self, max_bytes):
+        """Remove up to ``max_bytes`` of messages, highest priority first.
+
+        Returns:
+            (bytes, list): The concatenated messages and their futures
+        """
+        messages = []
+        futures = []
+        for lane in self._lanes:
+            max_bytes = lane.pop_into(messages, futures, max_bytes)
+            if lane:
+                # The frame is full
+                break
+        return b"".join(messages), futures
+
+
+def get_lane(raw_message):
+    """Return the index of the send lane of an encoded message."""
+    parts = raw_message.split(_PART_SEPERATOR, 2)
+    topic = parts[0]
+    action = parts[1].rstrip(_MESSAGE_SEPERATOR) if len(parts) > 1 else b""
+
+    if action in _ACK_ACTIONS:
+        return ACKS
+    if topic in _CONTROL_TOPICS:
+        return CONTROL
+    return DATA
+
+
+def resolve_futures(futures, write_future):
+    """Resolve the futures of written messages with the result of the write."""
+
+    def on_written(f):
+        for future in futures:
+            if future.done():
+                continue
+            if f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                future.set_result(f.result())
+
+    write_future.add_done_callback(on_written)
+
+
+def _fail(future, message):
+    if not future.done():
+        future.set_exception(QueueOverflowError(message))
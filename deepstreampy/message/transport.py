@@ -0,0 +1,229 @@
+"""Transports carrying the deepstream protocol between client and server.
+
+A transport opens connections for ``Connection``. The handler it resolves
+with has the interface of tornado's ``WebSocketClientConnection`` that
+``Connection`` uses:
+
+    - ``write_message(data)`` writes a complete message or packet, and may
+      return a future that resolves once it was written
+    - ``close()`` closes the connection
+    - ``stream.closed()`` tells whether it is closed
+
+Received data is passed to ``on_message_callback`` as text, and None once the
+connection is closed.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from tornado import concurrent, gen, iostream, tcpclient, websocket
+
+import codecs
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+
+class Transport(object):
+
+    def connect(self, url, io_loop, callback, on_message_callback):
+        """Open a connection.
+
+        Args:
+            url (str): The url to connect to
+            io_loop: The IOLoop of the connection
+            callback (callable): Called with the returned future once the
+                connection is open or failed to open
+            on_message_callback (callable): Called with the data received,
+                and with None once the connection is closed
+
+        Returns:
+            tornado.concurrent.Future: Resolves with the handler
+        """
+        raise NotImplementedError()
+
+
+class WebSocketTransport(Transport):
+    """Connects to ``ws://`` and ``wss://`` urls with tornado's websocket
+    client."""
+
+    def __init__(self, compression_options=None):
+        self.compression_options = compression_options
+
+    def connect(self, url, io_loop, callback, on_message_callback):
+        return websocket.websocket_connect(
+            url,
+            io_loop,
+            callback=callback,
+            on_message_callback=on_message_callback,
+            compression_options=self.compression_options)
+
+
+class TCPHandler(object):
+    """Sends messages over a plain TCP stream, without websocket framing.
+
+    Every message ends with the message separator, so the stream needs no
+    framing of its own.
+    """
+
+    def __init__(self, stream, on_message_callback, read_chunk_size=65536):
+        self.stream = stream
+        self._on_message_callback = on_message_callback
+        self._read_chunk_size = read_chunk_size
+        # A read may end within a multi-byte character
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def write_message(self, message, binary=False):
+        if not isinstance(message, bytes):
+            message = message.encode('utf-8')
+        return self.stream.write(message)
+
+    def close(self):
+        self.stream.close()
+
+    @gen.coroutine
+    def read_messages(self):
+        try:
+            while True:
+                data = yield self.stream.read_bytes(self._read_chunk_size,
+                                                    partial=True)
+                self._on_message_callback(self._decoder.decode(data))
+        except iostream.StreamClosedError:
+            self._on_message_callback(None)
+
+
+class TCPTransport(Transport):
+    """Connects to ``tcp://host:port`` urls."""
+
+    def __init__(self, read_chunk_size=65536):
+        self.read_chunk_size = read_chunk_size
+
+    def connect(self, url, io_loop, callback, on_message_callback):
+        parts = urlsplit(url)
+        future = concurrent.Future()
+
+        def on_connect(f):
+            handler = None
+            if f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                handler = TCPHandler(f.result(), on_message_callback,
+                                     self.read_chunk_size)
+                future.set_result(handler)
+
+            if callback is not None:
+                callback(future)
+            # Only read once the connection knows about the handler, the
+            # server may have sent its first messages already
+            if handler is not None:
+                handler.read_messages()
+
+        io_loop.add_future(
+            tcpclient.TCPClient().connect(parts.hostname, parts.port),
+            on_connect)
+        return future
+
+
+class LoopbackHandler(object):
+    """One end of an in-memory connection.
+
+    Messages written to one end are delivered to the ``on_message_callback``
+    of the other end in a later IOLoop iteration, as they would be by a
+    socket, but without any I/O.
+    """
+
+    def __init__(self, io_loop, on_message_callback=None):
+        self.on_message_callback = on_message_callback
+        self.peer = None
+        self._io_loop = io_loop
+        self._closed = False
+
+    @property
+    def stream(self):
+        return self
+
+    def closed(self):
+        return self._closed
+
+    def write_message(self, message, binary=False):
+        if self._closed:
+            raise iostream.StreamClosedError()
+        if isinstance(message, bytes) and not binary:
+            message = message.decode('utf-8')
+        self._io_loop.add_callback(self.peer._receive, message)
+
+        future = concurrent.Future()
+        future.set_result(None)
+        return future
+
+    def close(self):
+        if self._closed:
+            return
+        for end in (self, self.peer):
+            end._closed = True
+            self._io_loop.add_callback(end._receive, None)
+
+    def _receive(self, message):
+        if self.on_message_callback is not None:
+            self.on_message_callback(message)
+
+    @classmethod
+    def pair(cls, io_loop):
+        """Returns:
+            tuple: Two connected ends
+        """
+        a, b = cls(io_loop), cls(io_loop)
+        a.peer, b.peer = b, a
+        return a, b
+
+
+class LoopbackTransport(Transport):
+    """Connects a client to a server in the same process, for tests and for
+    measuring the cost of the client without sockets.
+
+    ``accept`` is called with the server's ``LoopbackHandler`` of every new
+    connection. It sets the handler's ``on_message_callback`` to receive the
+    client's messages, and answers with ``write_message``. The url is ignored.
+    """
+
+    def __init__(self, accept):
+        self._accept = accept
+
+    def connect(self, url, io_loop, callback, on_message_callback):
+        client_end, server_end = LoopbackHandler.pair(io_loop)
+        client_end.on_message_callback = on_message_callback
+
+        future = concurrent.Future()
+        future.set_result(client_end)
+        # The client learns about the connection before the server can answer
+        if callback is not None:
+            io_loop.add_callback(callback, future)
+        self._accept(server_end)
+        return future
+
+
+_transports = {
+    'ws': WebSocketTransport,
+    'wss': WebSocketTransport,
+    'tcp': TCPTransport,
+}
+
+
+def get_transport(url, compression_options=None):
+    """Returns the transport for the scheme of ``url``.
+
+    Raises:
+        ValueError: If there is no transport for the scheme, or compression
+            is requested for a transport other than websockets
+    """
+    scheme = urlsplit(url).scheme
+    if scheme not in _transports:
+        raise ValueError("No transport for {0}".format(url))
+
+    transport_class = _transports[scheme]
+    if transport_class is WebSocketTransport:
+        return WebSocketTransport(compression_options)
+    if compression_options is not None:
+        raise ValueError("Compression requires a websocket url")
+    return transport_class()
@@ -4,14 +4,13 @@ from __future__ import unicode_literals
 from deepstreampy.constants import topic as topic_constants
 from deepstreampy.constants import actions as action_constants
 from deepstreampy.constants import event as event_constants
+from deepstreampy.message.codec import get_codec
 from deepstreampy.utils import AckTimeoutRegistry
 from deepstreampy.utils import ResubscribeNotifier
 
 from tornado import concurrent
 from tornado import gen
 
-import json
-
 
 class PresenceHandler(object):
     def __init__(self, connection, client, **options):
@@ -20,6 +19,7 @@ class PresenceHandler(object):
         self._client = client
         self._callbacks = {}
         self._query_future = None
+        self._codec = get_codec(options.get('jsonCodec'))
         subscription_timeout = options.get("subscriptionTimeout", 15)
         self._ack_timeout_registry = AckTimeoutRegistry(
             client, topic_constants.PRESENCE, subscription_timeout)
@@ -28,20 +28,19 @@ class PresenceHandler(object):
 
     @gen.coroutine
     def get_all(self):
-        self._query_future = concurrent.Future()
-        self._connection.send_message(topic_constants.PRESENCE,
-                                             action_constants.QUERY,
-                                             [action_constants.QUERY])
-        result = yield self._query_future
+        result = yield self._query([action_constants.QUERY])
         raise gen.Return(result)
 
     @gen.coroutine
     def get(self, users):
+        result = yield self._query(users)
+        raise gen.Return(result)
+
+    def _query(self, data):
         self._query_future = concurrent.Future()
         self._connection.send_message(topic_constants.PRESENCE,
-                                             action_constants.QUERY, users)
-        result = yield self._query_future
-        raise gen.Return(result)
+                                      action_constants.QUERY, data)
+        return self._query_future
 
     def subscribe(self, callback, users=None):
         if users is None:
@@ -52,7 +51,10 @@ class PresenceHandler(object):
                 self._callbacks[user] = callback
             users_str = ",".join(users)
 
-        self._ack_timeout_registry.add(action_constants.SUBSCRIBE, users_str)
+        # The server acknowledges every subscription to the presence topic
+        # as a whole
+        self._ack_timeout_registry.add(topic_constants.PRESENCE,
+                                       action_constants.SUBSCRIBE)
 
         return self._connection.send_message(
             topic_constants.PRESENCE, action_constants.SUBSCRIBE, users_str)
@@ -67,7 +69,8 @@ class PresenceHandler(object):
                 del self._callbacks[user]
             users_str = ",".join(users)
 
-        self._ack_timeout_registry.add(action_constants.UNSUBSCRIBE, users_str)
+        self._ack_timeout_registry.add(topic_constants.PRESENCE,
+                                       action_constants.UNSUBSCRIBE)
 
         return self._connection.send_message(
             topic_constants.PRESENCE, action_constants.UNSUBSCRIBE, users_str)
@@ -107,12 +110,14 @@ class PresenceHandler(object):
 
     def _parse_query_response(self, response):
         if response and response[0].isdigit():
-            data = json.loads(response[1])
+            data = self._codec.loads(response[1])
             return data
         return response
 
     def _resubscribe(self):
         if self._callbacks:
+            self._ack_timeout_registry.add(topic_constants.PRESENCE,
+                                           action_constants.SUBSCRIBE)
             self._connection.send_message(topic_constants.PRESENCE,
                                           action_constants.SUBSCRIBE,
                                           [action_constants.SUBSCRIBE])
@@ -6,6 +6,7 @@ from deepstreampy.constants import actions as action_constants
 from deepstreampy.constants import event as event_constants
 from deepstreampy.constants import connection_state
 from deepstreampy.message import message_parser, message_builder
+from deepstreampy.message.codec import get_codec
 from deepstreampy.utils import ResubscribeNotifier, SingleNotifier, Listener
 from deepstreampy.utils import str_types
 from deepstreampy.constants import merge_strategies
@@ -14,7 +15,6 @@ from deepstreampy import jsonpath
 from pyee import EventEmitter
 from tornado import gen, concurrent
 
-import json
 from functools import partial
 from copy import deepcopy
 
@@ -24,6 +24,11 @@ ENTRY_REMOVED_EVENT = 'ENTRY_REMOVED_EVENT'
 ENTRY_MOVED_EVENT = 'ENTRY_MOVED_EVENT'
 
 
+def _call_all(callbacks, error):
+    for callback in callbacks:
+        callback(error)
+
+
 class Record(EventEmitter, object):
     def __init__(self, name, connection, options, client):
         super(Record, self).__init__()
@@ -32,6 +37,7 @@ class Record(EventEmitter, object):
         self._connection = connection
         self._client = client
         self._options = options
+        self._codec = get_codec(options.get('jsonCodec'))
 
         self._has_provider = False
         self._is_ready = False
@@ -52,12 +58,12 @@ class Record(EventEmitter, object):
         self._resubscribe_notifier = ResubscribeNotifier(
             client, self._send_read)
         record_read_ack_timeout = options.get("recordReadAckTimeout", 15)
-        self._read_ack_timeout = client.io_loop.call_later(
+        self._read_ack_timeout = client.timer_wheel.call_later(
             record_read_ack_timeout,
             partial(self._on_timeout, event_constants.ACK_TIMEOUT))
 
         record_read_timeout = options.get("recordReadTimeout", 15)
-        self._read_timeout = client.io_loop.call_later(
+        self._read_timeout = client.timer_wheel.call_later(
             record_read_timeout,
             partial(self._on_timeout, event_constants.RESPONSE_TIMEOUT))
 
@@ -189,7 +195,7 @@ class Record(EventEmitter, object):
 
             if self.usages <= 0:
                 self.emit('destroyPending')
-                self._discard_timeout = self._client.io_loop.call_later(
+                self._discard_timeout = self._client.timer_wheel.call_later(
                     1, partial(self._on_timeout, event_constants.ACK_TIMEOUT))
 
                 send_future = self._connection.send_message(
@@ -212,7 +218,7 @@ class Record(EventEmitter, object):
 
         def ready_callback(record):
             self.emit('destroyPending')
-            self._delete_ack_timeout = self._client.io_loop.call_later(
+            self._delete_ack_timeout = self._client.timer_wheel.call_later(
                 self._record_delete_timeout,
                 partial(self._on_timeout, event_constants.DELETE_TIMEOUT))
 
@@ -234,12 +240,28 @@ class Record(EventEmitter, object):
         new_version = (current_version or 0) + 1
         self._write_callbacks[new_version] = callback
 
+    def _on_writes_conflated(self, version, new_version):
+        """The send queue replaced the queued writes from ``new_version`` on
+        with the update of ``version``, which is sent as ``new_version``."""
+        replaced = [self._write_callbacks.pop(v)
+                    for v in range(new_version, version)
+                    if v in self._write_callbacks]
+        if version in self._write_callbacks:
+            replaced.append(self._write_callbacks.pop(version))
+            self._write_callbacks[new_version] = partial(_call_all, replaced)
+        else:
+            # The update does not ask for a write acknowledgement
+            for callback in replaced:
+                callback("Write was replaced by a later update")
+
+        self._version -= version - new_version
+
     def _on_message(self, message):
         action = message['action']
 
         if action == action_constants.READ:
             if self.version is None:
-                self._client.io_loop.remove_timeout(self._read_timeout)
+                self._client.timer_wheel.remove_timeout(self._read_timeout)
                 self._on_read(message)
             else:
                 self._apply_update(message)
@@ -251,25 +273,27 @@ class Record(EventEmitter, object):
             self._apply_update(message)
 
         elif action == action_constants.WRITE_ACKNOWLEDGEMENT:
-            versions = json.loads(message['data'][1])
+            versions = self._codec.loads(message['data'][1])
+            # Decoded once, and only if a callback waits for it
+            error = message_parser.TypedValue(message['data'][2],
+                                              self._client, self._codec)
             for version in versions:
                 if version in self._write_callbacks:
                     callback = self._write_callbacks[version]
-                    callback(
-                        message_parser.convert_typed(message['data'][2],
-                                                     self._client))
+                    callback(error.value)
                     del self._write_callbacks[version]
 
         elif message['data'][0] == event_constants.VERSION_EXISTS:
             self._recover_record(message['data'][2],
-                                 json.loads(message['data'][3]), message)
+                                 self._codec.loads(message['data'][3]),
+                                 message)
 
         elif action == event_constants.MESSAGE_DENIED:
             self._clear_timeouts()
 
         elif action == action_constants.SUBSCRIPTION_HAS_PROVIDER:
             has_provider = message_parser.convert_typed(
-                message['data'][1], self._client)
+                message['data'][1], self._client, codec=self._codec)
             self._has_provider = has_provider
             self.emit('hasProviderChanged', has_provider)
 
@@ -305,7 +329,7 @@ class Record(EventEmitter, object):
                 return
 
             config = message['data'][4] if len(message['data']) >= 5 else None
-            if config and json.loads(config)['writeSuccess']:
+            if config and self._codec.loads(config)['writeSuccess']:
                 callback = self._write_callbacks[old_version]
                 del self._write_callbacks[old_version]
                 self._set_up_callback(self.version, callback)
@@ -321,7 +345,7 @@ class Record(EventEmitter, object):
         acknowledge_action = message['data'][0]
 
         if acknowledge_action == action_constants.SUBSCRIBE:
-            self._client.io_loop.remove_timeout(self._read_ack_timeout)
+            self._client.timer_wheel.remove_timeout(self._read_ack_timeout)
 
         elif acknowledge_action == action_constants.DELETE:
             self.emit('delete')
@@ -333,27 +357,34 @@ class Record(EventEmitter, object):
 
     def _apply_update(self, message):
         version = int(message['data'][1])
-        if message['action'] == action_constants.PATCH:
-            data = message_parser.convert_typed(message['data'][3],
-                                                self._client)
-        else:
-            data = json.loads(message['data'][2])
+        is_patch = message['action'] == action_constants.PATCH
 
         if self.version is None:
             self._version = version
         elif self.version + 1 != version:
-            if message['action'] == action_constants.PATCH:
+            # A patch out of order is replaced by a snapshot, so its value is
+            # never decoded
+            if is_patch:
                 self._connection.send_message(topic_constants.RECORD,
                                               action_constants.SNAPSHOT,
                                               [self.name])
             else:
-                self._recover_record(version, data, message)
+                self._recover_record(version,
+                                     self._codec.loads(message['data'][2]),
+                                     message)
 
             return
 
+        if is_patch:
+            data = message_parser.convert_typed(message['data'][3],
+                                                self._client,
+                                                codec=self._codec)
+        else:
+            data = self._codec.loads(message['data'][2])
+
         self._begin_change()
         self._version = version
-        if message['action'] == action_constants.PATCH:
+        if is_patch:
             jsonpath.set(self._data, message['data'][2], data, False)
         else:
             self._data = data
@@ -373,12 +404,12 @@ class Record(EventEmitter, object):
             if config:
                 msg_data = [
                     self.name, self.version, path,
-                    message_builder.typed(data), config
+                    message_builder.typed(data, self._codec), config
                 ]
             else:
                 msg_data = [
                     self.name, self.version, path,
-                    message_builder.typed(data)
+                    message_builder.typed(data, self._codec)
                 ]
             self._connection.send_message(topic_constants.RECORD,
                                           action_constants.PATCH, msg_data)
@@ -411,7 +442,7 @@ class Record(EventEmitter, object):
     def _on_read(self, message):
         self._begin_change()
         self._version = int(message['data'][1])
-        self._data = json.loads(message['data'][2])
+        self._data = self._codec.loads(message['data'][2])
         self._complete_change()
         self._set_ready()
 
@@ -475,11 +506,11 @@ class Record(EventEmitter, object):
 
     def _clear_timeouts(self):
         if self._read_ack_timeout:
-            self._client.io_loop.remove_timeout(self._read_ack_timeout)
+            self._client.timer_wheel.remove_timeout(self._read_ack_timeout)
         if self._discard_timeout:
-            self._client.io_loop.remove_timeout(self._discard_timeout)
+            self._client.timer_wheel.remove_timeout(self._discard_timeout)
         if self._delete_ack_timeout:
-            self._client.io_loop.remove_timeout(self._delete_ack_timeout)
+            self._client.timer_wheel.remove_timeout(self._delete_ack_timeout)
 
     def _check_destroyed(self, method_name):
         if self._is_destroyed:
@@ -708,6 +739,10 @@ class RecordHandler(EventEmitter, object):
         self._lists = {}
         self._listeners = {}
         self._destroy_emitter = EventEmitter()
+        self._codec = get_codec(options.get('jsonCodec'))
+
+        client.on(event_constants.RECORD_WRITES_CONFLATED,
+                  self._on_writes_conflated)
 
         record_read_timeout = options.get("recordReadTimeout", 15)
 
@@ -724,9 +759,22 @@ class RecordHandler(EventEmitter, object):
         """
         Return an existing record or create a new one.
 
+        Messages sent before logging in are queued until the login succeeds,
+        so the returned future only resolves after ``login``. Don't wait for
+        it before calling ``login``.
+
         Args:
             name (str): the unique name of the record
         """
+        record = self._get_record(name)
+        yield record._send_read()
+        raise gen.Return(record)
+
+    def _on_writes_conflated(self, name, version, new_version):
+        if name in self._records:
+            self._records[name]._on_writes_conflated(version, new_version)
+
+    def _get_record(self, name):
         if name in self._records:
             record = self._records[name]
         else:
@@ -742,8 +790,7 @@ class RecordHandler(EventEmitter, object):
 
             record.usages += 1
 
-        yield record._send_read()
-        raise gen.Return(record)
+        return record
 
     @gen.coroutine
     def get_list(self, name):
@@ -754,6 +801,11 @@ class RecordHandler(EventEmitter, object):
             name (str): the unique name of the list
             list_options (dict): a dict of parameters for this particular list
         """
+        _list = self._get_list(name)
+        yield _list._send_read()
+        raise gen.Return(_list)
+
+    def _get_list(self, name):
         if name in self._lists:
             _list = self._lists[name]
         else:
@@ -771,8 +823,7 @@ class RecordHandler(EventEmitter, object):
 
         self._records[name].usages += 1
 
-        yield _list._send_read()
-        raise gen.Return(_list)
+        return _list
 
     def get_anonymous_record(self):
         """
@@ -874,12 +925,14 @@ class RecordHandler(EventEmitter, object):
         if (action == action_constants.READ
                 and self._snapshot_registry.has_request(name)):
             processed = True
-            self._snapshot_registry.receive(name, None, json.loads(data[2]))
+            self._snapshot_registry.receive(name, None,
+                                            self._codec.loads(data[2]))
 
         if (action == action_constants.HAS
                 and self._has_registry.has_request(name)):
             processed = True
-            record_exists = message_parser.convert_typed(data[1], self._client)
+            record_exists = message_parser.convert_typed(data[1], self._client,
+                                                         codec=self._codec)
             self._has_registry.receive(name, None, record_exists)
 
         listener = self._listeners.get(name, None)
@@ -1021,7 +1074,6 @@ class AnonymousRecord(EventEmitter, object):
         return self._name
 
     @name.setter
-    @gen.coroutine
     def name(self, value):
         self._name = value
 
@@ -1031,9 +1083,10 @@ class AnonymousRecord(EventEmitter, object):
 
             self._record.discard()
 
-        record_future = self._record_handler.get_record(value)
-
-        self._record = yield record_future
+        # The read is not waited for, so that this works the same on any
+        # event loop. "ready" is emitted once the record is loaded.
+        self._record = self._record_handler._get_record(value)
+        self._record._send_read()
 
         for subscription in self._subscriptions:
             self._record.subscribe(*subscription, trigger_now=True)
@@ -8,6 +8,7 @@ from deepstreampy.constants import actions
 from deepstreampy.constants import event as event_constants
 from deepstreampy.message import message_builder
 from deepstreampy.message import message_parser
+from deepstreampy.message.codec import get_codec
 from deepstreampy import utils
 
 from tornado import concurrent
@@ -23,14 +24,16 @@ class RPCResponse(object):
         auto_ack (bool): Specifies whether requests should be auto acknowledged
     """
 
-    def __init__(self, connection, name, correlation_id):
+    def __init__(self, connection, name, correlation_id, codec=None):
         """
         Args:
             connection (deepstreampy.client._Connection): The current connection
             name (str): The name of the RPC
             correlation_id (str): Correlation ID of the RPC
+            codec: The JSON codec of the response
         """
         self._connection = connection
+        self._codec = codec
         self._name = name
         self._correletaion_id = correlation_id
         self._is_acknowledged = False
@@ -88,7 +91,7 @@ class RPCResponse(object):
             raise ValueError('RPC {0} already completed'.format(self._name))
         self.ack()
 
-        typed_data = message_builder.typed(data)
+        typed_data = message_builder.typed(data, self._codec)
         self._is_complete = True
 
         return self._connection.send_message(
@@ -129,20 +132,23 @@ class RPC(object):
         self._future = future
         self._client = client
         self._connection = client._connection
+        self._codec = get_codec(options.get('jsonCodec'))
 
-        self._ack_timeout = self._connection._io_loop.call_later(
+        self._ack_timeout = client.timer_wheel.call_later(
             options.get('rpcAckTimeout', 6),
             partial(self.error, event_constants.ACK_TIMEOUT))
 
-        self._response_timeout = self._connection._io_loop.call_later(
+        self._response_timeout = client.timer_wheel.call_later(
             options.get('rpcResponseTimeout', 6),
             partial(self.error, event_constants.RESPONSE_TIMEOUT))
 
     def ack(self):
-        self._connection._io_loop.remove_timeout(self._ack_timeout)
+        self._client.timer_wheel.remove_timeout(self._ack_timeout)
 
     def respond(self, data):
-        converted_data = message_parser.convert_typed(data, self._client)
+        converted_data = message_parser.convert_typed(
+            data, self._client, self._options.get('lazyPayloads', False),
+            self._codec)
         self._future.set_result(converted_data)
         self._complete()
 
@@ -151,8 +157,8 @@ class RPC(object):
         self._complete()
 
     def _complete(self):
-        self._connection._io_loop.remove_timeout(self._ack_timeout)
-        self._connection._io_loop.remove_timeout(self._response_timeout)
+        self._client.timer_wheel.remove_timeout(self._ack_timeout)
+        self._client.timer_wheel.remove_timeout(self._response_timeout)
 
 
 class RPCHandler(object):
@@ -163,6 +169,8 @@ class RPCHandler(object):
         self._client = client
         self._rpcs = {}
         self._providers = {}
+        self._lazy_payloads = options.get('lazyPayloads', False)
+        self._codec = get_codec(options.get('jsonCodec'))
         self._provide_ack_timeouts = {}
 
         subscription_timeout = options.get("subscriptionTimeout", 15)
@@ -206,18 +214,33 @@ class RPCHandler(object):
 
     @gen.coroutine
     def make(self, name, data):
+        """Make a remote procedure call.
+
+        The request is only sent after logging in, so don't wait for the
+        result before calling ``login``.
+
+        Args:
+            name (str): The name of the RPC
+            data: The data passed to the provider
+
+        Returns:
+            tornado.concurrent.Future: Resolves with the provider's response
+        """
+        result = yield self._make(name, data)
+        raise gen.Return(result)
+
+    def _make(self, name, data):
         f = concurrent.Future()
 
         uid = utils.get_uid()
-        typed_data = message_builder.typed(data)
+        typed_data = message_builder.typed(data, self._codec)
 
         self._rpcs[uid] = RPC(f, self._client, **self._options)
 
         self._connection.send_message(
             topic_constants.RPC, actions.REQUEST, [name, uid, typed_data])
 
-        result = yield f
-        raise gen.Return(result)
+        return f
 
     def _get_rpc(self, correlation_id, rpc_name, raw_message):
         if correlation_id not in self._rpcs:
@@ -233,17 +256,23 @@ class RPCHandler(object):
         name = message['data'][0]
         correlation_id = message['data'][1]
 
-        if message['data'][2]:
-            data = message_parser.convert_typed(message['data'][2],
-                                                self._client)
-
-        if name in self._providers:
-            response = RPCResponse(self._connection, name, correlation_id)
-            self._providers[name](data, response)
-        else:
+        provider = self._providers.get(name)
+        if provider is None:
+            # Rejected without decoding the data
             self._connection.send_message(topic_constants.RPC,
                                           actions.REJECTION,
                                           [name, correlation_id])
+            return
+
+        data = None
+        if message['data'][2]:
+            data = message_parser.convert_typed(
+                message['data'][2], self._client, self._lazy_payloads,
+                self._codec)
+
+        response = RPCResponse(self._connection, name, correlation_id,
+                               self._codec)
+        provider(data, response)
 
     def handle(self, message):
         action = message['action']
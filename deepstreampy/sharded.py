@@ -0,0 +1,230 @@
+"""Spreading records, events and RPCs over several connections."""
+
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.client import Client, emit_error
+from deepstreampy.record import AnonymousRecord
+from deepstreampy.constants import event as event_constants
+
+from pyee import EventEmitter
+from tornado import gen, concurrent
+
+from bisect import bisect
+from functools import partial
+import hashlib
+
+
+class HashRing(object):
+    """Consistent hash ring mapping names to shards.
+
+    Every shard is placed on the ring ``replicas`` times, so names stay evenly
+    spread and only few of them move if the number of shards changes.
+    """
+
+    def __init__(self, shards, replicas=100):
+        points = []
+        for shard in shards:
+            for replica in range(replicas):
+                points.append(
+                    (self._hash("{0}-{1}".format(shard, replica)), shard))
+        points.sort()
+
+        self._hashes = [point[0] for point in points]
+        self._shards = [point[1] for point in points]
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+    def get_shard(self, name):
+        index = bisect(self._hashes, self._hash(name)) % len(self._hashes)
+        return self._shards[index]
+
+
+class ShardedClient(EventEmitter):
+    """Client that opens several connections and routes records, events and
+    RPCs to one of them by name.
+
+    Each connection is a ``deepstreampy.client.Client`` and reconnects on its
+    own, so losing one shard does not affect names routed to the others.
+    Listening is done on every shard, presence uses the first one.
+    """
+
+    def __init__(self, url, shards=None, **options):
+        """Creates the clients but doesn't connect to the server.
+
+        Args:
+            url (str or list): The url every shard connects to, or a list with
+                one url per shard
+            shards (int): The number of shards, if a single url is given
+            options: The options for every client
+        """
+        super(ShardedClient, self).__init__()
+        if isinstance(url, (list, tuple)):
+            urls = list(url)
+        else:
+            urls = [url] * (shards or 1)
+
+        self._clients = [Client(shard_url, **options) for shard_url in urls]
+        self._ring = HashRing(range(len(self._clients)))
+
+        for index, client in enumerate(self._clients):
+            client.on('error', self._on_error)
+            client.on(event_constants.CONNECTION_STATE_CHANGED,
+                      partial(self._on_connection_state_changed, index))
+
+        self._record = _ShardedRecordHandler(self)
+        self._event = _ShardedEventHandler(self)
+        self._rpc = _ShardedRPCHandler(self)
+
+    def connect(self):
+        """Connect every shard.
+
+        Returns:
+            tornado.concurrent.Future: Resolves when all shards are connected
+        """
+        return gen.multi([client.connect() for client in self._clients])
+
+    @gen.coroutine
+    def login(self, auth_params):
+        """Authenticate every shard with the same parameters.
+
+        Returns:
+            tornado.concurrent.Future: Resolves with the first failed result,
+                or the result of the first shard if all succeeded
+        """
+        results = yield [client.login(auth_params) for client in self._clients]
+        for result in results:
+            if not result['success']:
+                raise gen.Return(result)
+        raise gen.Return(results[0])
+
+    def close(self):
+        for client in self._clients:
+            client.close()
+
+    def shard(self, name):
+        """Return the client that handles the given name."""
+        return self._clients[self._ring.get_shard(name)]
+
+    def _on_error(self, msg, event, topic):
+        # Re-emits a shard's error, which arrives in ``error`` listener order
+        emit_error(self, topic, event, msg)
+
+    def _on_connection_state_changed(self, index, state):
+        self.emit(event_constants.CONNECTION_STATE_CHANGED, state, index)
+
+    @property
+    def shards(self):
+        """list: The client of every shard."""
+        return list(self._clients)
+
+    @property
+    def connection_states(self):
+        """list: The connection state of every shard."""
+        return [client.connection_state for client in self._clients]
+
+    @property
+    def record(self):
+        return self._record
+
+    @property
+    def event(self):
+        return self._event
+
+    @property
+    def rpc(self):
+        return self._rpc
+
+    @property
+    def presence(self):
+        return self._clients[0].presence
+
+    @property
+    def io_loop(self):
+        return self._clients[0].io_loop
+
+
+class _ShardedHandler(object):
+
+    def __init__(self, sharded_client, handler_name):
+        self._sharded_client = sharded_client
+        self._handler_name = handler_name
+
+    def _handler(self, name):
+        return getattr(self._sharded_client.shard(name), self._handler_name)
+
+    def _call_all(self, method_name, *args):
+        futures = []
+        for client in self._sharded_client.shards:
+            future = getattr(getattr(client, self._handler_name),
+                             method_name)(*args)
+            if concurrent.is_future(future):
+                futures.append(future)
+        return gen.multi(futures)
+
+
+class _ShardedRecordHandler(_ShardedHandler):
+
+    def __init__(self, sharded_client):
+        super(_ShardedRecordHandler, self).__init__(sharded_client, 'record')
+
+    def get_record(self, name):
+        return self._handler(name).get_record(name)
+
+    def get_list(self, name):
+        return self._handler(name).get_list(name)
+
+    def get_anonymous_record(self):
+        future = concurrent.Future()
+        future.set_result(AnonymousRecord(self))
+        return future
+
+    def snapshot(self, name, callback):
+        return self._handler(name).snapshot(name, callback)
+
+    def has(self, name, callback):
+        return self._handler(name).has(name, callback)
+
+    def listen(self, pattern, callback):
+        return self._call_all('listen', pattern, callback)
+
+    def unlisten(self, pattern):
+        return self._call_all('unlisten', pattern)
+
+
+class _ShardedEventHandler(_ShardedHandler):
+
+    def __init__(self, sharded_client):
+        super(_ShardedEventHandler, self).__init__(sharded_client, 'event')
+
+    def subscribe(self, name, callback):
+        return self._handler(name).subscribe(name, callback)
+
+    def unsubscribe(self, name, callback):
+        return self._handler(name).unsubscribe(name, callback)
+
+    def emit(self, name, data):
+        return self._handler(name).emit(name, data)
+
+    def listen(self, pattern, callback):
+        return self._call_all('listen', pattern, callback)
+
+    def unlisten(self, pattern):
+        return self._call_all('unlisten', pattern)
+
+
+class _ShardedRPCHandler(_ShardedHandler):
+
+    def __init__(self, sharded_client):
+        super(_ShardedRPCHandler, self).__init__(sharded_client, 'rpc')
+
+    def provide(self, name, callback):
+        return self._handler(name).provide(name, callback)
+
+    def unprovide(self, name):
+        return self._handler(name).unprovide(name)
+
+    def make(self, name, data):
+        return self._handler(name).make(name, data)
@@ -0,0 +1,242 @@
+"""Blocking, thread-safe access to a client running in a background thread."""
+
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.client import Client
+
+from concurrent.futures import Future
+from tornado import ioloop
+from tornado.concurrent import Future as TornadoFuture, is_future
+
+from collections import deque
+from functools import partial
+import threading
+
+
+def _copy_result(future, tornado_future):
+    exception = tornado_future.exception()
+    if exception is not None:
+        future.set_exception(exception)
+    else:
+        future.set_result(tornado_future.result())
+
+
+class SyncClient(object):
+    """Runs a ``deepstreampy.client.Client`` on an IOLoop in a dedicated
+    thread, and accepts calls from any other thread.
+
+    Calls are appended to a deque, which needs no lock, and the IOLoop is only
+    woken up if it is not already about to run the calls queued before. Each
+    wake-up runs every call queued until then, so many threads can share one
+    connection without an ``add_callback`` per call.
+
+    Every method returns a ``concurrent.futures.Future``. Callbacks given to
+    ``subscribe`` and the like run on the IOLoop thread.
+
+    ``get`` and ``set`` request each record once and keep it, so that later
+    calls don't have to wait for it to load again. The record stays
+    subscribed, and receives updates, until it is released with ``discard``.
+    """
+
+    def __init__(self, url, max_batch_size=1000, **options):
+        """Starts the IOLoop thread and creates the client, but doesn't
+        connect to the server.
+
+        Args:
+            url (str or list): The url to connect to
+            max_batch_size (int): How many queued calls to run per IOLoop
+                iteration, before letting the IOLoop handle I/O again
+            options: The options for the client
+
+        Raises:
+            Exception: Whatever creating the client raised, e.g. a
+                ``ValueError`` for an unknown option value
+        """
+        self._queue = deque()
+        self._wakeup_pending = False
+        self._max_batch_size = max_batch_size
+        self._client = None
+        self._error = None
+        # Futures of the records of get and set, only used on the IOLoop thread
+        self._records = {}
+
+        started = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(url, options, started),
+            name='deepstreampy')
+        self._thread.daemon = True
+        self._thread.start()
+        started.wait()
+
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+
+    def _run(self, url, options, started):
+        self._io_loop = ioloop.IOLoop()
+        self._io_loop.make_current()
+        try:
+            self._client = Client(url, **options)
+        except Exception as e:
+            self._error = e
+            self._io_loop.close(all_fds=True)
+            return
+        finally:
+            started.set()
+        self._io_loop.start()
+        self._io_loop.close(all_fds=True)
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on the IOLoop thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves with the return value, or with
+                the result of the tornado future it returned
+        """
+        future = Future()
+        self._queue.append((future, fn, args, kwargs))
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            self._io_loop.add_callback(self._run_queued)
+        return future
+
+    def _run_queued(self):
+        # Cleared before draining, so calls queued from now on either are
+        # picked up by this batch or schedule the next one
+        self._wakeup_pending = False
+        queue = self._queue
+
+        for _ in range(min(len(queue), self._max_batch_size)):
+            future, fn, args, kwargs = queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+
+            if is_future(result):
+                result.add_done_callback(partial(_copy_result, future))
+            else:
+                future.set_result(result)
+
+        if queue and not self._wakeup_pending:
+            self._wakeup_pending = True
+            self._io_loop.add_callback(self._run_queued)
+
+    def connect(self):
+        return self.submit(self._client.connect)
+
+    def login(self, auth_params):
+        return self.submit(self._client.login, auth_params)
+
+    def close(self, timeout=None):
+        """Close the connection and stop the IOLoop thread."""
+        self.submit(self._client.close).result(timeout)
+        self._io_loop.add_callback(self._io_loop.stop)
+        self._thread.join(timeout)
+
+    def on(self, event, callback):
+        """Listen to a client event, ``callback`` runs on the IOLoop thread."""
+        return self.submit(self._client.on, event, callback)
+
+    def get(self, name, path=None):
+        """Get the data of a record once it is ready.
+
+        Returns:
+            concurrent.futures.Future: Resolves with a copy of the data
+        """
+        return self.submit(self._get, name, path)
+
+    def _get(self, name, path):
+        future = TornadoFuture()
+
+        def on_record(f):
+            if f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                f.result().when_ready(
+                    lambda record: future.set_result(record.get(path)))
+
+        self._get_record(name).add_done_callback(on_record)
+        return future
+
+    def set(self, name, data, path=None):
+        """Set the data of a record.
+
+        Returns:
+            concurrent.futures.Future: Resolves once the record was requested
+        """
+        return self.submit(self._set, name, data, path)
+
+    def _set(self, name, data, path):
+        future = TornadoFuture()
+
+        def on_record(f):
+            if f.exception() is not None:
+                future.set_exception(f.exception())
+            else:
+                f.result().set(data, path)
+                future.set_result(None)
+
+        self._get_record(name).add_done_callback(on_record)
+        return future
+
+    def discard(self, name):
+        """Release a record kept by ``get`` or ``set``, which unsubscribes
+        from it.
+
+        Returns:
+            concurrent.futures.Future: Resolves once the record is released
+        """
+        return self.submit(self._discard, name)
+
+    def _discard(self, name):
+        def on_record(f):
+            if f.exception() is None:
+                f.result().discard()
+
+        record_future = self._records.pop(name, None)
+        if record_future is not None:
+            record_future.add_done_callback(on_record)
+
+    def _get_record(self, name):
+        record_future = self._records.get(name)
+        if (record_future is None or record_future.done() and (
+                record_future.exception() is not None or
+                record_future.result().is_destroyed)):
+            record_future = self._client.record.get_record(name)
+            self._records[name] = record_future
+        return record_future
+
+    def subscribe(self, name, callback):
+        """Subscribe to an event, ``callback`` runs on the IOLoop thread."""
+        return self.submit(self._client.event.subscribe, name, callback)
+
+    def unsubscribe(self, name, callback):
+        return self.submit(self._client.event.unsubscribe, name, callback)
+
+    def emit(self, name, data):
+        return self.submit(self._client.event.emit, name, data)
+
+    def make(self, name, data):
+        """Make an RPC.
+
+        Returns:
+            concurrent.futures.Future: Resolves with the response
+        """
+        return self.submit(self._client.rpc.make, name, data)
+
+    def get_presence(self):
+        return self.submit(self._client.presence.get_all)
+
+    @property
+    def connection_state(self):
+        return self._client.connection_state
+
+    @property
+    def io_loop(self):
+        return self._io_loop
@@ -0,0 +1,620 @@
+"""An in-process stand-in for a deepstream server.
+
+``Server`` implements enough of the protocol to run clients against it
+without a deepstream installation: authentication, records with versions,
+updates, patches and write acknowledgements, events, RPCs routed between
+clients, presence and listening. Data is kept in memory and not shared with
+other servers.
+
+Clients connect over websockets or TCP with ``listen`` and ``listen_tcp``, or
+without sockets with ``LoopbackTransport(server.accept)``::
+
+    server = Server()
+    client = Client('ws://loopback',
+                    transport=LoopbackTransport(server.accept))
+
+Run ``python -m deepstreampy.testing`` to serve websockets on port 6020.
+"""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import jsonpath
+from deepstreampy.constants import actions, topic
+from deepstreampy.constants import event as event_constants
+from deepstreampy.constants import message as message_constants
+from deepstreampy.message import message_builder, message_parser
+from deepstreampy.message.transport import TCPHandler
+
+from tornado import gen, httpserver, ioloop, iostream, netutil, tcpserver, web
+from tornado import websocket
+
+from collections import defaultdict
+import argparse
+import json
+import re
+
+_PART = message_constants.MESSAGE_PART_SEPERATOR
+_END = message_constants.MESSAGE_SEPERATOR
+
+
+def _message(topic_name, action, *data):
+    return _PART.join((topic_name, action) + data) + _END
+
+
+class _Listener(object):
+
+    def __init__(self, session, pattern):
+        self.session = session
+        self.regex = re.compile(pattern)
+        # Names the listener was told about, and whether it accepted them
+        self.names = {}
+
+
+class _RPCRequest(object):
+
+    def __init__(self, requester, name, correlation_id, data):
+        self.requester = requester
+        self.name = name
+        self.correlation_id = correlation_id
+        self.data = data
+        self.tried = set()
+        self.provider = None
+
+
+class Session(object):
+    """The server side of one client connection.
+
+    Replies are buffered and written as a single message once per IOLoop
+    iteration.
+    """
+
+    def __init__(self, server, handler):
+        self.server = server
+        self.handler = handler
+        self.authenticated = False
+        self.username = None
+        self.closed = False
+        self._buffer = []
+        # Frames messages like the client does. Actions are passed on as they
+        # are, the server answers the ones it doesn't know itself.
+        self._parser = message_parser.StreamParser(server, trusted=True)
+
+        self.send(_message(topic.CONNECTION, actions.ACK))
+
+    def send(self, message):
+        if not self._buffer:
+            self.server.io_loop.add_callback(self._flush)
+        self._buffer.append(message)
+
+    def _flush(self):
+        data = ''.join(self._buffer)
+        del self._buffer[:]
+        if not data or self.closed:
+            return
+        try:
+            self.handler.write_message(data)
+        except (iostream.StreamClosedError, websocket.WebSocketClosedError):
+            pass
+
+    def on_message(self, data):
+        """Handle the data received from the client, and the end of the
+        connection once ``data`` is None."""
+        if data is None:
+            self.closed = True
+            self.server._remove_session(self)
+            return
+
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        for message in self._parser.feed(data):
+            self.server._handle(self, message)
+
+    def close(self):
+        self.handler.close()
+
+
+class Server(object):
+    """Answers deepstream clients from memory.
+
+    Args:
+        authenticate (callable): Called with the auth data of every login.
+            Returns a tuple of whether the login succeeds, and the data sent
+            back to the client. By default every login succeeds.
+        heartbeat_interval (float): Seconds between the pings sent to every
+            client, or None to not send any
+    """
+
+    def __init__(self, authenticate=None, heartbeat_interval=None):
+        self.io_loop = ioloop.IOLoop.current()
+        self.sessions = set()
+        self.records = {}
+
+        self._authenticate = authenticate or (lambda auth_data: (True, None))
+        self._subscriptions = {topic.RECORD: defaultdict(set),
+                               topic.EVENT: defaultdict(set)}
+        self._listeners = {topic.RECORD: {}, topic.EVENT: {}}
+        self._providers = defaultdict(list)
+        self._local_providers = {}
+        self._rpcs = {}
+        self._presence_subscribers = set()
+        self._http_server = None
+        self._tcp_server = None
+
+        self._heartbeat = None
+        if heartbeat_interval:
+            self._heartbeat = ioloop.PeriodicCallback(
+                self._send_pings, heartbeat_interval * 1000)
+            self._heartbeat.start()
+
+    def accept(self, handler):
+        """Serve a new connection, for use with ``LoopbackTransport``.
+
+        Args:
+            handler: The server's ``LoopbackHandler`` of the connection
+        """
+        session = Session(self, handler)
+        handler.on_message_callback = session.on_message
+        self.sessions.add(session)
+        return session
+
+    def listen(self, port=0, address='localhost', path='/deepstream'):
+        """Serve websockets.
+
+        Returns:
+            int: The port, which is chosen by the OS if ``port`` is 0
+        """
+        sockets = netutil.bind_sockets(port, address)
+        self._http_server = httpserver.HTTPServer(
+            web.Application([(path, _WebSocketHandler, {'server': self})]))
+        self._http_server.add_sockets(sockets)
+        return sockets[0].getsockname()[1]
+
+    def listen_tcp(self, port=0, address='localhost'):
+        """Serve ``tcp://`` connections.
+
+        Returns:
+            int: The port, which is chosen by the OS if ``port`` is 0
+        """
+        sockets = netutil.bind_sockets(port, address)
+        self._tcp_server = _TCPServer(self)
+        self._tcp_server.add_sockets(sockets)
+        return sockets[0].getsockname()[1]
+
+    def stop(self):
+        """Stop listening and close every connection."""
+        if self._heartbeat is not None:
+            self._heartbeat.stop()
+        for server in (self._http_server, self._tcp_server):
+            if server is not None:
+                server.stop()
+        for session in list(self.sessions):
+            session.close()
+
+    def provide(self, name, callback):
+        """Answer the RPC ``name`` in the server, with the return value of
+        ``callback(data)``. Clients providing ``name`` take precedence."""
+        self._local_providers[name] = callback
+
+    def set_record(self, name, data, version=1):
+        """Create or replace a record."""
+        self.records[name] = [version, data]
+
+    def _send_pings(self):
+        for session in self.sessions:
+            session.send(_message(topic.CONNECTION, actions.PING))
+
+    def _remove_session(self, session):
+        self.sessions.discard(session)
+        self._presence_subscribers.discard(session)
+
+        for topic_name, subscriptions in self._subscriptions.items():
+            for name in [name for name, sessions in subscriptions.items()
+                         if session in sessions]:
+                self._unsubscribe(session, topic_name, name)
+            listeners = self._listeners[topic_name]
+            for pattern in [pattern for pattern, listener in listeners.items()
+                            if listener.session is session]:
+                del listeners[pattern]
+
+        for name, providers in self._providers.items():
+            if session in providers:
+                providers.remove(session)
+        for request in list(self._rpcs.values()):
+            if request.requester is session:
+                del self._rpcs[request.correlation_id]
+            elif request.provider is session:
+                self._route_rpc(request)
+
+        if session.authenticated and session.username is not None:
+            self._broadcast_presence(session, actions.PRESENCE_LEAVE)
+
+    def _handle(self, session, message):
+        topic_name = message.topic
+        action = message.action
+        data = message.data
+
+        if topic_name == topic.CONNECTION:
+            self._handle_connection(session, action)
+        elif topic_name == topic.AUTH:
+            self._handle_auth(session, action, data)
+        elif not session.authenticated:
+            session.send(_message(topic.ERROR, actions.ERROR,
+                                  event_constants.NOT_AUTHENTICATED,
+                                  message.raw))
+        elif topic_name == topic.RECORD:
+            self._handle_record(session, message.raw, action, data)
+        elif topic_name == topic.EVENT:
+            self._handle_event(session, message.raw, action, data)
+        elif topic_name == topic.RPC:
+            self._handle_rpc(session, action, data)
+        elif topic_name == topic.PRESENCE:
+            self._handle_presence(session, action, data)
+
+    def _handle_connection(self, session, action):
+        if action == actions.PING:
+            session.send(_message(topic.CONNECTION, actions.PONG))
+        elif action == actions.CHALLENGE_RESPONSE:
+            session.send(_message(topic.CONNECTION, actions.ACK))
+
+    def _handle_auth(self, session, action, data):
+        if action != actions.REQUEST or not data:
+            return
+
+        try:
+            auth_data = json.loads(data[0])
+        except ValueError:
+            auth_data = None
+
+        success, client_data = self._authenticate(auth_data)
+        if not success:
+            session.send(_message(
+                topic.AUTH, actions.ERROR,
+                event_constants.INVALID_AUTHENTICATION_DETAILS,
+                message_builder.typed(client_data)))
+            return
+
+        session.authenticated = True
+        if isinstance(auth_data, dict):
+            session.username = auth_data.get('username')
+        if client_data is None:
+            session.send(_message(topic.AUTH, actions.ACK))
+        else:
+            session.send(_message(topic.AUTH, actions.ACK,
+                                  message_builder.typed(client_data)))
+
+        if session.username is not None:
+            self._broadcast_presence(session, actions.PRESENCE_JOIN)
+
+    def _handle_record(self, session, raw, action, data):
+        name = data[0] if data else None
+
+        if action == actions.CREATEORREAD:
+            record = self.records.setdefault(name, [0, {}])
+            session.send(_message(topic.RECORD, actions.ACK,
+                                  actions.SUBSCRIBE, name))
+            session.send(_message(topic.RECORD, actions.READ, name,
+                                  str(record[0]), json.dumps(record[1])))
+            self._subscribe(session, topic.RECORD, name, ack=False)
+
+        elif action in (actions.UPDATE, actions.PATCH):
+            self._update_record(session, action, data)
+
+        elif action == actions.UNSUBSCRIBE:
+            self._unsubscribe(session, topic.RECORD, name)
+            session.send(_message(topic.RECORD, actions.ACK,
+                                  actions.UNSUBSCRIBE, name))
+
+        elif action == actions.DELETE:
+            self.records.pop(name, None)
+            ack = _message(topic.RECORD, actions.ACK, actions.DELETE, name)
+            session.send(ack)
+            for other in self._subscriptions[topic.RECORD].pop(name, ()):
+                if other is not session:
+                    other.send(ack)
+            self._notify_listeners(topic.RECORD, name, False)
+
+        elif action == actions.SNAPSHOT:
+            if name in self.records:
+                version, record_data = self.records[name]
+                session.send(_message(topic.RECORD, actions.READ, name,
+                                      str(version), json.dumps(record_data)))
+            else:
+                session.send(_message(topic.RECORD, actions.ERROR,
+                                      actions.SNAPSHOT, name,
+                                      event_constants.RECORD_NOT_FOUND))
+
+        elif action == actions.HAS:
+            session.send(_message(topic.RECORD, actions.HAS, name,
+                                  message_builder.typed(name in self.records)))
+
+        else:
+            self._handle_listening(session, topic.RECORD, action, data)
+
+    def _update_record(self, session, action, data):
+        name = data[0]
+        version = int(data[1])
+        record = self.records.setdefault(name, [0, {}])
+
+        if version != record[0] + 1:
+            session.send(_message(topic.RECORD, actions.ERROR,
+                                  event_constants.VERSION_EXISTS, name,
+                                  str(record[0]), json.dumps(record[1])))
+            return
+
+        if action == actions.PATCH:
+            value = message_parser.convert_typed(data[3], self)
+            record[1] = jsonpath.set(record[1], data[2], value, False)
+            config = data[4] if len(data) > 4 else None
+        else:
+            record[1] = json.loads(data[2])
+            config = data[3] if len(data) > 3 else None
+        record[0] = version
+
+        message = _message(topic.RECORD, action,
+                           *data[:4 if action == actions.PATCH else 3])
+        for other in self._subscriptions[topic.RECORD].get(name, ()):
+            if other is not session:
+                other.send(message)
+
+        if config and json.loads(config).get('writeSuccess'):
+            session.send(_message(topic.RECORD, actions.WRITE_ACKNOWLEDGEMENT,
+                                  name, '[{0}]'.format(version),
+                                  message_builder.typed(None)))
+
+    def _handle_event(self, session, raw, action, data):
+        name = data[0] if data else None
+
+        if action == actions.EVENT:
+            message = raw + _END
+            for other in self._subscriptions[topic.EVENT].get(name, ()):
+                if other is not session:
+                    other.send(message)
+        elif action == actions.SUBSCRIBE:
+            self._subscribe(session, topic.EVENT, name)
+        elif action == actions.UNSUBSCRIBE:
+            self._unsubscribe(session, topic.EVENT, name)
+            session.send(_message(topic.EVENT, actions.ACK,
+                                  actions.UNSUBSCRIBE, name))
+        else:
+            self._handle_listening(session, topic.EVENT, action, data)
+
+    def _subscribe(self, session, topic_name, name, ack=True):
+        subscribers = self._subscriptions[topic_name][name]
+        first = not subscribers
+        subscribers.add(session)
+        if ack:
+            session.send(_message(topic_name, actions.ACK,
+                                  actions.SUBSCRIBE, name))
+        if first:
+            self._notify_listeners(topic_name, name, True)
+
+    def _unsubscribe(self, session, topic_name, name):
+        subscriptions = self._subscriptions[topic_name]
+        subscribers = subscriptions.get(name)
+        if not subscribers or session not in subscribers:
+            return
+        subscribers.discard(session)
+        if not subscribers:
+            del subscriptions[name]
+            self._notify_listeners(topic_name, name, False)
+
+    def _handle_listening(self, session, topic_name, action, data):
+        if not data:
+            return
+        pattern = data[0]
+        listeners = self._listeners[topic_name]
+
+        if action == actions.LISTEN:
+            listener = listeners[pattern] = _Listener(session, pattern)
+            session.send(_message(topic_name, actions.ACK, actions.LISTEN,
+                                  pattern))
+            for name in list(self._subscriptions[topic_name]):
+                if listener.regex.search(name):
+                    listener.names[name] = False
+                    session.send(_message(
+                        topic_name, actions.SUBSCRIPTION_FOR_PATTERN_FOUND,
+                        pattern, name))
+
+        elif action == actions.UNLISTEN:
+            listeners.pop(pattern, None)
+            session.send(_message(topic_name, actions.ACK, actions.UNLISTEN,
+                                  pattern))
+
+        elif action in (actions.LISTEN_ACCEPT, actions.LISTEN_REJECT):
+            listener = listeners.get(pattern)
+            if listener is None or len(data) < 2:
+                return
+            accepted = action == actions.LISTEN_ACCEPT
+            listener.names[data[1]] = accepted
+            if topic_name == topic.RECORD:
+                message = _message(topic.RECORD,
+                                   actions.SUBSCRIPTION_HAS_PROVIDER, data[1],
+                                   message_builder.typed(accepted))
+                for other in self._subscriptions[topic.RECORD].get(data[1],
+                                                                   ()):
+                    other.send(message)
+
+    def _notify_listeners(self, topic_name, name, found):
+        for pattern, listener in self._listeners[topic_name].items():
+            if found and listener.regex.search(name):
+                listener.names[name] = False
+                listener.session.send(_message(
+                    topic_name, actions.SUBSCRIPTION_FOR_PATTERN_FOUND,
+                    pattern, name))
+            elif not found and name in listener.names:
+                del listener.names[name]
+                listener.session.send(_message(
+                    topic_name, actions.SUBSCRIPTION_FOR_PATTERN_REMOVED,
+                    pattern, name))
+
+    def _handle_rpc(self, session, action, data):
+        if action == actions.SUBSCRIBE:
+            if session not in self._providers[data[0]]:
+                self._providers[data[0]].append(session)
+            session.send(_message(topic.RPC, actions.ACK, actions.SUBSCRIBE,
+                                  data[0]))
+
+        elif action == actions.UNSUBSCRIBE:
+            if session in self._providers[data[0]]:
+                self._providers[data[0]].remove(session)
+            session.send(_message(topic.RPC, actions.ACK, actions.UNSUBSCRIBE,
+                                  data[0]))
+
+        elif action == actions.REQUEST:
+            name, correlation_id = data[0], data[1]
+            request = _RPCRequest(session, name, correlation_id,
+                                  data[2] if len(data) > 2 else '')
+            self._rpcs[correlation_id] = request
+            self._route_rpc(request)
+
+        elif action == actions.ACK:
+            # P|A|REQ|name|correlationId from the provider
+            request = self._rpcs.get(data[2])
+            if request is not None:
+                request.requester.send(_message(topic.RPC, actions.ACK,
+                                                *data))
+
+        elif action == actions.RESPONSE:
+            request = self._rpcs.pop(data[1], None)
+            if request is not None:
+                request.requester.send(_message(topic.RPC, actions.RESPONSE,
+                                                *data))
+
+        elif action == actions.REJECTION:
+            request = self._rpcs.get(data[1])
+            if request is not None:
+                self._route_rpc(request)
+
+        elif action == actions.ERROR:
+            # P|E|error|name|correlationId from the provider
+            request = self._rpcs.pop(data[2], None)
+            if request is not None:
+                request.requester.send(_message(topic.RPC, actions.ERROR,
+                                                *data))
+
+    def _route_rpc(self, request):
+        if request.provider is not None:
+            request.tried.add(request.provider)
+        candidates = [provider for provider in self._providers.get(
+            request.name, ()) if provider not in request.tried]
+
+        if candidates:
+            # Rotate the providers, so requests are spread across them
+            providers = self._providers[request.name]
+            request.provider = candidates[0]
+            providers.remove(request.provider)
+            providers.append(request.provider)
+            request.provider.send(_message(
+                topic.RPC, actions.REQUEST, request.name,
+                request.correlation_id, request.data))
+            return
+
+        del self._rpcs[request.correlation_id]
+        callback = self._local_providers.get(request.name)
+        if callback is not None:
+            data = (message_parser.convert_typed(request.data, self)
+                    if request.data else None)
+            request.requester.send(_message(
+                topic.RPC, actions.ACK, actions.REQUEST, request.name,
+                request.correlation_id))
+            request.requester.send(_message(
+                topic.RPC, actions.RESPONSE, request.name,
+                request.correlation_id,
+                message_builder.typed(callback(data))))
+        else:
+            request.requester.send(_message(
+                topic.RPC, actions.ERROR, event_constants.NO_RPC_PROVIDER,
+                request.name, request.correlation_id))
+
+    def _handle_presence(self, session, action, data):
+        if action == actions.QUERY:
+            users = sorted(set(
+                other.username for other in self.sessions
+                if other is not session and other.authenticated and
+                other.username is not None))
+            session.send(_message(topic.PRESENCE, actions.QUERY, *users))
+        elif action == actions.SUBSCRIBE:
+            self._presence_subscribers.add(session)
+            session.send(_message(topic.PRESENCE, actions.ACK,
+                                  actions.SUBSCRIBE, topic.PRESENCE))
+        elif action == actions.UNSUBSCRIBE:
+            self._presence_subscribers.discard(session)
+            session.send(_message(topic.PRESENCE, actions.ACK,
+                                  actions.UNSUBSCRIBE, topic.PRESENCE))
+
+    def _broadcast_presence(self, session, action):
+        message = _message(topic.PRESENCE, action, session.username)
+        for other in self._presence_subscribers:
+            if other is not session:
+                other.send(message)
+
+    def _on_error(self, topic_name, event, msg=None):
+        # Errors of message_parser.convert_typed are ignored, the value is
+        # passed through as None. Messages without an action are reported by
+        # the session's parser and dropped.
+        pass
+
+
+class _WebSocketHandler(websocket.WebSocketHandler):
+
+    def initialize(self, server):
+        self._server = server
+        self._session = None
+
+    def check_origin(self, origin):
+        return True
+
+    def open(self):
+        self._session = Session(self._server, self)
+        self._server.sessions.add(self._session)
+
+    def on_message(self, message):
+        self._session.on_message(message)
+
+    def on_close(self):
+        if self._session is not None:
+            self._session.on_message(None)
+
+
+class _TCPServer(tcpserver.TCPServer):
+
+    def __init__(self, server):
+        super(_TCPServer, self).__init__()
+        self._server = server
+
+    @gen.coroutine
+    def handle_stream(self, stream, address):
+        session = None
+
+        def on_message(data):
+            if session is not None:
+                session.on_message(data)
+
+        handler = TCPHandler(stream, on_message)
+        session = Session(self._server, handler)
+        self._server.sessions.add(session)
+        yield handler.read_messages()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run an in-memory deepstream stand-in server.")
+    parser.add_argument('--address', default='localhost')
+    parser.add_argument('--port', type=int, default=6020,
+                        help="websocket port, served on /deepstream")
+    parser.add_argument('--tcp-port', type=int,
+                        help="also serve tcp:// on this port")
+    parser.add_argument('--heartbeat-interval', type=float, default=30)
+    args = parser.parse_args()
+
+    server = Server(heartbeat_interval=args.heartbeat_interval)
+    port = server.listen(args.port, args.address)
+    print("Serving ws://{0}:{1}/deepstream".format(args.address, port))
+    if args.tcp_port is not None:
+        tcp_port = server.listen_tcp(args.tcp_port, args.address)
+        print("Serving tcp://{0}:{1}".format(args.address, tcp_port))
+    ioloop.IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""Shared timeouts for records, RPCs, listeners and acknowledgements."""
+
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from functools import partial
+import math
+
+
+class Timeout(object):
+    """Handle of a timeout scheduled on a ``TimerWheel``."""
+
+    __slots__ = ('tick', 'sequence', 'callback', 'slot')
+
+    def __init__(self, tick, sequence, callback, slot):
+        self.tick = tick
+        self.sequence = sequence
+        self.callback = callback
+        self.slot = slot
+
+
+class TimerWheel(object):
+    """Hashed timing wheel running on an IOLoop.
+
+    Timeouts are rounded up to ``resolution`` seconds and stored in one of
+    ``size`` slots, so adding and removing one is O(1) regardless of how many
+    are pending. The IOLoop is only woken up for ticks whose slot holds a
+    timeout.
+
+    Offers the ``call_later``/``remove_timeout`` subset of the IOLoop API.
+    Expired callbacks are run with ``IOLoop.add_callback``, so errors they
+    raise are handled by the IOLoop as usual, and can still be cancelled
+    until they ran.
+    """
+
+    def __init__(self, io_loop, resolution=0.01, size=512):
+        self._io_loop = io_loop
+        self._resolution = resolution
+        self._slots = [set() for _ in range(size)]
+        self._start = io_loop.time()
+        self._current_tick = 0
+        self._pending = 0
+        self._sequence = 0
+
+        self._wake_tick = None
+        self._wake_timeout = None
+
+    def __len__(self):
+        return self._pending
+
+    def call_later(self, delay, callback, *args, **kwargs):
+        """Run ``callback`` after at least ``delay`` seconds.
+
+        Returns:
+            Timeout: A handle that can be passed to ``remove_timeout``
+        """
+        if args or kwargs:
+            callback = partial(callback, *args, **kwargs)
+
+        now = self._io_loop.time()
+        if not self._pending:
+            # Nothing to expire in between, skip the ticks spent idle
+            self._current_tick = max(self._current_tick, self._tick_at(now))
+
+        tick = max(int(math.ceil((now + delay - self._start) /
+                                 self._resolution)),
+                   self._current_tick + 1)
+        slot = self._slots[tick % len(self._slots)]
+        self._sequence += 1
+        timeout = Timeout(tick, self._sequence, callback, slot)
+        slot.add(timeout)
+        self._pending += 1
+
+        if self._wake_tick is None or tick < self._wake_tick:
+            self._schedule_wake(tick)
+
+        return timeout
+
+    def remove_timeout(self, timeout):
+        """Cancel a pending timeout. Does nothing if it already ran."""
+        if timeout is None:
+            return
+
+        if timeout.slot is not None:
+            timeout.slot.discard(timeout)
+            timeout.slot = None
+            self._pending -= 1
+        timeout.callback = None
+
+    def _schedule_wake(self, tick):
+        if self._wake_timeout is not None:
+            self._io_loop.remove_timeout(self._wake_timeout)
+
+        self._wake_tick = tick
+        self._wake_timeout = self._io_loop.call_at(
+            self._start + tick * self._resolution, self._on_wake)
+
+    def _on_wake(self):
+        self._wake_tick = None
+        self._wake_timeout = None
+
+        now_tick = self._tick_at(self._io_loop.time())
+        size = len(self._slots)
+        # Every slot is visited at most once, however long the IOLoop was
+        # blocked
+        last_tick = min(now_tick, self._current_tick + size)
+        expired = []
+        for tick in range(self._current_tick + 1, last_tick + 1):
+            if not self._pending:
+                break
+            slot = self._slots[tick % size]
+            for timeout in [timeout for timeout in slot
+                            if timeout.tick <= now_tick]:
+                slot.discard(timeout)
+                timeout.slot = None
+                self._pending -= 1
+                expired.append(timeout)
+
+        # Same order as the IOLoop, timeouts added first run first
+        expired.sort(key=lambda timeout: (timeout.tick, timeout.sequence))
+        for timeout in expired:
+            self._io_loop.add_callback(self._run, timeout)
+
+        self._current_tick = max(self._current_tick, now_tick)
+
+        if self._pending:
+            self._schedule_wake(self._next_occupied_tick())
+
+    def _tick_at(self, time):
+        return int((time - self._start) / self._resolution)
+
+    @staticmethod
+    def _run(timeout):
+        # Timeouts expiring together may cancel each other before they run
+        callback, timeout.callback = timeout.callback, None
+        if callback is not None:
+            callback()
+
+    def _next_occupied_tick(self):
+        size = len(self._slots)
+        for tick in range(self._current_tick + 1, self._current_tick + size + 1):
+            if self._slots[tick % size]:
+                return tick
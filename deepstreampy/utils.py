@@ -7,9 +7,10 @@ from deepstreampy.constants import connection_state
 
 from pyee import EventEmitter
 from tornado import concurrent
+from tornado.platform.auto import monotonic_time
 
 from functools import partial
-from collections import namedtuple
+from collections import namedtuple, OrderedDict, deque
 
 import sys
 import time
@@ -19,6 +20,9 @@ num_types = ((int, long, float, complex)
              if sys.version_info < (3, ) else (int, float, complex))
 str_types = (str, unicode) if sys.version_info < (3, ) else (str, )
 
+# Falls back to the wall clock on Python 2 without the monotonic package
+monotonic = monotonic_time or time.time
+
 
 class SingleNotifier(object):
     def __init__(self, client, connection, topic, action, timeout_duration):
@@ -45,7 +49,7 @@ class SingleNotifier(object):
             future = concurrent.Future()
             future.set_result()
 
-        response_timeout = self._client.io_loop.call_later(
+        response_timeout = self._client.timer_wheel.call_later(
             self._timeout_duration, partial(self._on_response_timeout, name))
         self._requests[name].append({
             'timeout': response_timeout,
@@ -57,7 +61,7 @@ class SingleNotifier(object):
     def receive(self, name, error, data):
         entries = self._requests[name]
         for entry in entries:
-            self._client.io_loop.remove_timeout(entry['timeout'])
+            self._client.timer_wheel.remove_timeout(entry['timeout'])
             entry['callback'](error, data)
         del self._requests[name]
 
@@ -88,7 +92,7 @@ class Listener(object):
         self._send_future = None
 
         subscription_timeout = options.get("subscriptionTimeout", 15)
-        self._ack_timeout = connection._io_loop.call_later(
+        self._ack_timeout = client.timer_wheel.call_later(
             subscription_timeout, self._on_ack_timeout)
         self._resubscribe_notifier = ResubscribeNotifier(
             client, self._send_listen)
@@ -125,7 +129,7 @@ class Listener(object):
         action = message['action']
         data = message['data']
         if action == action_constants.ACK:
-            self._connection._io_loop.remove_timeout(self._ack_timeout)
+            self._client.timer_wheel.remove_timeout(self._ack_timeout)
         elif action == action_constants.SUBSCRIPTION_FOR_PATTERN_FOUND:
             # TODO: Show deprecated message
             self._callback(data[1], True,
@@ -157,11 +161,8 @@ class Listener(object):
 
 class ResubscribeNotifier(object):
     """
-    Makes sure that all functionality is resubscribed on reconnect. Subscription
-    is called when the connection drops - which seems counterintuitive, but in
-    fact just means that the re-subscription message will be added to the queue
-    of messages that need re-sending as soon as the connection is
-    re-established.
+    Makes sure that all functionality is resubscribed on reconnect, by
+    registering with the client's ``ResubscriptionManager``.
 
     Resubscribe logic should only occur once per connection loss.
     """
@@ -173,23 +174,102 @@ class ResubscribeNotifier(object):
             resubscribe: callable to call to allow resubscribing
         """
         self._client = client
-        self._resubscribe = resubscribe
-
-        self._is_reconnecting = False
-        self._client.on(event_constants.CONNECTION_STATE_CHANGED,
-                        self._handle_connection_state_changes)
+        self.resubscribe = resubscribe
+        self._client.resubscriptions.add(self)
 
     def destroy(self):
-        self._client.remove_listener(event_constants.CONNECTION_STATE_CHANGED,
-                                     self._handle_connection_state_changes)
+        self._client.resubscriptions.remove(self)
         self._client = None
 
+
+class ResubscriptionManager(object):
+    """
+    Replays the subscriptions of all live ``ResubscribeNotifier`` instances
+    once the connection is open again after it was lost.
+
+    Only notifiers that existed when the connection was lost are replayed,
+    anything subscribed while reconnecting is already queued. They are replayed
+    ``resubscribeBatchSize`` at a time, each batch written in as few frames as
+    possible, with ``resubscribeInterval`` seconds between batches. The client
+    emits ``resubscribeProgress`` with the number of replayed and total
+    notifiers after each batch, and ``resubscribeComplete`` at the end.
+    """
+
+    def __init__(self, client, connection, **options):
+        self._client = client
+        self._connection = connection
+        self._batch_size = options.get('resubscribeBatchSize', 1000)
+        self._interval = options.get('resubscribeInterval', 0.01)
+
+        self._notifiers = OrderedDict()
+        self._pending = deque()
+        self._replayed = 0
+        self._total = 0
+        self._replay_timeout = None
+        self._is_reconnecting = False
+
+        client.on(event_constants.CONNECTION_STATE_CHANGED,
+                  self._handle_connection_state_changes)
+
+    def __len__(self):
+        return len(self._notifiers)
+
+    def add(self, notifier):
+        self._notifiers[notifier] = None
+
+    def remove(self, notifier):
+        self._notifiers.pop(notifier, None)
+
+    @property
+    def pending(self):
+        """int: Number of notifiers still to be replayed."""
+        return len(self._pending)
+
     def _handle_connection_state_changes(self, state):
         if state == connection_state.RECONNECTING and not self._is_reconnecting:
             self._is_reconnecting = True
+            self._stop_replay()
+            self._pending = deque(self._notifiers)
         elif state == connection_state.OPEN and self._is_reconnecting:
             self._is_reconnecting = False
-            self._resubscribe()
+            self._replayed = 0
+            self._total = len(self._pending)
+            self._replay_batch()
+
+    def _stop_replay(self):
+        if self._replay_timeout is not None:
+            self._connection.io_loop.remove_timeout(self._replay_timeout)
+            self._replay_timeout = None
+
+    def _replay_batch(self):
+        self._replay_timeout = None
+        if self._connection.state != connection_state.OPEN:
+            return
+
+        pending = self._pending
+        notifiers = self._notifiers
+        sent = 0
+
+        self._connection.cork()
+        try:
+            while pending and sent < self._batch_size:
+                notifier = pending.popleft()
+                self._replayed += 1
+                # Skip notifiers destroyed since the connection was lost
+                if notifier in notifiers:
+                    notifier.resubscribe()
+                    sent += 1
+        finally:
+            self._connection.uncork()
+
+        self._client.emit(event_constants.RESUBSCRIBE_PROGRESS,
+                          self._replayed, self._total)
+        if pending:
+            self._replay_timeout = self._connection.io_loop.call_later(
+                self._interval, self._replay_batch)
+        else:
+            self._client.emit(event_constants.RESUBSCRIBE_COMPLETE,
+                              self._total)
 
 
 class AckTimeoutRegistry(EventEmitter):
@@ -204,7 +284,7 @@ class AckTimeoutRegistry(EventEmitter):
         unique_name = (action or "") + name
 
         self.remove(unique_name, action)
-        timeout = self._client.io_loop.call_later(self._timeout_duration,
+        timeout = self._client.timer_wheel.call_later(self._timeout_duration,
                                                   partial(
                                                       self._on_timeout,
                                                       unique_name, name))
@@ -220,7 +300,7 @@ class AckTimeoutRegistry(EventEmitter):
 
         if unique_name in self._register:
             timeout = self._register[unique_name]
-            self._client.io_loop.remove_timeout(timeout)
+            self._client.timer_wheel.remove_timeout(timeout)
         else:
             self._client._on_error(self._topic,
                                    event_constants.UNSOLICITED_MESSAGE,
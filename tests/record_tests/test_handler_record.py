@@ -148,3 +148,45 @@ class TestRecordDeleted(testing.AsyncTestCase):
         self.assertFalse(new_record is self.record_A)
         self.handler.write_message.assert_called_with(
             "R{0}CR{0}record_A{1}".format(chr(31), chr(30)).encode())
+
+
+class TestConflatedWrites(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(TestConflatedWrites, self).setUp()
+
+        self.client = client.Client(URL, maxQueuedMessages=2,
+                                    queueOverflowPolicy='conflate')
+        self.handler = mock.Mock()
+        self.handler.stream.closed = mock.Mock(return_value=False)
+        self.client._connection._state = connection_state.OPEN
+        self.client._connection._websocket_handler = self.handler
+        self.record = self.client.record._get_record('record_A')
+        self.record._on_message({'topic': 'R', 'action': 'R',
+                                 'data': ['record_A', 0, '{}']})
+        self.client._connection._state = connection_state.AUTHENTICATING
+
+    def test_update_replaces_queued_writes(self):
+        first_callback = mock.Mock()
+        last_callback = mock.Mock()
+        self.record.set('a', 'x', first_callback)
+        self.record.set('b', 'y')
+        self.record.set({'z': 1}, callback=last_callback)
+
+        self.assertEqual(self.record.version, 1)
+        self.record.set('c', 'z')
+        self.assertEqual(self.record.version, 2)
+
+        self.record._on_message({'topic': 'R', 'action': 'WA',
+                                 'data': ['record_A', '[1]', 'L']})
+        first_callback.assert_called_once_with(None)
+        last_callback.assert_called_once_with(None)
+
+    def test_update_without_write_acknowledgement(self):
+        callback = mock.Mock()
+        self.record.set('a', 'x', callback)
+        self.record.set('b', 'y')
+        self.record.set({'z': 1})
+
+        self.assertEqual(self.record.version, 1)
+        callback.assert_called_once_with("Write was replaced by a later update")
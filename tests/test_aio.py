@@ -0,0 +1,127 @@
+"""Tests for the asyncio transport and the async/await client."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import constants
+from tests.util import ServerThread
+
+import unittest
+
+import sys
+
+if sys.version_info >= (3, 5):
+    import asyncio
+    from deepstreampy import aio
+
+
+def _set_up_server(server):
+    server.set_record('recordA', {'x': 1})
+    server.provide('echo', lambda data: data)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio requires Python 3.5")
+class AsyncClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ServerThread(_set_up_server)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.url = 'ws://localhost:{0}/deepstream'.format(self.server.port)
+        self.client = aio.AsyncClient(self.url, loop=self.loop)
+
+    def tearDown(self):
+        self.client.close()
+        self.loop.run_until_complete(asyncio.sleep(0.01))
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def _run(self, awaitable):
+        return self.loop.run_until_complete(
+            asyncio.wait_for(awaitable, 5))
+
+    def _login(self, client=None, username='Homer'):
+        client = client or self.client
+        self._run(client.connect())
+        return self._run(client.login({'username': username}))
+
+    def test_connect_and_login(self):
+        result = self._login()
+        self.assertEqual(result, {'success': True, 'error': None,
+                                  'message': None})
+        self.assertEqual(self.client.connection_state,
+                         constants.connection_state.OPEN)
+
+    def test_rpc_make(self):
+        self._login()
+        result = self._run(self.client.rpc.make('echo', {'numA': 2}))
+        self.assertEqual(result, {'numA': 2})
+
+        results = self._run(asyncio.gather(
+            *[self.client.rpc.make('echo', i) for i in range(10)]))
+        self.assertEqual(results, list(range(10)))
+
+    def test_get_record(self):
+        self._login()
+        record = self._run(self.client.record.get_record('recordA'))
+        self._run(asyncio.sleep(0.05))
+        self.assertEqual(record.get(), {'x': 1})
+
+    def test_anonymous_record(self):
+        self._login()
+        anonymous = self._run(self.client.record.get_anonymous_record())
+        ready = self.loop.create_future()
+        anonymous.on('ready', lambda record: ready.set_result(record))
+        anonymous.name = 'recordA'
+        self._run(ready)
+        self.assertEqual(anonymous.get(), {'x': 1})
+
+    def test_presence_get_all(self):
+        self._login()
+        other = aio.AsyncClient(self.url, loop=self.loop)
+        self._login(other, 'Marge')
+        try:
+            self.assertEqual(self._run(self.client.presence.get_all()),
+                             ['Marge'])
+        finally:
+            other.close()
+
+    def test_connection_refused(self):
+        client = aio.AsyncClient('ws://localhost:1/deepstream',
+                                 loop=self.loop, maxReconnectAttempts=0)
+        errors = []
+        client.on('error', lambda *args: errors.append(args))
+        with self.assertRaises(OSError):
+            self._run(client.connect())
+        self.assertEqual(errors[0][1], constants.event.CONNECTION_ERROR)
+
+    def test_compression_unsupported(self):
+        with self.assertRaises(ValueError):
+            aio.AsyncClient(self.url, loop=self.loop, compression=True)
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "asyncio requires Python 3.5")
+class FrameTest(unittest.TestCase):
+
+    def test_mask_roundtrip(self):
+        for length in (0, 1, 5, 125, 126, 70000):
+            data = bytes(bytearray(i % 256 for i in range(length)))
+            masked = aio._apply_mask(b'\x01\x02\x03\x04', data)
+            self.assertEqual(aio._apply_mask(b'\x01\x02\x03\x04', masked),
+                             data)
+
+    def test_frame_lengths(self):
+        self.assertEqual(len(aio._build_frame(aio._OPCODE_TEXT, b'x' * 125)),
+                         2 + 4 + 125)
+        self.assertEqual(len(aio._build_frame(aio._OPCODE_TEXT, b'x' * 126)),
+                         4 + 4 + 126)
+        self.assertEqual(len(aio._build_frame(aio._OPCODE_TEXT,
+                                              b'x' * 65536)),
+                         10 + 4 + 65536)
@@ -5,14 +5,17 @@ respective callbacks are made, and events triggered.
 from __future__ import absolute_import, division, print_function, with_statement
 from __future__ import unicode_literals
 
-from deepstreampy.message import connection
-from deepstreampy import constants
+from deepstreampy.message import connection, message_builder
+from deepstreampy.message.compression import Compression
+from deepstreampy import client, constants
+from tests.util import mock_websocket_handler
 
-from tornado import testing
+from tornado import testing, web, websocket
 import unittest
 
 import sys
 import errno
+import warnings
 
 if sys.version_info[0] < 3:
     import mock
@@ -93,6 +96,32 @@ class ConnectionTest(unittest.TestCase):
                          constants.connection_state.CLOSED)
         self.assertEqual(self._get_connection_state_changes(), 5)
 
+    def test_dispatches_every_message(self):
+        conn = connection.Connection(self.client, URL)
+        conn._on_data('E{0}EVT{0}a{1}E{0}EVT{0}b{1}E{0}EVT'.format(chr(31),
+                                                                  chr(30)))
+        conn._on_data('{0}c{1}'.format(chr(31), chr(30)))
+        self.assertEqual(
+            [call_args[0][0]['data'] for call_args in
+             self.client._on_message.call_args_list],
+            [['a'], ['b'], ['c']])
+
+    def test_flushes_queue_in_frames(self):
+        conn = connection.Connection(self.client, URL, queueFlushFrameSize=15)
+        conn._websocket_handler = self.handler
+        self.handler.stream.closed = mock.Mock(return_value=True)
+        for name in ('a', 'b', 'c'):
+            conn.send_message('E', 'S', [name])
+        self.handler.write_message.assert_not_called()
+
+        self.handler.stream.closed.return_value = False
+        conn._state = constants.connection_state.OPEN
+        conn._send_queued_messages()
+        self.assertEqual(
+            list(self._get_sent_messages()),
+            [('E{0}S{0}a{1}E{0}S{0}b{1}'.format(chr(31), chr(30)).encode(),),
+             ('E{0}S{0}c{1}'.format(chr(31), chr(30)).encode(),)])
+
     def test_connect_error(self):
         conn = connection.Connection(self.client, URL)
         assert conn.state == constants.connection_state.CLOSED
@@ -115,6 +144,40 @@ class ConnectionTest(unittest.TestCase):
         self.assertEqual(conn.state,
                          constants.connection_state.ERROR)
 
+    def test_failover(self):
+        conn = connection.Connection(
+            self.client, ['ws://a/deepstream', 'ws://b/deepstream'],
+            maxReconnectAttempts=None)
+        conn.connect = mock.Mock()
+        connect_future = mock.Mock()
+        connect_future.exception.return_value = IOError(
+            (errno.ECONNREFUSED, "Connection refused"))
+
+        urls = []
+        for _ in range(5):
+            conn._on_open(connect_future)
+            self.assertEqual(conn.state,
+                             constants.connection_state.RECONNECTING)
+            conn._try_open()
+            urls.append(conn._url)
+        self.assertEqual(urls, ['ws://b/deepstream', 'ws://a/deepstream'] * 2 +
+                         ['ws://b/deepstream'])
+        self.assertEqual(conn.connect.call_count, 5)
+
+    def test_decorrelated_jitter(self):
+        conn = connection.Connection(self.client, URL,
+                                     reconnectBackoff='decorrelatedJitter',
+                                     reconnectAttemptInterval=1,
+                                     maxReconnectInterval=10)
+        self.assertLessEqual(conn._get_reconnect_interval(), 1)
+        conn._reconnection_attempt = 1
+        intervals = [conn._get_reconnect_interval() for _ in range(20)]
+        self.assertTrue(all(1 <= interval <= 10 for interval in intervals))
+        self.assertNotEqual(len(set(intervals)), 1)
+
+        with self.assertRaises(ValueError):
+            connection.Connection(self.client, URL, reconnectBackoff='random')
+
     def test_too_many_auth_attempts(self):
         conn = connection.Connection(self.client, URL)
         connect_future = mock.Mock()
@@ -186,6 +249,393 @@ class TestHeartbeat(testing.AsyncTestCase):
         self.assertEqual(self.connection.state,
                          constants.connection_state.ERROR)
 
+    @testing.gen_test
+    def test_any_traffic_keeps_alive(self):
+        deadline = self.connection._heartbeat_callback
+        for _ in range(6):
+            yield testing.gen.sleep(0.03)
+            self.connection._on_data("E{0}EVT{0}e{0}S{1}".format(chr(31),
+                                                                 chr(30)))
+        self.assertEqual(self.connection.state,
+                         constants.connection_state.AWAITING_AUTHENTICATION)
+        # The deadline is only moved when it passes, not for every message
+        self.assertIsNot(self.connection._heartbeat_callback, deadline)
+
+
+class TestPing(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(TestPing, self).setUp()
+        self.connection = connection.Connection(
+            mock.Mock(), URL, pingInterval=0.02)
+        self.connection._io_loop = self.io_loop
+
+        self.handler = mock.Mock()
+        self.handler.stream.closed = mock.Mock(return_value=False)
+        self.connection._websocket_handler = self.handler
+        self.connection._state = constants.connection_state.AUTHENTICATING
+        self.connection._on_data("A{0}A{1}".format(chr(31), chr(30)))
+
+    def tearDown(self):
+        self.connection._stop_pinging()
+        super(TestPing, self).tearDown()
+
+    @testing.gen_test
+    def test_records_rtt(self):
+        ping = "C{0}PI{1}".format(chr(31), chr(30)).encode()
+        yield testing.gen.sleep(0.03)
+        self.handler.write_message.assert_called_once_with(ping)
+
+        # No second ping while the first is unanswered
+        yield testing.gen.sleep(0.02)
+        self.assertEqual(self.handler.write_message.call_count, 1)
+
+        self.connection._on_data("C{0}PO{1}".format(chr(31), chr(30)))
+        rtt = self.connection.rtt
+        self.assertEqual(rtt.count, 1)
+        self.assertGreaterEqual(rtt.last, 0.02)
+
+        yield testing.gen.sleep(0.03)
+        self.assertEqual(self.handler.write_message.call_count, 2)
+
+    def test_stops_on_close(self):
+        self.connection.close()
+        self.assertIsNone(self.connection._ping_callback)
+
+    def test_answers_ping(self):
+        pong = "C{0}PO{1}".format(chr(31), chr(30)).encode()
+        self.connection._on_data("C{0}PI{1}".format(chr(31), chr(30)))
+        self.handler.write_message.assert_called_once_with(pong)
+
+        # Completes an incomplete message instead of being a ping of its own
+        self.handler.write_message.reset_mock()
+        self.connection._on_data("E{0}EVT{0}news".format(chr(31)))
+        self.connection._on_data("C{0}PI{1}".format(chr(31), chr(30)))
+        self.handler.write_message.assert_not_called()
+
+
+class TestPacketCoalescing(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(TestPacketCoalescing, self).setUp()
+        self.connection = connection.Connection(
+            mock.Mock(), URL, maxMessagesPerPacket=3)
+        self.connection._io_loop = self.io_loop
+        self.connection._state = constants.connection_state.OPEN
+
+        self.handler = mock_websocket_handler()
+        self.connection._websocket_handler = self.handler
+
+    @testing.gen_test
+    def test_coalesces_messages(self):
+        futures = [self.connection.send_message('E', 'EVT', ['e', str(i)])
+                   for i in range(4)]
+        self.handler.write_message.assert_called_once_with(
+            'E{0}EVT{0}e{0}0{1}E{0}EVT{0}e{0}1{1}E{0}EVT{0}e{0}2{1}'.format(
+                chr(31), chr(30)).encode())
+
+        yield futures[3]
+        self.assertEqual(self.handler.write_message.call_count, 2)
+        self.handler.write_message.assert_called_with(
+            'E{0}EVT{0}e{0}3{1}'.format(chr(31), chr(30)).encode())
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_queues_packet_when_closed(self):
+        self.connection.send_message('E', 'EVT', ['e'])
+        self.handler.stream.closed.return_value = True
+        self.connection._send_packet()
+        self.handler.write_message.assert_not_called()
+        self.assertEqual(len(self.connection._queued_messages), 1)
+
+
+class TestPreConnectPipelining(unittest.TestCase):
+
+    def setUp(self):
+        super(TestPreConnectPipelining, self).setUp()
+        self.connection = connection.Connection(mock.Mock(), URL)
+        self.handler = mock_websocket_handler()
+
+    def test_flushes_on_authentication(self):
+        # Sent before the socket exists
+        futures = [self.connection.send_message('E', 'S', ['e'])]
+
+        self.connection._websocket_handler = self.handler
+        self.connection._state = constants.connection_state.AWAITING_CONNECTION
+        futures.append(self.connection.send_message('R', 'CR', ['r']))
+
+        # The handshake is not held back
+        self.connection._on_data('C{0}CH{1}'.format(chr(31), chr(30)))
+        self.handler.write_message.assert_called_once_with(
+            'C{0}CHR{0}{2}{1}'.format(chr(31), chr(30), URL).encode())
+        self.connection._on_data('C{0}A{1}'.format(chr(31), chr(30)))
+        self.connection.authenticate({'user': 'Homer'})
+        self.assertEqual(self.handler.write_message.call_count, 2)
+        self.assertFalse(any(future.done() for future in futures))
+
+        self.connection._on_data('A{0}A{1}'.format(chr(31), chr(30)))
+        self.assertEqual(self.handler.write_message.call_count, 3)
+        self.handler.write_message.assert_called_with(
+            'E{0}S{0}e{1}R{0}CR{0}r{1}'.format(chr(31), chr(30)).encode())
+        self.assertTrue(all(future.done() for future in futures))
+
+
+class TestMessageBatch(unittest.TestCase):
+
+    def setUp(self):
+        super(TestMessageBatch, self).setUp()
+        self.client = client.Client(URL)
+        self.connection = self.client._connection
+        self.connection._state = constants.connection_state.OPEN
+
+        self.handler = mock_websocket_handler()
+        self.connection._websocket_handler = self.handler
+
+    def _batch(self):
+        batch = message_builder.MessageBatch()
+        batch.add('E', 'S', ['a'])
+        batch.add('R', 'U', ['r', 1, {'x': 1}])
+        return batch
+
+    def test_single_frame(self):
+        future = self.connection.send_batch(self._batch())
+        self.handler.write_message.assert_called_once_with(
+            'E{0}S{0}a{1}R{0}U{0}r{0}1{0}{{"x":1}}{1}'.format(
+                chr(31), chr(30)).encode())
+        self.assertTrue(future.done())
+
+        self.assertTrue(
+            self.connection.send_batch(message_builder.MessageBatch()).done())
+        self.assertEqual(self.handler.write_message.call_count, 1)
+
+    def test_queued_one_by_one(self):
+        self.connection._state = constants.connection_state.RECONNECTING
+        future = self.connection.send_batch(self._batch())
+        self.assertEqual(len(self.connection._queued_messages), 2)
+        self.assertFalse(future.done())
+
+        self.connection._state = constants.connection_state.OPEN
+        self.connection._send_queued_messages()
+        self.assertEqual(self.handler.write_message.call_count, 1)
+        self.assertTrue(future.done())
+
+    def test_corked_messages_batched(self):
+        self.connection.cork()
+        futures = [self.connection.send_message('E', 'S', [str(i)])
+                   for i in range(3)]
+        self.handler.write_message.assert_not_called()
+
+        self.connection.uncork()
+        self.handler.write_message.assert_called_once_with(
+            'E{0}S{0}0{1}E{0}S{0}1{1}E{0}S{0}2{1}'.format(
+                chr(31), chr(30)).encode())
+        self.assertTrue(all(future.done() for future in futures))
+
+    def test_replies_to_frame_sent_together(self):
+        self.client.event.listen('a/.*', lambda name, is_subscribed,
+                                 response: response.accept())
+        self.handler.write_message.reset_mock()
+
+        self.connection._on_data(''.join(
+            'E{0}SP{0}a/.*{0}a/{2}{1}'.format(chr(31), chr(30), i)
+            for i in range(3)))
+        self.handler.write_message.assert_called_once_with(''.join(
+            'E{0}LA{0}a/.*{0}a/{2}{1}'.format(chr(31), chr(30), i)
+            for i in range(3)).encode())
+
+
+class TestTrustedServer(unittest.TestCase):
+
+    def test_dispatches_to_handlers(self):
+        c = client.Client(URL, trustedServer=True)
+        callback = mock.Mock()
+        c.event.subscribe('news', callback)
+
+        with mock.patch.object(c, '_on_message') as on_message:
+            c._connection._on_data('E{0}EVT{0}news{0}SHello{1}'
+                                   'Z{0}EVT{0}x{1}'.format(chr(31), chr(30)))
+        callback.assert_called_once_with('Hello')
+        # Only the unknown topic goes through the client
+        self.assertEqual(on_message.call_count, 1)
+        self.assertEqual(on_message.call_args[0][0].topic, 'Z')
+
+        c._connection._on_data('C{0}CH{1}'.format(chr(31), chr(30)))
+        self.assertEqual(c.connection_state,
+                         constants.connection_state.CHALLENGING)
+
+
+class _PendingWritesTest(unittest.TestCase):
+
+    def setUp(self):
+        super(_PendingWritesTest, self).setUp()
+        self.connection = connection.Connection(
+            mock.Mock(), URL, maxWriteBufferSize=10)
+        self.connection._state = constants.connection_state.OPEN
+        self.write_futures = []
+
+        self.handler = mock_websocket_handler(self.write_futures)
+        self.connection._websocket_handler = self.handler
+
+
+class TestPriorityLanes(_PendingWritesTest):
+
+    def test_control_before_bulk_data(self):
+        self.connection.send_message('R', 'U', ['r', 1, '{}'])
+        self.assertEqual(self.connection._write_buffer_size, 11)
+
+        event = self.connection.send_message('E', 'EVT', ['e'])
+        update = self.connection.send_message('R', 'U', ['r', 2, '{}'])
+        subscribe = self.connection.send_message('E', 'S', ['e'])
+        pong = self.connection.send_message('C', 'PO', None)
+        self.assertEqual(self.handler.write_message.call_count, 1)
+
+        self.write_futures[0].set_result(None)
+        self.handler.write_message.assert_called_with(
+            'C{0}PO{1}E{0}EVT{0}e{1}R{0}U{0}r{0}2{0}{{}}{1}E{0}S{0}e{1}'
+            .format(chr(31), chr(30)).encode())
+
+        self.write_futures[1].set_result(None)
+        self.assertTrue(all(future.done() for future in
+                            (event, update, subscribe, pong)))
+        self.assertEqual(self.connection._write_buffer_size, 0)
+
+
+class TestBackpressure(_PendingWritesTest):
+
+    def setUp(self):
+        super(TestBackpressure, self).setUp()
+        self.client = mock.Mock()
+        self.connection._client = self.client
+        self.connection._write_high_watermark = 20
+        self.connection._write_low_watermark = 5
+        self.connection._max_write_buffer_size = 100
+
+    def test_drain(self):
+        drain_future = self.connection.drain()
+        self.assertTrue(drain_future.done())
+
+        for name in ('a', 'b'):
+            self.connection.send_message('E', 'EVT', [name])
+        self.assertTrue(self.connection.writable)
+        self.connection.send_message('E', 'EVT', ['c'])
+        self.assertFalse(self.connection.writable)
+        self.assertEqual(self.connection.buffered_bytes, 24)
+        self.client.emit.assert_called_with(
+            constants.event.WRITE_BUFFER_HIGH, 24)
+
+        drain_future = self.connection.drain()
+        self.write_futures[0].set_result(None)
+        self.write_futures[1].set_result(None)
+        self.assertFalse(drain_future.done())
+
+        self.write_futures[2].set_result(None)
+        self.assertTrue(drain_future.done())
+        self.assertTrue(self.connection.writable)
+        self.client.emit.assert_called_with(
+            constants.event.WRITE_BUFFER_DRAINED, 0)
+
+
+class _SlowHandler(websocket.WebSocketHandler):
+
+    @testing.gen.coroutine
+    def prepare(self):
+        yield testing.gen.sleep(0.2)
+
+
+class TestServerSelection(testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return web.Application([('/fast', websocket.WebSocketHandler),
+                                ('/slow', _SlowHandler)])
+
+    @testing.gen_test
+    def test_select_fastest_server(self):
+        url = 'ws://localhost:{0}/'.format(self.get_http_port())
+        conn = connection.Connection(mock.Mock(), [url + 'slow', url + 'fast'],
+                                     selectFastestServer=True)
+        handler = yield conn.connect()
+        self.assertIs(conn._websocket_handler, handler)
+        self.assertEqual(conn._url, url + 'fast')
+        self.assertEqual(conn.state,
+                         constants.connection_state.AWAITING_CONNECTION)
+
+        yield testing.gen.sleep(0.3)
+        self.assertEqual(conn._urls, [url + 'fast', url + 'slow'])
+        self.assertLess(conn._server_latencies[url + 'fast'],
+                        conn._server_latencies[url + 'slow'])
+        conn.close()
+
+
+class _CompressingHandler(websocket.WebSocketHandler):
+
+    received_messages = []
+
+    def get_compression_options(self):
+        return {}
+
+    def on_message(self, message):
+        _CompressingHandler.received_messages.append(message)
+
+
+class TestCompression(testing.AsyncHTTPTestCase):
+
+    def get_app(self):
+        return web.Application([('/deepstream', _CompressingHandler)])
+
+    @testing.gen_test
+    def test_compression(self):
+        _CompressingHandler.received_messages = []
+        conn = connection.Connection(
+            mock.Mock(),
+            'ws://localhost:{0}/deepstream'.format(self.get_http_port()),
+            compression=True, compressionLevel=9, compressionThreshold=100)
+        self.assertEqual(conn.compression_stats,
+                         {'raw_bytes': 0,
+                          'compressed_bytes': 0,
+                          'uncompressed_bytes': 0})
+        yield conn.connect()
+        conn._state = constants.connection_state.OPEN
+
+        large_value = 'x' * 1000
+        yield conn.send_message('E', 'EVT', ['e', large_value])
+        yield conn.send_message('E', 'EVT', ['e'])
+        while len(_CompressingHandler.received_messages) < 2:
+            yield testing.gen.moment
+
+        self.assertEqual(_CompressingHandler.received_messages, [
+            'E{0}EVT{0}e{0}{2}{1}'.format(chr(31), chr(30), large_value),
+            'E{0}EVT{0}e{1}'.format(chr(31), chr(30))])
+
+        stats = conn.compression_stats
+        self.assertEqual(stats['raw_bytes'], 1009)
+        self.assertTrue(0 < stats['compressed_bytes'] < 100)
+        self.assertEqual(stats['uncompressed_bytes'], 8)
+        conn.close()
+
+    def test_compression_disabled(self):
+        conn = connection.Connection(mock.Mock(), URL)
+        self.assertIsNone(conn.compression_stats)
+
+    def test_unsupported_tornado(self):
+        compression = Compression(threshold=100)
+        handler = mock.Mock()
+        handler.protocol._compressor = object()
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            compression.install(handler)
+        self.assertEqual([w.category for w in caught], [RuntimeWarning])
+        self.assertIsNone(handler.protocol._compressor)
+
+        compression.write(handler, b'small')
+        handler.write_message.assert_called_with(b'small')
+        self.assertEqual(compression.stats['uncompressed_bytes'], 0)
+
+        del handler.protocol._compressor
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            compression.install(handler)
+        self.assertEqual([w.category for w in caught], [RuntimeWarning])
+
 
 if __name__ == '__main__':
     testing.unittest.main()
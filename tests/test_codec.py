@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.constants import connection_state
+from deepstreampy.message import codec, message_builder, message_parser
+from deepstreampy import client
+from tests.util import msg
+import unittest
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+URL = "ws://localhost:7777/deepstream"
+
+PAYLOAD = {'name': 'Grüße', 'url': 'http://a/b', 'tags': ['x', 'y'],
+           'count': 3, 'ratio': 0.5, 'ok': True, 'none': None}
+
+
+class _CountingCodec(object):
+
+    def __init__(self):
+        self.dumped = []
+        self.loaded = []
+
+    def dumps(self, value, sort_keys=False):
+        self.dumped.append(value)
+        return codec.default.dumps(value, sort_keys)
+
+    def loads(self, data):
+        self.loaded.append(data)
+        return codec.default.loads(data)
+
+
+class CodecTest(unittest.TestCase):
+
+    def test_codecs_agree(self):
+        names = codec.available_codecs()
+        self.assertIn('json', names)
+        for name in names:
+            c = codec.get_codec(name)
+            self.assertEqual(
+                c.dumps(PAYLOAD, sort_keys=True),
+                '{"count":3,"name":"Grüße","none":null,"ok":true,'
+                '"ratio":0.5,"tags":["x","y"],"url":"http://a/b"}')
+            self.assertEqual(c.dumps([1, {'b': 1, 'a': 2}]),
+                             codec.default.dumps([1, {'b': 1, 'a': 2}]))
+            self.assertEqual(c.loads(c.dumps(PAYLOAD)), PAYLOAD)
+
+    def test_non_ascii_round_trip(self):
+        for name in codec.available_codecs():
+            c = codec.get_codec(name)
+            raw = message_builder.get_message_bytes(
+                'R', 'U', ['caf\u00e9', 1, PAYLOAD], c)
+            [message] = message_parser.parse(raw.decode('utf-8'), None)
+            self.assertEqual(message['data'][0], 'caf\u00e9')
+            self.assertEqual(c.loads(message['data'][2]), PAYLOAD)
+
+    def test_get_codec(self):
+        self.assertIs(codec.get_codec(), codec.default)
+        self.assertIs(codec.get_codec('json'), codec.default)
+        self.assertEqual(codec.get_codec('auto').name,
+                         codec.available_codecs()[0])
+
+        custom = _CountingCodec()
+        self.assertIs(codec.get_codec(custom), custom)
+
+        self.assertRaises(ValueError, codec.get_codec, 'yaml')
+        with mock.patch.dict(sys.modules, {'ujson': None, 'orjson': None}), \
+                mock.patch.dict(codec._codecs, clear=True):
+            self.assertRaises(ValueError, codec.get_codec, 'ujson')
+            self.assertRaises(ValueError, client.Client, URL,
+                              jsonCodec='orjson')
+            self.assertEqual(codec.get_codec('auto').name, 'json')
+
+    def test_client_codec(self):
+        custom = _CountingCodec()
+        c = client.Client(URL, jsonCodec=custom)
+        self.assertIs(c.codec, custom)
+        handler = mock.Mock()
+        c._connection._state = connection_state.OPEN
+        c._connection._websocket_handler = handler
+
+        callback = mock.Mock()
+        c.event.subscribe('news', callback)
+        c.event.handle({'topic': 'E', 'action': 'EVT',
+                        'data': ['news', 'O{"a":1}']})
+        callback.assert_called_with({'a': 1})
+        self.assertEqual(custom.loaded, ['{"a":1}'])
+
+        c.event.emit('news', {'b': 2})
+        handler.write_message.assert_called_with(
+            msg('E|EVT|news|O{"b":2}+'))
+        self.assertEqual(custom.dumped, [{'b': 2}])
+
+        record = c.record._get_record('car')
+        record._on_read({'topic': 'R', 'action': 'R',
+                         'data': ['car', '1', '{"brand":"BMW"}']})
+        self.assertEqual(record.get(), {'brand': 'BMW'})
+        self.assertEqual(custom.loaded[-1], '{"brand":"BMW"}')
+
+        record.set({'seats': 4, 'brand': 'Audi'})
+        handler.write_message.assert_called_with(
+            msg('R|U|car|2|{"brand":"Audi","seats":4}+'))
+        self.assertEqual(custom.dumped[-1], {'seats': 4, 'brand': 'Audi'})
+
+
+if __name__ == '__main__':
+    unittest.main()
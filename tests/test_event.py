@@ -69,6 +69,37 @@ class EventsTest(unittest.TestCase):
                                                'UNSOLICITED_MESSAGE',
                                                'E')
 
+    def test_events_without_listeners_not_decoded(self):
+        self.client.on('error', self.error_callback)
+        # The payload is invalid, but nothing tries to decode it
+        self.client.event.handle({'topic': 'E',
+                                  'action': 'EVT',
+                                  'data': ['unknownEvent', 'O{invalid']})
+        self.error_callback.assert_not_called()
+
+    def test_lazy_payloads(self):
+        lazy_client = client.Client(URL, lazyPayloads=True)
+        lazy_client._connection._state = connection_state.OPEN
+        lazy_client._connection._websocket_handler = self.handler
+
+        lazy_client.event.subscribe('in', self.event_callback)
+        lazy_client.event.handle({'topic': 'E',
+                                  'action': 'EVT',
+                                  'data': ['in', 'O{"a":[1,2]}']})
+        payload, = self.event_callback.call_args[0]
+        self.assertEqual(payload.raw, 'O{"a":[1,2]}')
+        self.assertEqual(payload.value, {'a': [1, 2]})
+
+        # Forwarded as it was received
+        codec = lazy_client.codec
+        with mock.patch.object(codec, 'loads') as loads, \
+                mock.patch.object(codec, 'dumps') as dumps:
+            lazy_client.event.emit('out', payload)
+        loads.assert_not_called()
+        dumps.assert_not_called()
+        self.handler.write_message.assert_called_with(
+            msg('E|EVT|out|O{"a":[1,2]}+'))
+
     def test_accept(self):
         def listen_callback(data, is_subscribed, response):
             response.accept()
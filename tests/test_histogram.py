@@ -0,0 +1,42 @@
+"""Tests for the histogram of measured round-trip times."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.histogram import LatencyHistogram
+
+import unittest
+
+
+class LatencyHistogramTest(unittest.TestCase):
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.count, 0)
+        self.assertIsNone(histogram.mean)
+        self.assertIsNone(histogram.percentile(50))
+
+    def test_record(self):
+        histogram = LatencyHistogram(bounds=(0.01, 0.1, 1))
+        for value in (0.005, 0.02, 0.05, 0.08, 3):
+            histogram.record(value)
+
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.min, 0.005)
+        self.assertEqual(histogram.max, 3)
+        self.assertEqual(histogram.last, 3)
+        self.assertAlmostEqual(histogram.mean, 0.631)
+        self.assertEqual(histogram.buckets,
+                         [(0.01, 1), (0.1, 3), (1, 0), (float('inf'), 1)])
+
+        self.assertEqual(histogram.percentile(20), 0.01)
+        self.assertEqual(histogram.percentile(50), 0.1)
+        self.assertEqual(histogram.percentile(100), 3)
+
+        histogram.reset()
+        self.assertEqual(histogram.count, 0)
+        self.assertIsNone(histogram.max)
+
+    def test_percentile_capped_at_max(self):
+        histogram = LatencyHistogram(bounds=(0.01, 0.1, 1))
+        histogram.record(0.02)
+        self.assertEqual(histogram.percentile(99), 0.02)
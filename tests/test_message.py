@@ -7,6 +7,7 @@ from deepstreampy.constants import topic, actions, types
 from deepstreampy.constants import topic as topic_constants
 from deepstreampy.constants import event as event_constants
 from deepstreampy import client
+from deepstreampy.utils import Undefined
 
 import json
 import unittest
@@ -53,6 +54,65 @@ class MessageTest(unittest.TestCase):
         self.assertEqual(message['action'], actions.READ)
         self.assertEqual(message['data'], data)
 
+    def test_message_build_bytes(self):
+        """Test building encoded messages."""
+        data = ['r\u00e9cord', 3, {'b': 1, 'a': ['x']}, ['y', 'z']]
+        self.assertEqual(
+            message_builder.get_message_bytes(topic.RECORD, actions.UPDATE,
+                                              data),
+            message_builder.get_message(topic.RECORD, actions.UPDATE,
+                                        data).encode('utf-8'))
+        self.assertEqual(
+            message_builder.get_message_bytes(topic.CONNECTION, actions.PONG),
+            (topic.CONNECTION + chr(31) + actions.PONG + chr(30)).encode())
+        self.assertEqual(
+            message_builder.get_message_bytes(topic.EVENT, actions.SUBSCRIBE,
+                                              ['n\u00e9ws']),
+            message_builder.get_message(topic.EVENT, actions.SUBSCRIBE,
+                                        ['n\u00e9ws']).encode('utf-8'))
+        self.assertEqual(message_builder.PONG_MESSAGE,
+                         message_builder.get_message_bytes(topic.CONNECTION,
+                                                           actions.PONG))
+
+    def test_message_access(self):
+        """Test that parsed messages are accessed like dicts."""
+        raw = 'R' + chr(31) + 'U' + chr(31) + 'car' + chr(31) + '2'
+        message, = message_parser.parse(raw + chr(30), self.client)
+
+        self.assertIs(message['action'], actions.UPDATE)
+        self.assertIs(message['topic'], topic.RECORD)
+        self.assertEqual(message['data'], ['car', '2'])
+        self.assertEqual(message['raw'], raw)
+        self.assertEqual(message.get('raw', ''), raw)
+        self.assertIsNone(message.get('processedError'))
+
+        message['processedError'] = True
+        self.assertTrue(message['processedError'])
+        self.assertEqual(message, {'raw': raw, 'topic': 'R', 'action': 'U',
+                                   'data': ['car', '2'],
+                                   'processedError': True})
+        self.assertNotEqual(message, {'raw': raw})
+
+        with self.assertRaises(AttributeError):
+            message.extra = 1
+
+    def test_control_messages(self):
+        """Test that pre-parsed control messages match parsed ones."""
+        parser = message_parser.StreamParser(self.client)
+        for action in (actions.PING, actions.PONG, actions.ACK):
+            raw = message_builder.get_message(topic.CONNECTION, action)
+            self.assertEqual(parser.feed(raw),
+                             message_parser.parse(raw, self.client))
+
+        # A control message that completes an incomplete message
+        self.assertEqual(parser.feed('E' + chr(31) + 'EVT' + chr(31) + 'x'),
+                         [])
+        self.assertTrue(parser.incomplete)
+        messages = parser.feed(chr(30) + 'C' + chr(31) + 'PI' + chr(30))
+        self.assertEqual([m['action'] for m in messages],
+                         [actions.EVENT, actions.PING])
+        self.assertFalse(parser.incomplete)
+
     def test_wrong_action(self):
         """Test parsing message with an action that doesn't exist."""
         self.assertRaises(ValueError,
@@ -67,6 +127,64 @@ class MessageTest(unittest.TestCase):
                           topic.AUTH + chr(30),
                           self.client)
 
+    def test_trusted_parser(self):
+        """Test that a trusted parser passes unknown actions on."""
+        parser = message_parser.StreamParser(self.client, trusted=True)
+        event = message_builder.get_message(topic.EVENT, actions.EVENT,
+                                            ['a', 'N1'])
+        data = (event + 'Z' + chr(31) + 'NEW' + chr(31) + 'x' + chr(30) +
+                message_builder.get_message(topic.CONNECTION, actions.PING))
+        self.assertEqual(parser.feed(data),
+                         message_parser.parse(event, self.client) + [
+                             {'raw': 'Z' + chr(31) + 'NEW' + chr(31) + 'x',
+                              'topic': 'Z', 'action': 'NEW', 'data': ['x']},
+                             {'raw': 'C' + chr(31) + 'PI',
+                              'topic': topic.CONNECTION,
+                              'action': actions.PING, 'data': []}])
+        self.assertIs(parser.feed(data)[0]['action'], actions.EVENT)
+
+        self.assertRaises(ValueError, parser.feed, topic.AUTH + chr(30))
+
+    def test_stream_parser(self):
+        """Test parsing messages split across several chunks of data."""
+        parser = message_parser.StreamParser(self.client)
+        first = message_builder.get_message(topic.EVENT, actions.EVENT,
+                                            ['a', 'N1'])
+        second = message_builder.get_message(topic.EVENT, actions.EVENT,
+                                             ['b', 'N2'])
+        data = first + second
+
+        self.assertEqual(list(parser.feed(data[:3])), [])
+        self.assertEqual(list(parser.feed(data[3:-4])), [
+            {'raw': first[:-1],
+             'topic': topic.EVENT,
+             'action': actions.EVENT,
+             'data': ['a', 'N1']}])
+        messages = list(parser.feed(data[-4:] + first))
+        self.assertEqual([message['data'] for message in messages],
+                         [['b', 'N2'], ['a', 'N1']])
+        self.assertEqual(list(parser.feed('')), [])
+
+        parser.feed(first[:5])
+        parser.reset()
+        self.assertEqual(len(list(parser.feed(second))), 1)
+
+    def test_message_batch(self):
+        messages = [(topic.EVENT, actions.SUBSCRIBE, ['a']),
+                    (topic.RECORD, actions.UPDATE, ['r', 2, {'b': 1, 'a': 2}]),
+                    (topic.CONNECTION, actions.PONG, None)]
+        batch = message_builder.MessageBatch()
+        self.assertFalse(batch)
+        for message in messages:
+            batch.add(*message)
+
+        expected = [message_builder.get_message_bytes(*message)
+                    for message in messages]
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch.build(), b''.join(expected))
+        self.assertEqual(batch.bytes, len(b''.join(expected)))
+        self.assertEqual(batch.messages(), expected)
+
     def test_to_typed(self):
         """Test convert to typed."""
         self.assertEqual(message_builder.typed("somestring"),
@@ -82,6 +200,18 @@ class MessageTest(unittest.TestCase):
         self.assertTrue('"foo":2' in object_message)
         self.assertTrue('"bar":true' in object_message)
         self.assertTrue('"a":"b"' in object_message)
+        self.assertEqual(message_builder.typed([1, 'a']), 'O[1,"a"]')
+        self.assertEqual(message_builder.typed(-7.5e-07), "N-7.5e-07")
+        self.assertEqual(message_builder.typed(Undefined), "U")
+        self.assertEqual(
+            message_builder.typed(message_parser.TypedValue('N1', None)),
+            'N1')
+
+        class Subclass(dict):
+            pass
+
+        self.assertRaises(ValueError, message_builder.typed, Subclass())
+        self.assertRaises(ValueError, message_builder.typed, object())
 
     def test_from_typed(self):
         """Test convert from typed."""
@@ -90,6 +220,21 @@ class MessageTest(unittest.TestCase):
             "somestring")
 
         self.assertEqual(message_parser.convert_typed("N1", self.client), 1)
+        for text, number in (("N-12", -12), ("N+5", 5), ("N007", 7),
+                             ("N2.5", 2.5), ("N-1.5e-7", -1.5e-7),
+                             ("N1e+21", 1e21),
+                             ("N.5", 0.5), ("NInfinity", float('inf')),
+                             ("N1+2j", 1 + 2j)):
+            converted = message_parser.convert_typed(text, self.client)
+            self.assertEqual(converted, number)
+            self.assertIs(type(converted), type(number))
+        self.assertIs(message_parser.convert_typed("T", self.client), True)
+        self.assertIs(message_parser.convert_typed("F", self.client), False)
+        self.assertIsNone(message_parser.convert_typed("L", self.client))
+        self.assertEqual(message_parser.convert_typed('O{"a":1}', self.client),
+                         {'a': 1})
+        self.assertRaises(ValueError, message_parser.convert_typed, "N1.2.3",
+                          self.client)
         self.assertRaises(ValueError,
                           message_parser.convert_typed,
                           "X21323",
@@ -46,13 +46,13 @@ class PresenceHandlerTest(testing.AsyncTestCase):
         # Emit timeout error
         self.wait()
         error_callback.assert_called_with(
-            'No ACK message received in time for S', 'ACK_TIMEOUT', 'U')
+            'No ACK message received in time for U', 'ACK_TIMEOUT', 'U')
         error_callback.reset_mock()
 
         # receive ack message for subscribe
         self.client.presence.handle({'topic': 'U',
                                       'action': 'A',
-                                      'data': ['S']})
+                                      'data': ['S', 'U']})
         self.wait()
         error_callback.assert_called_with('', 'UNSOLICITED_MESSAGE', 'U')
         error_callback.reset_mock()
@@ -95,13 +95,13 @@ class PresenceHandlerTest(testing.AsyncTestCase):
         # emit ack timeout for unsubscribe
         self.wait()
         error_callback.assert_called_with(
-            'No ACK message received in time for US', 'ACK_TIMEOUT', 'U')
+            'No ACK message received in time for U', 'ACK_TIMEOUT', 'U')
         error_callback.reset_mock()
 
         # receive ack for unsubscrube
         self.client.presence.handle({'topic': 'U',
                                       'action': 'A',
-                                      'data': ['US']})
+                                      'data': ['US', 'U']})
         self.wait()
         error_callback.assert_called_with('', 'UNSOLICITED_MESSAGE', 'U')
 
@@ -0,0 +1,86 @@
+"""Tests for replaying subscriptions after the connection was lost."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import client
+from deepstreampy.constants import connection_state
+from deepstreampy.constants import event as event_constants
+from tests.util import mock_websocket_handler
+
+from tornado import testing
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+URL = "ws://localhost:7777/deepstream"
+
+
+class ResubscriptionTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(ResubscriptionTest, self).setUp()
+        self.client = client.Client(URL, resubscribeBatchSize=100,
+                                    resubscribeInterval=0.01)
+        self.connection = self.client._connection
+        self.connection._state = connection_state.OPEN
+
+        self.handler = mock_websocket_handler()
+        self.connection._websocket_handler = self.handler
+
+        self.progress = []
+        self.client.on(event_constants.RESUBSCRIBE_PROGRESS,
+                       lambda done, total: self.progress.append((done, total)))
+        self.completed = mock.Mock()
+        self.client.on(event_constants.RESUBSCRIBE_COMPLETE, self.completed)
+
+        # Only replay the records, not the handlers without subscriptions
+        self.client.resubscriptions._notifiers.clear()
+        self.records = [self.client.record._get_record('record/{0}'.format(i))
+                        for i in range(250)]
+
+    def _sent_reads(self):
+        reads = []
+        for call_args in self.handler.write_message.call_args_list:
+            reads.extend(message for message in
+                         call_args[0][0].decode().split(chr(30))
+                         if message.startswith('R{0}CR'.format(chr(31))))
+        return reads
+
+    @testing.gen_test
+    def test_replays_in_batches(self):
+        self.connection._set_state(connection_state.RECONNECTING)
+        self.records[0]._destroy()
+        self.client.record._get_record('created/while/reconnecting')
+
+        self.connection._set_state(connection_state.OPEN)
+        # The first batch is written as a single frame
+        self.assertEqual(self.handler.write_message.call_count, 1)
+        self.assertEqual(len(self._sent_reads()), 100)
+        self.assertEqual(self.progress, [(101, 250)])
+        self.assertEqual(self.client.resubscriptions.pending, 149)
+
+        while not self.completed.called:
+            yield testing.gen.sleep(0.01)
+
+        self.completed.assert_called_once_with(250)
+        self.assertEqual(self.progress, [(101, 250), (201, 250), (250, 250)])
+        reads = self._sent_reads()
+        self.assertEqual(len(reads), 249)
+        self.assertNotIn('R{0}CR{0}record/0'.format(chr(31)), reads)
+        self.assertIn('R{0}CR{0}record/249'.format(chr(31)), reads)
+
+    @testing.gen_test
+    def test_restarts_when_lost_again(self):
+        self.connection._set_state(connection_state.RECONNECTING)
+        self.connection._set_state(connection_state.OPEN)
+        self.connection._set_state(connection_state.RECONNECTING)
+        self.assertEqual(self.client.resubscriptions.pending, 250)
+
+        self.handler.write_message.reset_mock()
+        self.connection._set_state(connection_state.OPEN)
+        while not self.completed.called:
+            yield testing.gen.sleep(0.01)
+        self.assertEqual(len(self._sent_reads()), 250)
@@ -141,6 +141,15 @@ class RPCHandlerTest(testing.AsyncTestCase):
 
         self.handler.write_message.assert_called_with(msg('P|REJ|addTwo|434+'))
 
+    def test_reject_without_decoding(self):
+        # The data is invalid, but it isn't decoded for an unknown RPC
+        self.client.rpc.handle({'topic': 'P',
+                                'action': 'REQ',
+                                'data': ['unknown', '2', 'O{invalid']})
+        self.handler.write_message.assert_called_with(
+            msg('P|REJ|unknown|2+'))
+        self.assertEqual(self.client_errors, [])
+
     @testing.gen_test
     def test_make_rpcs(self):
         # RPCHandler is created
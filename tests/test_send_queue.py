@@ -0,0 +1,173 @@
+"""Tests for the bounded queue of messages waiting to be sent."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.message import send_queue
+from deepstreampy.constants import overflow_policies
+from tests.util import msg
+
+from tornado import concurrent
+import unittest
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+
+class SendQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self._futures = []
+
+    def tearDown(self):
+        # Retrieve the errors of dropped messages, so they are not logged
+        for future in self._futures:
+            if future.done():
+                future.exception()
+
+    def _push(self, queue, message):
+        future = concurrent.Future()
+        self._futures.append(future)
+        queue.push(msg(message), future)
+        return future
+
+    def _assert_dropped(self, future):
+        self.assertTrue(future.done())
+        self.assertIsInstance(future.exception(),
+                              send_queue.QueueOverflowError)
+
+    def test_pop_frame(self):
+        queue = send_queue.SendQueue()
+        futures = [self._push(queue, 'E|EVT|a+'),
+                   self._push(queue, 'E|EVT|b+'),
+                   self._push(queue, 'E|EVT|c+')]
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.bytes, 24)
+
+        frame, frame_futures = queue.pop_frame(16)
+        self.assertEqual(frame, msg('E|EVT|a+E|EVT|b+'))
+        self.assertEqual(frame_futures, futures[:2])
+
+        frame, frame_futures = queue.pop_frame(1)
+        self.assertEqual(frame, msg('E|EVT|c+'))
+        self.assertEqual(frame_futures, futures[2:])
+        self.assertFalse(queue)
+        self.assertEqual(queue.bytes, 0)
+
+    def test_reject(self):
+        queue = send_queue.SendQueue(max_messages=1)
+        first = self._push(queue, 'E|EVT|a+')
+        second = self._push(queue, 'E|EVT|b+')
+        self.assertFalse(first.done())
+        self._assert_dropped(second)
+        self.assertEqual(queue.pop_frame(100)[0], msg('E|EVT|a+'))
+
+    def test_drop_oldest(self):
+        queue = send_queue.SendQueue(
+            max_bytes=16, overflow_policy=overflow_policies.DROP_OLDEST)
+        first = self._push(queue, 'E|EVT|a+')
+        self._push(queue, 'E|EVT|b+')
+        self._push(queue, 'E|EVT|c+')
+        self._assert_dropped(first)
+        self.assertEqual(queue.pop_frame(100)[0], msg('E|EVT|b+E|EVT|c+'))
+
+    def test_drop_oldest_per_topic(self):
+        queue = send_queue.SendQueue(
+            max_messages=3,
+            overflow_policy=overflow_policies.DROP_OLDEST_PER_TOPIC)
+        self._push(queue, 'R|S|a+')
+        first_event = self._push(queue, 'E|EVT|a+')
+        self._push(queue, 'E|EVT|b+')
+        self._push(queue, 'E|EVT|c+')
+        self._assert_dropped(first_event)
+        self.assertEqual(queue.pop_frame(100)[0],
+                         msg('R|S|a+E|EVT|b+E|EVT|c+'))
+
+        self._push(queue, 'R|S|b+')
+        self._push(queue, 'R|S|c+')
+        self._push(queue, 'R|S|d+')
+        self._push(queue, 'E|EVT|d+')
+        self.assertEqual(queue.pop_frame(100)[0],
+                         msg('R|S|c+R|S|d+E|EVT|d+'))
+
+    def test_conflate(self):
+        on_conflate = mock.Mock()
+        queue = send_queue.SendQueue(
+            max_messages=3, overflow_policy=overflow_policies.CONFLATE,
+            on_conflate=on_conflate)
+        patches = [self._push(queue, 'R|P|a|1|x|N1+'),
+                   self._push(queue, 'R|P|a|2|y|N2+')]
+        self._push(queue, 'E|EVT|a+')
+        self._push(queue, 'R|U|a|3|{"x":1,"y":2}+')
+        for future in patches:
+            self._assert_dropped(future)
+        on_conflate.assert_called_once_with('a', 3, 1)
+        self.assertEqual(queue.pop_frame(100)[0],
+                         msg('E|EVT|a+R|U|a|1|{"x":1,"y":2}+'))
+
+        # A patch only changes part of the record, so it replaces nothing
+        self._push(queue, 'R|U|b|1|{}+')
+        self._push(queue, 'R|P|b|2|x|N1+')
+        self._push(queue, 'E|EVT|b+')
+        self._push(queue, 'R|P|b|3|y|N2+')
+        self.assertEqual(queue.pop_frame(100)[0],
+                         msg('R|P|b|2|x|N1+E|EVT|b+R|P|b|3|y|N2+'))
+
+        # Neither is an update in a batch with other messages
+        self._push(queue, 'R|U|c|1|{}+E|EVT|c+')
+        self._push(queue, 'E|EVT|d+')
+        self._push(queue, 'E|EVT|e+')
+        self._push(queue, 'R|U|c|2|{}+')
+        self.assertEqual(queue.pop_frame(100)[0],
+                         msg('E|EVT|d+E|EVT|e+R|U|c|2|{}+'))
+        self.assertEqual(on_conflate.call_count, 1)
+
+    def test_get_lane(self):
+        self.assertEqual(send_queue.get_lane(msg('A|REQ|{}+')),
+                         send_queue.CONTROL)
+        self.assertEqual(send_queue.get_lane(msg('C|PO+')), send_queue.ACKS)
+        self.assertEqual(send_queue.get_lane(msg('P|A|REQ|rpc|1+')),
+                         send_queue.ACKS)
+        for message in ('R|CR|r+', 'R|P|r|2|a|N1+', 'E|EVT|e|N1+',
+                        'E|LA|a/.*|a/1+'):
+            self.assertEqual(send_queue.get_lane(msg(message)),
+                             send_queue.DATA)
+
+    def test_priority_queue(self):
+        queue = send_queue.PrioritySendQueue({'data': {'maxMessages': 2}})
+        self._push(queue, 'E|EVT|a+')
+        self._push(queue, 'R|U|r|1|{}+')
+        dropped = self._push(queue, 'E|EVT|b+')
+        self._assert_dropped(dropped)
+        self._push(queue, 'C|PO+')
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.bytes, 24)
+
+        self.assertEqual(queue.pop_frame(13)[0], msg('C|PO+E|EVT|a+'))
+        self.assertEqual(queue.pop_frame(15)[0], msg('R|U|r|1|{}+'))
+        self.assertFalse(queue)
+
+        with self.assertRaises(ValueError):
+            send_queue.PrioritySendQueue({'bulk': {}})
+
+    def test_keeps_order_of_data(self):
+        queue = send_queue.PrioritySendQueue()
+        for message in ('R|D|x+', 'E|UL|a/.*+', 'R|CR|x+', 'E|LA|a/.*|a/1+',
+                        'E|US|e+', 'R|A|D|y+'):
+            self._push(queue, message)
+        self.assertEqual(queue.pop_frame(1000)[0],
+                         msg('R|A|D|y+R|D|x+E|UL|a/.*+R|CR|x+'
+                             'E|LA|a/.*|a/1+E|US|e+'))
+
+    def test_resolve_futures(self):
+        futures = [concurrent.Future(), concurrent.Future()]
+        write_future = concurrent.Future()
+        send_queue.resolve_futures(futures, write_future)
+        write_future.set_result(None)
+        self.assertTrue(all(future.done() for future in futures))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.constants import connection_state
+from deepstreampy.constants import event as event_constants
+from deepstreampy import sharded
+from tests.util import msg
+
+from tornado import testing
+import unittest
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+URL = "ws://localhost:7777/deepstream"
+
+
+class HashRingTest(unittest.TestCase):
+
+    def test_distribution(self):
+        ring = sharded.HashRing(range(4))
+        names = ['record/{0}'.format(i) for i in range(1000)]
+        shards = [ring.get_shard(name) for name in names]
+        for shard in range(4):
+            self.assertGreater(shards.count(shard), 150)
+
+        self.assertEqual(shards, [ring.get_shard(name) for name in names])
+
+        # Adding a shard only moves names onto the new shard
+        bigger_ring = sharded.HashRing(range(5))
+        for name, shard in zip(names, shards):
+            self.assertIn(bigger_ring.get_shard(name), (shard, 4))
+
+
+class ShardedClientTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(ShardedClientTest, self).setUp()
+        self.client = sharded.ShardedClient(URL, shards=3)
+        self.handlers = []
+        for shard in self.client.shards:
+            handler = mock.Mock()
+            handler.stream.closed = mock.Mock(return_value=False)
+            shard._connection._state = connection_state.OPEN
+            shard._connection._websocket_handler = handler
+            self.handlers.append(handler)
+
+    def _handler(self, name):
+        return self.handlers[self.client.shards.index(self.client.shard(name))]
+
+    def test_routing(self):
+        for i in range(10):
+            name = 'event/{0}'.format(i)
+            self.client.event.emit(name, 1)
+            self._handler(name).write_message.assert_called_with(
+                msg('E|EVT|{0}|N1+'.format(name)))
+
+            name = 'rpc/{0}'.format(i)
+            self.client.rpc.provide(name, mock.Mock())
+            self._handler(name).write_message.assert_called_with(
+                msg('P|S|{0}+'.format(name)))
+
+    def test_listen_on_every_shard(self):
+        self.client.record.listen('a/.*', mock.Mock())
+        for handler in self.handlers:
+            handler.write_message.assert_called_with(msg('R|L|a/.*+'))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            self.client.shards[1]._on_error('E', 'MESSAGE_DENIED', 'x')
+
+        error_callback = mock.Mock()
+        self.client.on('error', error_callback)
+        self.client.shards[1]._on_error('E', 'MESSAGE_DENIED', 'x')
+        error_callback.assert_called_with('x', 'MESSAGE_DENIED', 'E')
+
+    def test_connection_state(self):
+        state_callback = mock.Mock()
+        self.client.on(event_constants.CONNECTION_STATE_CHANGED,
+                       state_callback)
+        self.client.shards[2]._connection._set_state(
+            connection_state.RECONNECTING)
+        state_callback.assert_called_with(connection_state.RECONNECTING, 2)
+        self.assertEqual(self.client.connection_states,
+                         [connection_state.OPEN, connection_state.OPEN,
+                          connection_state.RECONNECTING])
+
+
+if __name__ == '__main__':
+    unittest.main()
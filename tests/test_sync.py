@@ -0,0 +1,98 @@
+"""Tests for the thread-safe synchronous client."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import constants
+from deepstreampy.sync import SyncClient
+from tests.util import ServerThread
+
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+
+def _set_up_server(server):
+    server.set_record('recordA', {'x': 1})
+    server.provide('echo', lambda data: data)
+
+
+class SyncClientTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ServerThread(_set_up_server)
+        cls.server.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.client = self._login('Homer')
+
+    def _login(self, username):
+        client = SyncClient(
+            'ws://localhost:{0}/deepstream'.format(self.server.port))
+        client.connect().result(5)
+        self.assertTrue(client.login({'username': username}).result(5)
+                        ['success'])
+        return client
+
+    def tearDown(self):
+        self.client.close(5)
+        self.assertFalse(self.client._thread.is_alive())
+
+    def test_login(self):
+        self.assertEqual(self.client.connection_state,
+                         constants.connection_state.OPEN)
+
+    def test_make_from_many_threads(self):
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(
+                lambda i: self.client.make('echo', i).result(5), range(200)))
+        self.assertEqual(results, list(range(200)))
+
+    def test_get_record(self):
+        self.assertEqual(self.client.get('recordA').result(5), {'x': 1})
+        self.assertEqual(self.client.get('recordA', 'x').result(5), 1)
+
+    def test_keeps_one_record_per_name(self):
+        self.client.set('recordB', {'y': 1}).result(5)
+        self.assertEqual(self.client.get('recordB').result(5), {'y': 1})
+        self.assertEqual(list(self.client._records), ['recordB'])
+
+        self.client.discard('recordB').result(5)
+        self.assertEqual(self.client._records, {})
+        self.assertNotIn('recordB', self.client.submit(
+            lambda: list(self.client._client.record._records)).result(5))
+
+    def test_get_presence(self):
+        other = self._login('Marge')
+        try:
+            self.assertEqual(self.client.get_presence().result(5), ['Marge'])
+        finally:
+            other.close(5)
+
+    def test_submit_errors(self):
+        def fail():
+            raise KeyError('missing')
+
+        with self.assertRaises(KeyError):
+            self.client.submit(fail).result(5)
+
+    def test_runs_queued_calls_in_batches(self):
+        batches = []
+        run_queued = self.client._run_queued
+
+        def count_batches():
+            batches.append(len(self.client._queue))
+            run_queued()
+
+        self.client._run_queued = count_batches
+        futures = [self.client.submit(lambda i=i: i) for i in range(100)]
+        self.assertEqual([f.result(5) for f in futures], list(range(100)))
+        self.assertLess(len(batches), 100)
+
+    def test_client_error(self):
+        with self.assertRaises(ValueError):
+            SyncClient('ws://localhost:{0}/deepstream'.format(self.server.port),
+                       jsonCodec='nope')
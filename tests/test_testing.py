@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Tests for the in-process stand-in server."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import client, constants
+from deepstreampy.message.transport import LoopbackTransport
+from deepstreampy.testing import Server
+
+from tornado import testing, gen
+
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+
+class ServerTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(ServerTest, self).setUp()
+        self.server = Server(authenticate=self._authenticate)
+
+    def tearDown(self):
+        self.server.stop()
+        super(ServerTest, self).tearDown()
+
+    def _authenticate(self, auth_data):
+        if auth_data.get('password') == 'wrong':
+            return False, 'bad password'
+        return True, {'role': 'user'}
+
+    @gen.coroutine
+    def _login(self, username='Homer', **options):
+        c = client.Client('ws://loopback',
+                          transport=LoopbackTransport(self.server.accept),
+                          **options)
+        yield c.connect()
+        result = yield c.login({'username': username})
+        self.assertTrue(result['success'])
+        raise gen.Return(c)
+
+    @gen.coroutine
+    def _until(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            yield gen.moment
+        self.fail("condition not met")
+
+    @testing.gen_test
+    def test_login(self):
+        c = yield self._login()
+        self.assertEqual(c.connection_state, constants.connection_state.OPEN)
+
+        other = client.Client('ws://loopback',
+                              transport=LoopbackTransport(self.server.accept))
+        yield other.connect()
+        result = yield other.login({'password': 'wrong'})
+        self.assertEqual(result, {
+            'success': False,
+            'error': constants.event.INVALID_AUTHENTICATION_DETAILS,
+            'message': 'bad password'})
+
+    @testing.gen_test
+    def test_records(self):
+        self.server.set_record('car', {'brand': 'BMW'}, version=3)
+        a = yield self._login('a')
+        b = yield self._login('b')
+
+        record_a = yield a.record.get_record('car')
+        record_b = yield b.record.get_record('car')
+        yield self._until(lambda: record_a.is_ready and record_b.is_ready)
+        self.assertEqual(record_b.get(), {'brand': 'BMW'})
+        self.assertEqual(record_b.version, 3)
+
+        record_a.set({'brand': 'Audi', 'seats': 4})
+        yield self._until(lambda: record_b.version == 4)
+        self.assertEqual(record_b.get(), {'brand': 'Audi', 'seats': 4})
+
+        record_b.set(5, 'seats')
+        yield self._until(lambda: record_a.version == 5)
+        self.assertEqual(record_a.get('seats'), 5)
+        self.assertEqual(self.server.records['car'],
+                         [5, {'brand': 'Audi', 'seats': 5}])
+
+    @testing.gen_test
+    def test_events(self):
+        a = yield self._login('a')
+        b = yield self._login('b')
+        callback = mock.Mock()
+        yield b.event.subscribe('news', callback)
+        yield gen.moment
+
+        a.event.emit('news', {'title': 'hello'})
+        yield self._until(lambda: callback.called)
+        callback.assert_called_once_with({'title': 'hello'})
+
+    @testing.gen_test
+    def test_listen(self):
+        a = yield self._login('a')
+        b = yield self._login('b')
+        callback = mock.Mock()
+        a.event.listen('news/.*', callback)
+        yield b.event.subscribe('news/sports', mock.Mock())
+
+        yield self._until(lambda: callback.called)
+        self.assertEqual(callback.call_args[0][:2], ('news/sports', True))
+
+    @testing.gen_test
+    def test_rpc_routing(self):
+        a = yield self._login('a')
+        b = yield self._login('b')
+        yield b.rpc.provide('double', lambda data, response:
+                            response.send(data * 2))
+        yield gen.moment
+
+        result = yield a.rpc.make('double', 21)
+        self.assertEqual(result, 42)
+
+        with self.assertRaises(Exception) as context:
+            yield a.rpc.make('missing', 1)
+        self.assertIn(constants.event.NO_RPC_PROVIDER, str(context.exception))
+
+        self.server.provide('echo', lambda data: data)
+        result = yield a.rpc.make('echo', {'x': 1})
+        self.assertEqual(result, {'x': 1})
+
+    @testing.gen_test
+    def test_presence(self):
+        a = yield self._login('Homer')
+        errors = []
+        a.on('error', lambda *args: errors.append(args))
+        callback = mock.Mock()
+        yield a.presence.subscribe(callback)
+        yield gen.moment
+
+        b = yield self._login('Marge')
+        yield self._until(lambda: callback.called)
+        callback.assert_called_with('Marge', True)
+
+        users = yield a.presence.get_all()
+        self.assertEqual(users, ['Marge'])
+
+        b.close()
+        yield self._until(lambda: callback.call_count == 2)
+        callback.assert_called_with('Marge', False)
+
+        yield a.presence.unsubscribe(callback)
+        yield gen.moment
+        # Both acks matched their subscription
+        self.assertEqual(errors, [])
+
+    @testing.gen_test
+    def test_websocket_and_tcp(self):
+        port = self.server.listen()
+        tcp_port = self.server.listen_tcp()
+        self.server.provide('echo', lambda data: data)
+
+        for url in ('ws://localhost:{0}/deepstream'.format(port),
+                    'tcp://localhost:{0}'.format(tcp_port)):
+            c = client.Client(url)
+            yield c.connect()
+            yield c.login({'username': 'Bart'})
+            result = yield c.rpc.make('echo', 'ä')
+            self.assertEqual(result, 'ä')
+            c.close()
@@ -0,0 +1,100 @@
+"""Tests for the timer wheel shared by records, RPCs and listeners."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy.timer_wheel import TimerWheel
+
+from tornado import testing
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
+
+
+class TimerWheelTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(TimerWheelTest, self).setUp()
+        self.wheel = TimerWheel(self.io_loop, resolution=0.01, size=8)
+        self.calls = []
+
+    def _record(self, name):
+        self.calls.append((name, self.io_loop.time()))
+
+    def test_runs_in_order(self):
+        start = self.io_loop.time()
+        self.wheel.call_later(0.05, self._record, 'b')
+        self.wheel.call_later(0.02, self._record, 'a')
+        self.wheel.call_later(0.08, self._record, 'c')
+        self.assertEqual(len(self.wheel), 3)
+
+        self.io_loop.call_later(0.15, self.stop)
+        self.wait()
+
+        self.assertEqual([call[0] for call in self.calls], ['a', 'b', 'c'])
+        self.assertGreaterEqual(self.calls[0][1] - start, 0.02)
+        self.assertGreaterEqual(self.calls[2][1] - start, 0.08)
+        self.assertEqual(len(self.wheel), 0)
+
+    def test_remove_timeout(self):
+        timeout = self.wheel.call_later(0.02, self._record, 'a')
+        self.wheel.call_later(0.03, self._record, 'b')
+        self.wheel.remove_timeout(timeout)
+        self.wheel.remove_timeout(timeout)
+        self.assertEqual(len(self.wheel), 1)
+
+        self.io_loop.call_later(0.1, self.stop)
+        self.wait()
+        self.assertEqual([call[0] for call in self.calls], ['b'])
+
+    def test_cancel_from_expiring_callback(self):
+        timeouts = []
+
+        def cancel_other(index):
+            self._record(index)
+            self.wheel.remove_timeout(timeouts[1 - index])
+
+        timeouts.append(self.wheel.call_later(0.02, cancel_other, 0))
+        timeouts.append(self.wheel.call_later(0.02, cancel_other, 1))
+
+        self.io_loop.call_later(0.1, self.stop)
+        self.wait()
+        self.assertEqual(len(self.calls), 1)
+
+    def test_longer_than_one_rotation(self):
+        # 8 slots of 10ms, so 0.25s is more than three rotations away
+        start = self.io_loop.time()
+        self.wheel.call_later(0.25, self._record, 'late')
+        self.wheel.call_later(0.01, self._record, 'early')
+
+        self.io_loop.call_later(0.1, self.stop)
+        self.wait()
+        self.assertEqual([call[0] for call in self.calls], ['early'])
+
+        self.io_loop.call_later(0.25, self.stop)
+        self.wait()
+        self.assertEqual([call[0] for call in self.calls], ['early', 'late'])
+        self.assertGreaterEqual(self.calls[1][1] - start, 0.25)
+
+    def test_blocked_loop(self):
+        io_loop = mock.Mock()
+        io_loop.time.return_value = 100.0
+        wheel = TimerWheel(io_loop, resolution=0.01, size=8)
+
+        # Idle for a long time, no ticks are left to catch up on
+        io_loop.time.return_value = 1000.0
+        wheel.call_later(0.02, 'a')
+        wheel.call_later(0.01, 'b')
+        wheel.call_later(0.3, 'c')
+        self.assertEqual(io_loop.call_at.call_args[0][0], 1000.01)
+
+        # Blocked for far more than one rotation
+        io_loop.time.return_value = 1000.2
+        wheel._on_wake()
+        self.assertEqual([call[0][1].callback
+                          for call in io_loop.add_callback.call_args_list],
+                         ['b', 'a'])
+        self.assertEqual(len(wheel), 1)
+        self.assertLessEqual(io_loop.call_at.call_args[0][0], 1000.3)
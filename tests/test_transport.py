@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Tests for the TCP and in-memory loopback transports."""
+from __future__ import absolute_import, division, print_function, with_statement
+from __future__ import unicode_literals
+
+from deepstreampy import client, constants
+from deepstreampy.message import transport
+
+from tornado import testing, tcpserver, gen, iostream
+
+import unittest
+
+
+def _answer(message):
+    """Answers the login and RPCs of a client."""
+    replies = []
+    for raw in message.split('\x1e'):
+        parts = raw.split('\x1f')
+        if parts[:2] == ['A', 'REQ']:
+            replies.append('A\x1fA\x1e')
+        elif parts[:2] == ['P', 'REQ']:
+            replies.append('P\x1fA\x1fREQ\x1f{0}\x1f{1}\x1e'
+                           'P\x1fRES\x1f{0}\x1f{1}\x1f{2}\x1e'
+                           .format(*parts[2:5]))
+    return ''.join(replies)
+
+
+class _TCPServer(tcpserver.TCPServer):
+
+    @gen.coroutine
+    def handle_stream(self, stream, address):
+        stream.write('C\x1fA\x1e'.encode())
+        try:
+            while True:
+                data = yield stream.read_until('\x1e'.encode())
+                reply = _answer(data.decode('utf-8'))
+                # Split in the middle of every character to test decoding
+                for i in range(len(reply.encode('utf-8'))):
+                    yield stream.write(reply.encode('utf-8')[i:i + 1])
+        except iostream.StreamClosedError:
+            pass
+
+
+class LoopbackTransportTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(LoopbackTransportTest, self).setUp()
+        self.server_ends = []
+        self.received = []
+        self.client = client.Client(
+            'ws://unused', transport=transport.LoopbackTransport(self._accept))
+
+    def _accept(self, end):
+        self.server_ends.append(end)
+
+        def on_message(message):
+            self.received.append(message)
+            if message is not None:
+                end.write_message(_answer(message))
+
+        end.on_message_callback = on_message
+        end.write_message('C\x1fA\x1e')
+
+    @testing.gen_test
+    def test_login_and_make(self):
+        yield self.client.connect()
+        result = yield self.client.login({})
+        self.assertTrue(result['success'])
+        self.assertEqual(self.client.connection_state,
+                         constants.connection_state.OPEN)
+
+        response = yield self.client.rpc.make('echo', {'a': 'ü'})
+        self.assertEqual(response, {'a': 'ü'})
+        self.assertEqual(len(self.server_ends), 1)
+
+    @testing.gen_test
+    def test_close(self):
+        yield self.client.connect()
+        yield self.client.login({})
+        self.client.close()
+        yield gen.moment
+        self.assertEqual(self.client.connection_state,
+                         constants.connection_state.CLOSED)
+        self.assertIsNone(self.received[-1])
+        self.assertTrue(self.server_ends[0].closed())
+
+    def test_compression_unsupported(self):
+        with self.assertRaises(ValueError):
+            client.Client('ws://unused', compression=True,
+                          transport=transport.LoopbackTransport(self._accept))
+
+
+class TCPTransportTest(testing.AsyncTestCase):
+
+    def setUp(self):
+        super(TCPTransportTest, self).setUp()
+        sock, port = testing.bind_unused_port()
+        self.server = _TCPServer()
+        self.server.add_socket(sock)
+        self.url = 'tcp://localhost:{0}'.format(port)
+
+    def tearDown(self):
+        self.server.stop()
+        super(TCPTransportTest, self).tearDown()
+
+    @testing.gen_test
+    def test_login_and_make(self):
+        c = client.Client(self.url)
+        yield c.connect()
+        result = yield c.login({})
+        self.assertTrue(result['success'])
+
+        response = yield c.rpc.make('echo', 'äöü')
+        self.assertEqual(response, 'äöü')
+        c.close()
+
+
+class GetTransportTest(unittest.TestCase):
+
+    def test_schemes(self):
+        self.assertIsInstance(transport.get_transport('ws://localhost'),
+                              transport.WebSocketTransport)
+        self.assertIsInstance(transport.get_transport('wss://localhost'),
+                              transport.WebSocketTransport)
+        self.assertIsInstance(transport.get_transport('tcp://localhost:6021'),
+                              transport.TCPTransport)
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            transport.get_transport('http://localhost')
+
+    def test_compression_requires_websocket(self):
+        with self.assertRaises(ValueError):
+            transport.get_transport('tcp://localhost:6021',
+                                    {'compression_level': 6})
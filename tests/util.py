@@ -1,13 +1,44 @@
 from __future__ import absolute_import, division, print_function, with_statement
 from __future__ import unicode_literals
 
-from tornado import tcpserver, concurrent
+from deepstreampy.testing import Server
+
+from tornado import tcpserver, concurrent, ioloop
+
+import threading
+import sys
+
+if sys.version_info[0] < 3:
+    import mock
+else:
+    from unittest import mock
 
 
 def msg(value):
     return value.replace("|", chr(31)).replace("+", chr(30)).encode()
 
 
+def mock_websocket_handler(pending_writes=None):
+    """Returns a mock of an open websocket connection.
+
+    Args:
+        pending_writes (list): If given, writes don't complete, their futures
+            are appended to it instead
+    """
+    def write_message(message):
+        future = concurrent.Future()
+        if pending_writes is None:
+            future.set_result(None)
+        else:
+            pending_writes.append(future)
+        return future
+
+    handler = mock.Mock()
+    handler.stream.closed = mock.Mock(return_value=False)
+    handler.write_message = mock.Mock(side_effect=write_message)
+    return handler
+
+
 class FakeServer(tcpserver.TCPServer):
 
     def __init__(self):
@@ -39,3 +70,40 @@ class FakeServer(tcpserver.TCPServer):
     def await_message(self):
         self._messsage_future = concurrent.Future()
         return self._messsage_future
+
+
+class ServerThread(threading.Thread):
+    """Runs a ``deepstreampy.testing.Server`` on its own IOLoop, for clients
+    that block the thread they are used from.
+
+    Args:
+        set_up (callable): Called with the server on its IOLoop before it
+            accepts connections, to add records and RPC providers
+    """
+
+    def __init__(self, set_up=None):
+        super(ServerThread, self).__init__()
+        self.daemon = True
+        self.port = None
+        self._set_up = set_up
+        self._ready = threading.Event()
+
+    def run(self):
+        self.io_loop = ioloop.IOLoop()
+        self.io_loop.make_current()
+        server = Server()
+        if self._set_up is not None:
+            self._set_up(server)
+        self.port = server.listen()
+        self.io_loop.add_callback(self._ready.set)
+        self.io_loop.start()
+        server.stop()
+        self.io_loop.close(all_fds=True)
+
+    def start(self):
+        super(ServerThread, self).start()
+        self._ready.wait()
+
+    def stop(self):
+        self.io_loop.add_callback(self.io_loop.stop)
+        self.join()